@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
-from django.db.models import Q
+from django.db.models import Prefetch, Q
 from django.urls import reverse
 from .models import (
     Language, CustomUser, Category, CategoryTranslation, Tag, TagTranslation,
@@ -12,51 +12,68 @@ from .models import (
 
 # Добавляем ссылку на дашборд переводов в админку
 class TranslationDashboardAdmin(admin.ModelAdmin):
+    """Категории и теги: колонки с переводами названий строятся без запросов на строку."""
+    translations_model = None  # CategoryTranslation или TagTranslation
+
     def changelist_view(self, request, extra_context=None):
         extra_context = extra_context or {}
         extra_context['translation_dashboard_url'] = reverse('dictionary:translation_dashboard')
         return super().changelist_view(request, extra_context)
 
-@admin.register(Language)
-class LanguageAdmin(admin.ModelAdmin):
-    list_display = ['code', 'name']
-    search_fields = ['code', 'name']
-    ordering = ['code']
+    def get_queryset(self, request):
+        translations = self.translations_model.objects.select_related('language')
+        return super().get_queryset(request).prefetch_related(
+            Prefetch('translations', queryset=translations.order_by('language__code'))
+        )
 
-class CategoryTranslationInline(admin.TabularInline):
-    model = CategoryTranslation
-    extra = 0
-    fields = ['language', 'name', 'description']
-    ordering = ['language__code']
+    def get_changelist_instance(self, request):
+        # Список языков нужен каждой строке: читаем его один раз на страницу
+        changelist = super().get_changelist_instance(request)
+        language_codes = list(Language.objects.order_by('code').values_list('code', flat=True))
+        for obj in changelist.result_list:
+            obj.language_codes = language_codes
+        return changelist
 
-@admin.register(Category)
-class CategoryAdmin(TranslationDashboardAdmin):
-    list_display = ['code', 'get_translations_summary', 'get_missing_translations']
-    search_fields = ['code']
-    inlines = [CategoryTranslationInline]
-    actions = ['add_missing_translations']
-    
     def get_translations_summary(self, obj):
         translations = obj.translations.all()
         if not translations:
             return format_html('<span style="color: red;">Нет переводов</span>')
         
         summary = []
-        for t in translations.order_by('language__code'):
+        for t in translations:
             summary.append(f"{t.language.code}: {t.name}")
         
         return format_html('<br>'.join(summary))
     get_translations_summary.short_description = 'Переводы'
     
     def get_missing_translations(self, obj):
-        all_languages = Language.objects.all()
-        existing_languages = set(obj.translations.values_list('language__code', flat=True))
-        missing = [lang.code for lang in all_languages if lang.code not in existing_languages]
+        existing_languages = {t.language.code for t in obj.translations.all()}
+        missing = [code for code in obj.language_codes if code not in existing_languages]
         
         if missing:
             return format_html('<span style="color: orange;">Отсутствуют: {}</span>', ', '.join(missing))
         return format_html('<span style="color: green;">Все языки</span>')
     get_missing_translations.short_description = 'Статус переводов'
+
+@admin.register(Language)
+class LanguageAdmin(admin.ModelAdmin):
+    list_display = ['code', 'name']
+    search_fields = ['code', 'name']
+    ordering = ['code']
+
+class CategoryTranslationInline(admin.TabularInline):
+    model = CategoryTranslation
+    extra = 0
+    fields = ['language', 'name', 'description']
+    ordering = ['language__code']
+
+@admin.register(Category)
+class CategoryAdmin(TranslationDashboardAdmin):
+    translations_model = CategoryTranslation
+    list_display = ['code', 'get_translations_summary', 'get_missing_translations']
+    search_fields = ['code']
+    inlines = [CategoryTranslationInline]
+    actions = ['add_missing_translations']
     
     def add_missing_translations(self, request, queryset):
         all_languages = Language.objects.all()
@@ -86,33 +103,12 @@ class TagTranslationInline(admin.TabularInline):
 
 @admin.register(Tag)
 class TagAdmin(TranslationDashboardAdmin):
+    translations_model = TagTranslation
     list_display = ['code', 'get_translations_summary', 'get_missing_translations']
     search_fields = ['code']
     inlines = [TagTranslationInline]
     actions = ['add_missing_translations']
     
-    def get_translations_summary(self, obj):
-        translations = obj.translations.all()
-        if not translations:
-            return format_html('<span style="color: red;">Нет переводов</span>')
-        
-        summary = []
-        for t in translations.order_by('language__code'):
-            summary.append(f"{t.language.code}: {t.name}")
-        
-        return format_html('<br>'.join(summary))
-    get_translations_summary.short_description = 'Переводы'
-    
-    def get_missing_translations(self, obj):
-        all_languages = Language.objects.all()
-        existing_languages = set(obj.translations.values_list('language__code', flat=True))
-        missing = [lang.code for lang in all_languages if lang.code not in existing_languages]
-        
-        if missing:
-            return format_html('<span style="color: orange;">Отсутствуют: {}</span>', ', '.join(missing))
-        return format_html('<span style="color: green;">Все языки</span>')
-    get_missing_translations.short_description = 'Статус переводов'
-    
     def add_missing_translations(self, request, queryset):
         all_languages = Language.objects.all()
         created_count = 0
@@ -147,6 +143,7 @@ class ExampleInline(admin.TabularInline):
 @admin.register(Word)
 class WordAdmin(admin.ModelAdmin):
     list_display = ['word', 'language', 'category', 'status', 'created_at']
+    list_select_related = ['language', 'category']
     list_filter = ['language', 'category', 'status', 'created_at']
     search_fields = ['word', 'meaning']
     inlines = [TranslationInline]
@@ -175,6 +172,7 @@ class TranslationAdmin(admin.ModelAdmin):
 @admin.register(Example)
 class ExampleAdmin(admin.ModelAdmin):
     list_display = ['word', 'text_preview', 'author', 'created_at']
+    list_select_related = ['word__language', 'author']
     list_filter = ['created_at', 'word__language']
     search_fields = ['text', 'word__word']
     readonly_fields = ['created_at']
@@ -208,6 +206,7 @@ class WordLikeAdmin(admin.ModelAdmin):
 @admin.register(WordChangeLog)
 class WordChangeLogAdmin(admin.ModelAdmin):
     list_display = ['word', 'user', 'action', 'change_type', 'timestamp']
+    list_select_related = ['word__language', 'user']
     list_filter = ['action', 'change_type', 'timestamp', 'word__language']
     search_fields = ['word__word', 'user__username', 'comment']
     readonly_fields = ['timestamp']
@@ -216,6 +215,7 @@ class WordChangeLogAdmin(admin.ModelAdmin):
 @admin.register(WordHistory)
 class WordHistoryAdmin(admin.ModelAdmin):
     list_display = ['word', 'changed_by', 'changed_at']
+    list_select_related = ['word__language', 'changed_by']
     list_filter = ['changed_at', 'word__language']
     search_fields = ['word__word', 'changed_by__username']
     readonly_fields = ['changed_at', 'data']
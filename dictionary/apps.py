@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class DictionaryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dictionary'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_migrate
+
+        from . import signals  # noqa: F401
+        from .search import reset_backends
+        from .sqlite import configure_connection
+
+        connection_created.connect(configure_connection, dispatch_uid='dictionary.sqlite')
+        post_migrate.connect(reset_backends, sender=self, dispatch_uid='dictionary.search')
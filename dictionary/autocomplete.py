@@ -0,0 +1,226 @@
+"""Индекс префиксов для автодополнения в translation_search.
+
+Для каждого языка хранится отсортированный список ключей ``(key, word_id)`` и
+параллельный список записей; поиск префикса — это ``bisect`` плюс срез, без
+обращений к БД. В индекс попадают только одобренные и не удалённые слова.
+
+Индекс живёт в памяти процесса. Изменения слов применяются инкрементально
+через сигналы (см. ``dictionary.signals``) и после фиксации транзакции
+публикуются в журнал ``caching.ChangeFeed``; другие процессы применяют их к
+своему индексу так же инкрементально. Целиком индекс перестраивается, только
+если изменения не восстановить из журнала, и не реже чем раз в
+``AUTOCOMPLETE_INDEX_TTL`` секунд; перестраивает его один поток процесса.
+"""
+import heapq
+import threading
+import time
+from bisect import bisect_left
+from collections import namedtuple
+from itertools import islice
+
+from django.conf import settings
+
+from .caching import ChangeFeed
+from .normalization import normalize_word
+
+changes = ChangeFeed('autocomplete')
+GENERATION_CACHE_KEY = changes.generation_key
+
+# Изменения в журнале: слово добавлено или изменено, слово убрано из индекса,
+# код категории изменён (пустой код — категория удалена)
+PUT = 'put'
+REMOVE = 'remove'
+CATEGORY = 'category'
+
+Entry = namedtuple('Entry', 'id word language category_id')
+
+
+def make_key(word, language_code):
+    """Ключ сортировки и сравнения префиксов — тот же, что и ``Word.search_key``."""
+    return normalize_word(word, language_code)
+
+
+class PrefixIndex:
+    """Отсортированные массивы префиксов по языкам."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._keys = {}          # код языка -> [(key, word_id), ...]
+        self._entries = {}       # код языка -> [Entry, ...] (параллельно _keys)
+        self._locations = {}     # word_id -> (код языка, key)
+        self._language_codes = {}   # language_id -> code
+        self._category_codes = {}   # category_id -> code
+        self.loaded = False
+        self.loaded_at = 0
+        self.generation = None
+
+    def load(self):
+        """Полностью перестроить индекс из БД (три запроса)."""
+        from .models import Category, Language, Word
+
+        # Поколение читается до запросов: изменения, опубликованные во время
+        # загрузки, ещё раз придут из журнала (они идемпотентны)
+        generation = changes.current()
+        language_codes = dict(Language.objects.values_list('id', 'code'))
+        category_codes = dict(Category.objects.values_list('id', 'code'))
+        rows = (
+            Word.objects.filter(status='approved', is_deleted=False)
+            .values_list('id', 'word', 'search_key', 'language_id', 'category_id')
+        )
+
+        pairs = {}
+        for word_id, word, search_key, language_id, category_id in rows:
+            code = language_codes.get(language_id)
+            key = search_key or make_key(word, code)
+            pairs.setdefault(code, []).append(
+                ((key, word_id), Entry(word_id, word, code, category_id))
+            )
+
+        keys, entries, locations = {}, {}, {}
+        for code, items in pairs.items():
+            items.sort(key=lambda item: item[0])
+            keys[code] = [item[0] for item in items]
+            entries[code] = [item[1] for item in items]
+            for (key, word_id), _ in items:
+                locations[word_id] = (code, key)
+
+        with self._lock:
+            self._keys = keys
+            self._entries = entries
+            self._locations = locations
+            self._language_codes = language_codes
+            self._category_codes = category_codes
+            self.loaded = True
+            self.loaded_at = time.monotonic()
+            self.generation = generation
+
+    def invalidate(self):
+        with self._lock:
+            self._reset()
+
+    def is_expired(self):
+        if not self.loaded:
+            return True
+        ttl = getattr(settings, 'AUTOCOMPLETE_INDEX_TTL', 3600)
+        return time.monotonic() - self.loaded_at > ttl
+
+    def catch_up(self):
+        """Применить изменения других процессов; ``False`` — их не восстановить, индекс нужно перестроить."""
+        with self._lock:
+            generation, entries = changes.since(self.generation)
+            if entries is None:
+                return False
+            self._apply(entries)
+            self.generation = generation
+            return True
+
+    def _apply(self, entries):
+        for change in entries:
+            if change[0] == CATEGORY:
+                self._category_codes[change[1]] = change[2]
+                continue
+            self._remove(change[1])
+            if change[0] == PUT:
+                self._add(*change[1:])
+
+    def _remove(self, word_id):
+        location = self._locations.pop(word_id, None)
+        if location is None:
+            return
+        code, key = location
+        keys = self._keys[code]
+        position = bisect_left(keys, (key, word_id))
+        if position < len(keys) and keys[position] == (key, word_id):
+            del keys[position]
+            del self._entries[code][position]
+
+    def _add(self, word_id, word, language_id, category_id):
+        from .models import Language
+
+        code = self._language_codes.get(language_id)
+        if code is None:
+            code = Language.objects.values_list('code', flat=True).get(id=language_id)
+            self._language_codes[language_id] = code
+        key = make_key(word, code)
+        keys = self._keys.setdefault(code, [])
+        entries = self._entries.setdefault(code, [])
+        position = bisect_left(keys, (key, word_id))
+        keys.insert(position, (key, word_id))
+        entries.insert(position, Entry(word_id, word, code, category_id))
+        self._locations[word_id] = (code, key)
+
+    def apply(self, entries):
+        """Применить изменения к индексу процесса и (после фиксации) опубликовать их для остальных."""
+        entries = list(entries)
+        if self.loaded:
+            with self._lock:
+                self._apply(entries)
+        changes.publish_on_commit(entries)
+
+    def refresh_words(self, words):
+        """Обновить слова после сохранения: неодобренные и удалённые убираются из индекса."""
+        self.apply(
+            (PUT, word.id, word.word, word.language_id, word.category_id)
+            if word.status == 'approved' and not word.is_deleted else (REMOVE, word.id)
+            for word in words
+        )
+
+    def refresh_word(self, word):
+        self.refresh_words([word])
+
+    def remove_word(self, word_id):
+        self.apply([(REMOVE, word_id)])
+
+    def rename_category(self, category_id, code):
+        """Сменить код категории в индексах всех процессов."""
+        self.apply([(CATEGORY, category_id, code)])
+
+    def complete(self, prefix, language=None, limit=10):
+        """Вернуть до ``limit`` записей, у которых слово начинается с ``prefix``.
+
+        Результат — список словарей ``{'id', 'word', 'language', 'category'}``
+        в алфавитном порядке.
+        """
+        with self._lock:
+            codes = [language] if language else sorted(self._keys)
+            streams = [self._iter_prefix(code, make_key(prefix, code)) for code in codes]
+            matches = list(islice(heapq.merge(*streams), limit))
+            category_codes = self._category_codes
+            return [
+                {
+                    'id': entry.id,
+                    'word': entry.word,
+                    'language': entry.language,
+                    'category': category_codes.get(entry.category_id, '') if entry.category_id else '',
+                }
+                for _, entry in matches
+            ]
+
+    def _iter_prefix(self, code, key):
+        keys = self._keys.get(code)
+        if not keys or not key:
+            return
+        entries = self._entries[code]
+        position = bisect_left(keys, (key,))
+        while position < len(keys) and keys[position][0].startswith(key):
+            yield keys[position], entries[position]
+            position += 1
+
+
+prefix_index = PrefixIndex()
+_reload_lock = threading.Lock()
+
+
+def get_prefix_index():
+    """Индекс процесса с изменениями других процессов; при необходимости перестроенный из БД."""
+    index = prefix_index
+    if not index.is_expired() and index.catch_up():
+        return index
+    with _reload_lock:
+        # Пока ждали блокировку, индекс мог перестроить другой поток
+        if index.is_expired() or not index.catch_up():
+            index.load()
+    return index
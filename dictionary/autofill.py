@@ -0,0 +1,141 @@
+"""Пакетное автозаполнение переводов для auto_fill_translations.
+
+Число запросов не зависит от размера пакета: один запрос на исходные слова,
+один на уже существующие одобренные переводы всех слов и по одному запросу
+на целевой язык для поиска похожих слов. Похожие слова ищутся по префиксу
+``search_key`` (первые три буквы исходного слова, нормализованные по правилам
+целевого языка) через индекс ``(language, search_key)``.
+
+Если прямого перевода нет, но он есть через другой язык (kk→ru→tr), перевод
+берётся из графа переводов (``dictionary.graph``) — это ещё один запрос за
+текстами найденных слов.
+"""
+from django.db.models import Min, Q
+
+from .graph import get_translation_graph
+from .normalization import normalize_word, prefix_range
+
+SIMILAR_PREFIX_LENGTH = 3
+
+# Ограничение на число условий в одном запросе к похожим словам
+PREFIX_BATCH_SIZE = 300
+
+
+def _existing_translations(word_ids, language_codes):
+    """``{(word_id, код языка): слово}`` — первый одобренный перевод каждой пары."""
+    from .models import Translation
+
+    rows = (
+        Translation.objects.filter(
+            from_word_id__in=word_ids,
+            to_word__language__code__in=language_codes,
+            status='approved',
+        )
+        .order_by('id')
+        .values_list('from_word_id', 'to_word__language__code', 'to_word__word')
+    )
+    found = {}
+    for word_id, code, to_word in rows:
+        found.setdefault((word_id, code), to_word)
+    return found
+
+
+def _similar_words(language_id, keys):
+    """``{ключ: слово}`` — по одному похожему слову языка на каждый префикс."""
+    from .models import Word
+
+    found = {}
+    keys = sorted(keys)
+    for start in range(0, len(keys), PREFIX_BATCH_SIZE):
+        batch = keys[start:start + PREFIX_BATCH_SIZE]
+        conditions = {key: Q(**prefix_range(key)) for key in batch}
+        ranges = Q()
+        for condition in conditions.values():
+            ranges |= condition
+        # Одна строка с минимальным словом для каждого префикса
+        row = (
+            Word.objects.filter(ranges, language_id=language_id, is_deleted=False)
+            .aggregate(**{f'p{i}': Min('word', filter=conditions[key]) for i, key in enumerate(batch)})
+        )
+        for i, key in enumerate(batch):
+            if row[f'p{i}'] is not None:
+                found[key] = row[f'p{i}']
+    return found
+
+
+def _via_translations(words, language_ids, existing):
+    """``{(word_id, код языка): "[VIA ...] слово"}`` для пар без прямого перевода."""
+    from .models import Word
+
+    graph = get_translation_graph()
+    paths = {}
+    for word_id in words:
+        for code, language_id in language_ids.items():
+            if (word_id, code) in existing:
+                continue
+            found = graph.lookup(word_id, language_id, limit=1)
+            if found and found[0].hops > 1:
+                paths[(word_id, code)] = found[0].path
+    if not paths:
+        return {}
+
+    path_words = {
+        word_id: (text, code)
+        for word_id, text, code in Word.objects.filter(
+            id__in={word_id for path in paths.values() for word_id in path[1:]},
+            is_deleted=False,
+        ).values_list('id', 'word', 'language__code')
+    }
+    result = {}
+    for pair, path in paths.items():
+        if all(word_id in path_words for word_id in path[1:]):
+            via_codes = '→'.join(path_words[word_id][1] for word_id in path[1:-1])
+            result[pair] = f'[VIA {via_codes}] {path_words[path[-1]][0]}'
+    return result
+
+
+def auto_fill(word_ids, language_codes):
+    """Предложения переводов ``{"<word_id>_<код языка>": текст}``.
+
+    Ключи и порядок — как во входных данных; несуществующие слова пропускаются.
+    Существующий перевод берётся как есть, перевод через другие языки
+    помечается ``[VIA ru]``, похожее слово — ``[SIMILAR]``, иначе возвращается
+    заглушка ``[AUTO]``.
+    """
+    from .models import Language, Word
+
+    ids = {word_id: int(word_id) for word_id in word_ids}
+    words = dict(Word.objects.filter(id__in=set(ids.values())).values_list('id', 'word'))
+    language_ids = dict(Language.objects.filter(code__in=language_codes).values_list('code', 'id'))
+    existing = _existing_translations(list(words), language_codes) if words else {}
+    via = _via_translations(words, language_ids, existing)
+
+    # Префиксы, которые нужно поискать: только для пар без готового перевода
+    wanted = {}
+    for code in language_codes:
+        for word_id, text in words.items():
+            if (word_id, code) not in existing and (word_id, code) not in via and code in language_ids:
+                key = normalize_word(text[:SIMILAR_PREFIX_LENGTH], code)
+                if key:
+                    wanted.setdefault(code, set()).add(key)
+    similar = {code: _similar_words(language_ids[code], keys) for code, keys in wanted.items()}
+
+    result = {}
+    for word_id, pk in ids.items():
+        text = words.get(pk)
+        if text is None:
+            continue
+        for code in language_codes:
+            key = f'{word_id}_{code}'
+            if (pk, code) in existing:
+                result[key] = existing[(pk, code)]
+                continue
+            if (pk, code) in via:
+                result[key] = via[(pk, code)]
+                continue
+            candidate = similar.get(code, {}).get(normalize_word(text[:SIMILAR_PREFIX_LENGTH], code))
+            if candidate is not None:
+                result[key] = f'[SIMILAR] {candidate}'
+            else:
+                result[key] = f'[AUTO] {text} ({code})'
+    return result
@@ -0,0 +1,11 @@
+"""Нагрузочные замеры на больших синтетических данных.
+
+* ``generator`` — наполняет БД словами на нескольких языках (правдоподобные
+  строки кириллицы, казахского и турецкого алфавитов), переводами с заданным
+  ветвлением, тегами и примерами (команда ``generate_benchmark_data``);
+* ``load`` — параллельные клиенты шлют взвешенную смесь запросов к работающему
+  серверу: главная, страница слова, автодополнение, ``quick_translate`` и
+  массовые переводы (команда ``benchmark_load``);
+* ``report`` — p50/p95/p99 и пропускная способность по сценариям, сохранение
+  прогона в JSON и сравнение с предыдущим.
+"""
@@ -0,0 +1,187 @@
+"""Генератор синтетического словаря для нагрузочных замеров.
+
+Данные строятся вокруг «понятий»: у понятия есть слово на каждом языке, а
+переводы связывают слова одного понятия (``fanout`` — на сколько других
+языков переводится каждое слово). Так граф переводов похож на настоящий:
+есть и прямые переводы, и пути через промежуточный язык.
+
+Слова собираются из слогов алфавита языка, значения и примеры — из слов того
+же языка. Всё создаётся через ``bulk_create`` порциями в ``serialized_writes``,
+как при импорте, а индексы (FTS через триггеры, триграммы, автодополнение,
+граф, журнал синхронизации) обновляются теми же сигналами ``words_created`` и
+``translations_created``. Категории и теги создаются с префиксом ``PREFIX``,
+по нему же ``clear()`` удаляет сгенерированные данные.
+"""
+import random
+
+from django.db import transaction
+
+from ..bulk import translations_created, words_created
+from ..normalization import normalize_word
+from ..sqlite import serialized_writes
+
+PREFIX = 'bench'
+
+# Согласные и гласные для слогов; у каждого языка свои буквы
+ALPHABETS = {
+    'ru': ('бвгджзклмнпрстфхцчшщ', 'аеиоуыэюяё'),
+    'kk': ('бвгғджзйкқлмнңпрстшһ', 'аәеиоөұүыі'),
+    'tr': ('bcçdfgğhjklmnprsştvyz', 'aeıioöuü'),
+    'en': ('bcdfghjklmnprstvwz', 'aeiouy'),
+}
+DEFAULT_ALPHABET = ALPHABETS['en']
+
+LANGUAGE_NAMES = {'ru': 'Русский', 'kk': 'Қазақша', 'tr': 'Türkçe', 'en': 'English'}
+
+
+class WordFactory:
+    """Случайные слова и фразы на одном языке, без повторов."""
+
+    def __init__(self, code, rng, existing=()):
+        self.consonants, self.vowels = ALPHABETS.get(code, DEFAULT_ALPHABET)
+        self.rng = rng
+        self.used = set(existing)
+
+    def syllable(self):
+        rng = self.rng
+        pattern = rng.choice(('cv', 'cv', 'cvc', 'vc', 'ccv'))
+        return ''.join(rng.choice(self.consonants if letter == 'c' else self.vowels) for letter in pattern)
+
+    def token(self, min_syllables=1, max_syllables=4):
+        return ''.join(self.syllable() for _ in range(self.rng.randint(min_syllables, max_syllables)))
+
+    def word(self):
+        """Новое слово; примерно каждое шестое — из двух слов, как составные термины."""
+        while True:
+            text = self.token(2, 4)
+            if self.rng.random() < 0.15:
+                text = f'{text} {self.token(2, 3)}'
+            if text not in self.used:
+                self.used.add(text)
+                return text
+
+    def sentence(self, min_words=5, max_words=12):
+        words = [self.token() for _ in range(self.rng.randint(min_words, max_words))]
+        return ' '.join(words).capitalize() + '.'
+
+
+def _languages(codes):
+    from ..models import Language
+
+    languages = []
+    for code in codes:
+        language, _ = Language.objects.get_or_create(code=code, defaults={'name': LANGUAGE_NAMES.get(code, code)})
+        languages.append(language)
+    return languages
+
+
+def _taxonomy(categories, tags):
+    from ..models import Category, Tag
+
+    category_ids = [
+        Category.objects.get_or_create(code=f'{PREFIX}_category_{number}')[0].id for number in range(categories)
+    ]
+    tag_ids = [Tag.objects.get_or_create(code=f'{PREFIX}_tag_{number}')[0].id for number in range(tags)]
+    return category_ids, tag_ids
+
+
+def generate(words_per_language, languages=('ru', 'kk', 'tr', 'en'), fanout=2, categories=20, tags=50,
+             tags_per_word=2, examples_per_word=1, batch_size=2000, seed=42, on_progress=None):
+    """Создать ``words_per_language`` понятий со словом на каждом языке.
+
+    Возвращает ``{'words': ..., 'translations': ..., 'examples': ...}``;
+    ``on_progress(создано понятий)`` вызывается после каждой порции.
+    """
+    from ..models import Category, Example, Translation, Word
+
+    rng = random.Random(seed)
+    languages = _languages(languages)
+    fanout = max(0, min(fanout, len(languages) - 1))
+    category_ids, tag_ids = _taxonomy(categories, tags)
+    category_codes = dict(Category.objects.filter(id__in=category_ids).values_list('id', 'code'))
+    factories = {
+        language.id: WordFactory(
+            language.code, rng, Word.objects.filter(language=language).values_list('word', flat=True),
+        )
+        for language in languages
+    }
+    Through = Word.tags.through
+    totals = {'words': 0, 'translations': 0, 'examples': 0}
+
+    for start in range(0, words_per_language, batch_size):
+        count = min(batch_size, words_per_language - start)
+        with serialized_writes():
+            # Слова: по одному на каждом языке для каждого понятия порции
+            concepts = []
+            new_words = []
+            for _ in range(count):
+                category_id = rng.choice(category_ids) if category_ids else None
+                concept = {}
+                for language in languages:
+                    factory = factories[language.id]
+                    text = factory.word()
+                    word = Word(
+                        word=text,
+                        search_key=normalize_word(text, language.code),
+                        language_id=language.id,
+                        category_id=category_id,
+                        category_code=category_codes.get(category_id, ''),
+                        meaning=factory.sentence(),
+                        pronunciation=f'/{text}/',
+                        difficulty=rng.choice(('easy', 'medium', 'hard')),
+                        status='approved',
+                        is_deleted=False,
+                    )
+                    concept[language.id] = word
+                    new_words.append(word)
+                concepts.append(concept)
+            Word.objects.bulk_create(new_words, batch_size=batch_size)
+
+            # Переводы между словами одного понятия
+            new_translations = []
+            for concept in concepts:
+                for language_id, word in concept.items():
+                    others = [other for other in concept if other != language_id]
+                    for order, target_language in enumerate(rng.sample(others, fanout), start=1):
+                        new_translations.append(Translation(
+                            from_word_id=word.id, to_word_id=concept[target_language].id,
+                            status='approved', order=order,
+                        ))
+            Translation.objects.bulk_create(new_translations, batch_size=batch_size)
+
+            # Теги и примеры
+            Through.objects.bulk_create(
+                [
+                    Through(word_id=word.id, tag_id=tag_id)
+                    for word in new_words
+                    for tag_id in rng.sample(tag_ids, min(tags_per_word, len(tag_ids)))
+                ],
+                batch_size=batch_size,
+            )
+            new_examples = [
+                Example(word_id=word.id, text=factories[word.language_id].sentence(8, 16))
+                for word in new_words
+                for _ in range(examples_per_word)
+            ]
+            Example.objects.bulk_create(new_examples, batch_size=batch_size)
+
+            words_created.send(sender=Word, words=new_words)
+            translations_created.send(sender=Translation, translations=new_translations)
+
+        totals['words'] += len(new_words)
+        totals['translations'] += len(new_translations)
+        totals['examples'] += len(new_examples)
+        if on_progress:
+            on_progress(start + count)
+    return totals
+
+
+def clear():
+    """Удалить сгенерированные слова, категории и теги. Возвращает число удалённых слов."""
+    from ..models import Category, Tag, Word
+
+    with transaction.atomic():
+        deleted, by_model = Word.objects.filter(category__code__startswith=f'{PREFIX}_category_').delete()
+        Category.objects.filter(code__startswith=f'{PREFIX}_category_').delete()
+        Tag.objects.filter(code__startswith=f'{PREFIX}_tag_').delete()
+    return by_model.get(Word._meta.label, 0)
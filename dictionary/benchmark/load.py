@@ -0,0 +1,223 @@
+"""Нагрузка на работающий сервер: параллельные клиенты и взвешенная смесь запросов.
+
+Каждый клиент — поток со своей сессией (cookie), он выбирает сценарий по
+весам ``SCENARIOS`` и сразу шлёт следующий запрос (закрытая модель нагрузки:
+число одновременных запросов равно числу клиентов). Запросы идут по HTTP
+через ``urllib``, поэтому замер включает весь стек: WSGI-сервер, middleware,
+кэш и БД. Массовые сценарии требуют входа под сотрудником; cookie ставятся
+вручную, так как ``SESSION_COOKIE_SECURE``/``CSRF_COOKIE_SECURE`` не дают
+``http.cookiejar`` отправлять их по HTTP.
+
+Цели запросов (id слов, префиксы для автодополнения, языки) берёт из БД
+``Targets.from_database``; сгенерированные данные (``generator.PREFIX``)
+предпочтительнее: массовые сценарии создают переводы, а новые слова
+наследуют категорию исходного и удаляются вместе с ними через ``clear()``.
+"""
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.cookies import SimpleCookie
+
+from .generator import PREFIX, WordFactory
+
+TIMEOUT = 30
+# Сколько слов отправлять в одном массовом запросе
+BULK_SIZE = 10
+
+# Сценарий -> вес; доли примерно как у реального трафика: чтение преобладает
+SCENARIOS = {
+    'home': 20,
+    'home_search': 15,
+    'word_detail': 25,
+    'translation_search': 20,
+    'quick_translate': 15,
+    'bulk_word_translation': 3,
+    'bulk_multi_translate': 2,
+}
+WRITE_SCENARIOS = {'bulk_word_translation', 'bulk_multi_translate'}
+
+
+class Targets:
+    """Данные для параметров запросов, выбранные из БД заранее."""
+
+    def __init__(self, word_ids, prefixes, languages):
+        self.word_ids = word_ids
+        self.prefixes = prefixes          # [(префикс, код языка), ...]
+        self.languages = languages        # [код языка, ...]
+
+    @classmethod
+    def from_database(cls, sample_size=5000, seed=42):
+        from ..models import Language, Word
+
+        rng = random.Random(seed)
+        words = Word.objects.filter(is_deleted=False)
+        if words.filter(category__code__startswith=f'{PREFIX}_category_').exists():
+            words = words.filter(category__code__startswith=f'{PREFIX}_category_')
+        rows = list(words.order_by('?').values_list('id', 'word', 'language__code')[:sample_size])
+        prefixes = [(text[:rng.randint(2, 4)], code) for _, text, code in rows]
+        return cls(
+            word_ids=[word_id for word_id, _, _ in rows],
+            prefixes=prefixes,
+            languages=list(Language.objects.order_by('code').values_list('code', flat=True)),
+        )
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # Редирект после POST — это успешный ответ, переходить по нему не нужно
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Client:
+    """HTTP-клиент с собственными cookie."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.cookies = {}
+        self.opener = urllib.request.build_opener(_NoRedirect)
+
+    def request(self, path, data=None, headers=None):
+        """Выполнить запрос; возвращает ``(код ответа, тело)``. Коды 2xx и 3xx — успех."""
+        url = self.base_url + path
+        headers = dict(headers or {})
+        headers['Referer'] = url
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        if data is not None:
+            data = urllib.parse.urlencode(data, doseq=True).encode()
+            headers['X-CSRFToken'] = self.cookies.get('csrftoken', '')
+        request = urllib.request.Request(url, data=data, headers=headers)
+        try:
+            with self.opener.open(request, timeout=TIMEOUT) as response:
+                self._store_cookies(response)
+                return response.status, response.read()
+        except urllib.error.HTTPError as error:
+            self._store_cookies(error)
+            return error.code, error.read()
+
+    def _store_cookies(self, response):
+        for header in response.headers.get_all('Set-Cookie') or []:
+            cookie = SimpleCookie()
+            cookie.load(header)
+            for name, morsel in cookie.items():
+                self.cookies[name] = morsel.value
+
+    def login(self, username, password):
+        self.request('/login/')
+        status, _ = self.request('/login/', data={
+            'csrfmiddlewaretoken': self.cookies.get('csrftoken', ''),
+            'username': username,
+            'password': password,
+        })
+        return status == 302 and 'sessionid' in self.cookies
+
+
+class LoadRunner:
+    """Запускает клиентов на ``duration`` секунд и собирает ``{сценарий: [(секунды, ok), ...]}``."""
+
+    def __init__(self, base_url, targets, clients=10, duration=30, scenarios=None, username=None,
+                 password=None, seed=42):
+        self.base_url = base_url
+        self.targets = targets
+        self.clients = clients
+        self.duration = duration
+        self.scenarios = dict(scenarios or SCENARIOS)
+        self.username = username
+        self.password = password
+        self.seed = seed
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def run(self):
+        if not self.username:
+            self.scenarios = {name: weight for name, weight in self.scenarios.items() if name not in WRITE_SCENARIOS}
+        clients = []
+        for number in range(self.clients):
+            client = Client(self.base_url)
+            if self.username and not client.login(self.username, self.password):
+                raise RuntimeError(f'Не удалось войти под {self.username}')
+            clients.append(client)
+
+        deadline = time.perf_counter() + self.duration
+        threads = [
+            threading.Thread(target=self._client_loop, args=(client, deadline, self.seed + number), daemon=True)
+            for number, client in enumerate(clients)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.samples, time.perf_counter() - started
+
+    def _client_loop(self, client, deadline, seed):
+        rng = random.Random(seed)
+        factories = {}
+
+        def new_word(code):
+            # Тексты переводов на алфавите целевого языка
+            if code not in factories:
+                factories[code] = WordFactory(code, rng)
+            return factories[code].word()
+
+        names = list(self.scenarios)
+        weights = [self.scenarios[name] for name in names]
+        samples = {}
+        while time.perf_counter() < deadline:
+            scenario = rng.choices(names, weights)[0]
+            path, data, headers = getattr(self, f'_{scenario}')(rng, new_word)
+            started = time.perf_counter()
+            try:
+                status, _ = client.request(path, data=data, headers=headers)
+                ok = status < 400
+            except OSError:
+                ok = False
+            samples.setdefault(scenario, []).append((time.perf_counter() - started, ok))
+        with self._lock:
+            for scenario, items in samples.items():
+                self.samples.setdefault(scenario, []).extend(items)
+
+    # Сценарии: возвращают путь, данные POST и заголовки
+
+    def _query(self, rng):
+        prefix, code = rng.choice(self.targets.prefixes)
+        return prefix, code
+
+    def _home(self, rng, new_word):
+        return '/', None, None
+
+    def _home_search(self, rng, new_word):
+        prefix, code = self._query(rng)
+        return '/?' + urllib.parse.urlencode({'q': prefix, 'lang': code}), None, None
+
+    def _word_detail(self, rng, new_word):
+        return f'/word/{rng.choice(self.targets.word_ids)}/', None, None
+
+    def _translation_search(self, rng, new_word):
+        prefix, code = self._query(rng)
+        query = urllib.parse.urlencode({'q': prefix, 'source_lang': code})
+        return f'/translation-search/?{query}', None, {'X-Requested-With': 'XMLHttpRequest'}
+
+    def _quick_translate(self, rng, new_word):
+        prefix, _ = self._query(rng)
+        return '/quick-translate/?' + urllib.parse.urlencode({'q': prefix}), None, None
+
+    def _bulk_word_translation(self, rng, new_word):
+        word_ids = rng.sample(self.targets.word_ids, min(BULK_SIZE, len(self.targets.word_ids)))
+        translations = {}
+        for word_id in word_ids:
+            code = rng.choice(self.targets.languages)
+            translations[str(word_id)] = {'target_lang': code, 'translation': new_word(code)}
+        data = {'word_ids': word_ids, 'translations_data': json.dumps(translations)}
+        return '/word-translations/bulk/', data, None
+
+    def _bulk_multi_translate(self, rng, new_word):
+        word_ids = rng.sample(self.targets.word_ids, min(BULK_SIZE, len(self.targets.word_ids)))
+        languages = rng.sample(self.targets.languages, min(2, len(self.targets.languages)))
+        translations = {f'{word_id}_{code}': new_word(code) for word_id in word_ids for code in languages}
+        data = {'word_ids': word_ids, 'target_languages': languages, 'translations_data': json.dumps(translations)}
+        return '/bulk-multi-translate/', data, None
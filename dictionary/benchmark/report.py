@@ -0,0 +1,99 @@
+"""Сводка нагрузочного прогона: задержки и пропускная способность по сценариям.
+
+Прогон сохраняется в JSON (параметры, время, сводка), чтобы результаты
+разных версий и настроек можно было сравнивать: ``compare`` выводит для
+каждого сценария изменение req/s и p95 относительно прежнего файла.
+"""
+import json
+import math
+from datetime import datetime, timezone
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, percent):
+    """Процентиль по методу ближайшего ранга; ``values`` отсортированы."""
+    if not values:
+        return None
+    rank = max(1, math.ceil(len(values) * percent / 100))
+    return values[rank - 1]
+
+
+def summarize(samples, duration):
+    """``samples`` — ``{сценарий: [(секунды, ok), ...]}``; возвращает сводку по сценариям и итог."""
+    summary = {}
+    everything = []
+    for scenario, items in sorted(samples.items()):
+        everything.extend(items)
+        summary[scenario] = _stats(items, duration)
+    summary['total'] = _stats(everything, duration)
+    return summary
+
+
+def _stats(items, duration):
+    timings = sorted(seconds for seconds, ok in items if ok)
+    stats = {
+        'requests': len(items),
+        'errors': sum(1 for _, ok in items if not ok),
+        'rps': round(len(items) / duration, 2) if duration else 0.0,
+    }
+    for percent in PERCENTILES:
+        value = percentile(timings, percent)
+        stats[f'p{percent}_ms'] = round(value * 1000, 2) if value is not None else None
+    return stats
+
+
+def build(summary, params, duration):
+    return {
+        'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'duration': round(duration, 2),
+        'params': params,
+        'scenarios': summary,
+    }
+
+
+def save(report, path):
+    with open(path, 'w', encoding='utf-8') as stream:
+        json.dump(report, stream, ensure_ascii=False, indent=2)
+
+
+def load(path):
+    with open(path, encoding='utf-8') as stream:
+        return json.load(stream)
+
+
+def _format_ms(value):
+    return '—' if value is None else f'{value:.1f}'
+
+
+def format_table(report):
+    """Строки таблицы: сценарий, запросы, ошибки, req/s, p50/p95/p99 в мс."""
+    lines = [f'{"сценарий":<24}{"запросов":>10}{"ошибок":>8}{"req/s":>10}{"p50":>9}{"p95":>9}{"p99":>9}']
+    for scenario, stats in report['scenarios'].items():
+        lines.append(
+            f'{scenario:<24}{stats["requests"]:>10}{stats["errors"]:>8}{stats["rps"]:>10.1f}'
+            + ''.join(f'{_format_ms(stats[f"p{percent}_ms"]):>9}' for percent in PERCENTILES)
+        )
+    return lines
+
+
+def _delta(current, previous):
+    if current is None or not previous:
+        return '—'
+    return f'{(current - previous) / previous * 100:+.1f}%'
+
+
+def compare(report, baseline):
+    """Строки сравнения с прежним прогоном: req/s и p95 по общим сценариям."""
+    lines = [f'Сравнение с прогоном {baseline.get("started_at", "?")}:']
+    lines.append(f'{"сценарий":<24}{"req/s":>10}{"было":>10}{"Δ":>9}{"p95":>9}{"было":>9}{"Δ":>9}')
+    for scenario, stats in report['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(scenario)
+        if before is None:
+            continue
+        lines.append(
+            f'{scenario:<24}{stats["rps"]:>10.1f}{before["rps"]:>10.1f}{_delta(stats["rps"], before["rps"]):>9}'
+            f'{_format_ms(stats["p95_ms"]):>9}{_format_ms(before["p95_ms"]):>9}'
+            f'{_delta(stats["p95_ms"], before["p95_ms"]):>9}'
+        )
+    return lines
@@ -0,0 +1,172 @@
+"""Массовое создание переводов слов (bulk_word_translation, bulk_multi_translate).
+
+Вместо ``get``/``get_or_create`` на каждое слово и язык данные обрабатываются
+порциями: языки читаются один раз, существующие исходные слова, целевые слова
+и переводы — одним запросом на порцию (целевые слова — по запросу на язык),
+а новые слова и переводы вставляются через ``bulk_create(ignore_conflicts=True)``.
+Так порция из 500 слов укладывается в десяток запросов.
+
+``bulk_create`` не вызывает ``Word.save()`` и не отправляет ``post_save``,
+поэтому ``search_key`` заполняется здесь, а индексы (автодополнение, триграммы,
+граф переводов, фасеты) узнают о новых строках из сигналов ``words_created``
+(``words_updated`` — после ``bulk_update``) и ``translations_created``
+(обработчики в ``dictionary.signals``).
+"""
+import time
+
+from django.dispatch import Signal
+
+from . import metrics
+from .normalization import normalize_word
+
+CHUNK_SIZE = 500
+
+# Отправляются после массовой вставки или обновления; аргумент — список объектов
+words_created = Signal()          # words=[Word, ...]
+words_updated = Signal()          # words=[Word, ...]
+translations_created = Signal()   # translations=[Translation, ...] с id, только вставленные
+
+
+class BulkTranslationResult:
+    """Итоги массового перевода."""
+
+    def __init__(self):
+        self.words_created = 0
+        self.translations_created = 0
+        self.translations_existing = 0
+        self.skipped = 0
+
+    def __repr__(self):
+        return (
+            f'<BulkTranslationResult words_created={self.words_created} '
+            f'translations_created={self.translations_created} '
+            f'translations_existing={self.translations_existing} skipped={self.skipped}>'
+        )
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _target_words(language_ids, texts_by_language):
+    """``{(language_id, текст): Word}`` для уже существующих не удалённых слов."""
+    from .models import Word
+
+    found = {}
+    for language_id, texts in texts_by_language.items():
+        if language_id not in language_ids:
+            continue
+        for word in Word.objects.filter(language_id=language_id, word__in=texts, is_deleted=False):
+            found[(language_id, word.word)] = word
+    return found
+
+
+def bulk_translate(items, user=None, copy_meaning=False, status='pending', chunk_size=CHUNK_SIZE):
+    """Создать переводы ``(id исходного слова, код языка, текст перевода)``.
+
+    Целевое слово ищется по паре (текст, язык) — она уникальна; если его нет,
+    создаётся слово со статусом ``pending`` в категории исходного слова (и с его
+    значением при ``copy_meaning``). Удалённое слово целью не становится, а новое
+    с тем же текстом не создаётся (пара уникальна) — такой перевод пропускается. Переводы создаются со статусом ``status``;
+    уже существующие не меняются и считаются в ``translations_existing``.
+    Неизвестные слова и языки и пустые тексты пропускаются. Вызывать внутри
+    ``transaction.atomic()``.
+    """
+    from .models import Language, Translation, Word
+
+    started = time.perf_counter()
+    languages = dict(Language.objects.values_list('code', 'id'))
+    language_codes = {language_id: code for code, language_id in languages.items()}
+    result = BulkTranslationResult()
+
+    cleaned = []
+    for word_id, language_code, text in items:
+        text = (text or '').strip()
+        if not text or language_code not in languages:
+            result.skipped += 1
+            continue
+        cleaned.append((int(word_id), languages[language_code], text))
+
+    for chunk in _chunks(cleaned, chunk_size):
+        sources = Word.objects.only('id', 'category_id', 'category_code', 'meaning').in_bulk({word_id for word_id, _, _ in chunk})
+        texts_by_language = {}
+        for word_id, language_id, text in chunk:
+            texts_by_language.setdefault(language_id, set()).add(text)
+        targets = _target_words(language_codes, texts_by_language)
+
+        # Новые слова на целевых языках
+        new_words = {}
+        for word_id, language_id, text in chunk:
+            source = sources.get(word_id)
+            if source is None or (language_id, text) in targets or (language_id, text) in new_words:
+                continue
+            new_words[(language_id, text)] = Word(
+                word=text,
+                search_key=normalize_word(text, language_codes[language_id]),
+                language_id=language_id,
+                category_id=source.category_id,
+                category_code=source.category_code,
+                meaning=source.meaning if copy_meaning else '',
+                status='pending',
+                is_deleted=False,
+                created_by=user,
+            )
+        if new_words:
+            Word.objects.bulk_create(new_words.values(), ignore_conflicts=True, batch_size=chunk_size)
+            # ignore_conflicts не возвращает id — перечитываем только что созданные слова
+            new_texts = {}
+            for language_id, text in new_words:
+                new_texts.setdefault(language_id, set()).add(text)
+            created = _target_words(language_codes, new_texts)
+            created_words = [word for key, word in created.items() if key not in targets]
+            targets.update(created)
+            result.words_created += len(created_words)
+            words_created.send(sender=Word, words=created_words)
+
+        # Переводы
+        pairs = []
+        for word_id, language_id, text in chunk:
+            target = targets.get((language_id, text))
+            if word_id not in sources or target is None:
+                result.skipped += 1
+                continue
+            pairs.append((word_id, target.id))
+        existing = set(
+            Translation.objects.filter(
+                from_word_id__in={from_id for from_id, _ in pairs},
+                to_word_id__in={to_id for _, to_id in pairs},
+            ).values_list('from_word_id', 'to_word_id')
+        )
+        new_translations = {}
+        for pair in pairs:
+            if pair in existing:
+                result.translations_existing += 1
+            elif pair not in new_translations:
+                new_translations[pair] = Translation(
+                    from_word_id=pair[0], to_word_id=pair[1], status=status, order=1,
+                )
+        if new_translations:
+            Translation.objects.bulk_create(new_translations.values(), ignore_conflicts=True, batch_size=chunk_size)
+            # ignore_conflicts молча пропускает строки, которые успел вставить кто-то другой
+            # (или чьё слово успели удалить), и не возвращает id — перечитываем пары
+            inserted = {
+                (from_id, to_id): translation_id
+                for translation_id, from_id, to_id in Translation.objects.filter(
+                    from_word_id__in={from_id for from_id, _ in new_translations},
+                    to_word_id__in={to_id for _, to_id in new_translations},
+                ).values_list('id', 'from_word_id', 'to_word_id')
+                if (from_id, to_id) in new_translations
+            }
+            created_translations = []
+            for pair, translation in new_translations.items():
+                if pair in inserted:
+                    translation.id = inserted[pair]
+                    created_translations.append(translation)
+                else:
+                    result.skipped += 1
+            result.translations_created += len(created_translations)
+            translations_created.send(sender=Translation, translations=created_translations)
+
+    metrics.observe_bulk('translate', len(cleaned), time.perf_counter() - started)
+    return result
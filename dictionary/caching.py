@@ -0,0 +1,486 @@
+"""Двухуровневый кэш данных страниц: LRU в памяти процесса поверх общего кэша.
+
+Второй уровень — кэш Django ``CACHE_SHARED_ALIAS`` (по умолчанию ``default``,
+файловый, см. ``CACHES``): он общий для всех процессов gunicorn. Первый —
+``OrderedDict`` в памяти процесса на ``CACHE_LOCAL_MAX_ENTRIES`` записей;
+значения в нём не копируются, поэтому изменять полученные объекты нельзя.
+
+Каждая запись помечена тегами (``word:15``, ``words``). Версия тега хранится в
+общем кэше; ``invalidate_tags`` меняет версии, и записи, сохранённые при
+старых версиях, перестают использоваться во всех процессах. Запись в памяти
+процесса сверяет версии своих тегов не чаще раза в
+``CACHE_LOCAL_CHECK_INTERVAL`` секунд; теги, сброшенные в этом же процессе,
+проверяются сразу.
+
+У записи два срока: ``ttl`` — сколько она свежая, и ``stale_ttl`` — сколько
+после этого её ещё можно отдавать, пока фоновый поток загружает новое
+значение (stale-while-revalidate). Так часто запрашиваемые ключи не ждут БД.
+
+Одновременные промахи по одному ключу объединяются: в процессе значение
+загружает один поток, остальные ждут его результата, а между процессами —
+тот, кто первым взял блокировку в общем кэше (``add``); остальные несколько
+секунд ждут, пока значение появится.
+
+Использование::
+
+    @cached('word_detail', ttl=300, tags=lambda data, word_id: [f'word:{word_id}'])
+    def load_word_detail(word_id):
+        ...
+
+    invalidate_tags('word:15')
+
+Структуры в памяти процесса, которые дорого перестраивать (граф переводов,
+индекс автодополнения), узнают об изменениях из других процессов через
+``ChangeFeed`` — журнал изменений в общем кэше по номерам поколений.
+"""
+import functools
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировка только внутри процесса
+    fcntl = None
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends import filebased
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import connections, transaction
+
+from . import metrics
+
+KEY_PREFIX = 'dictionary:cache:'
+TAG_PREFIX = 'dictionary:cache-tag:'
+LOCK_PREFIX = 'dictionary:cache-lock:'
+CHANGES_PREFIX = 'dictionary:changes:'
+
+DEFAULT_TTL = 300
+DEFAULT_STALE_TTL = 60
+# Сколько ждать значения, которое загружает другой процесс
+LOCK_TIMEOUT = 10
+LOCK_POLL_INTERVAL = 0.05
+
+# Теги: страница одного слова, списки слов, справочники (языки, категории, теги)
+# и переводы названий категорий, тегов и строк интерфейса
+WORDS_TAG = 'words'
+TAXONOMY_TAG = 'taxonomy'
+NAMES_TAG = 'names'
+
+# Значение «ничего не найдено» тоже кэшируется
+_MISSING = object()
+
+# Сколько хранятся записи журнала изменений и на сколько поколений можно отстать
+DEFAULT_CHANGES_TTL = 3600
+DEFAULT_CHANGES_MAX_BEHIND = 1000
+# Запись журнала, изменения которой не восстановить: структуру нужно перечитать
+_RELOAD = 'reload'
+
+
+class _Entry:
+    __slots__ = ('value', 'fresh_until', 'stale_until', 'versions', 'checked_at')
+
+    def __init__(self, value, fresh_until, stale_until, versions, checked_at):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+        self.versions = versions
+        self.checked_at = checked_at
+
+
+class _Flight:
+    """Загрузка значения, которую ждут другие потоки процесса."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TieredCache:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = OrderedDict()
+        self._flights = {}
+        self._refreshing = set()
+        self._invalidated_at = {}   # тег -> time.monotonic() сброса в этом процессе
+        self.hits = self.stale_hits = self.shared_hits = self.misses = self.loads = 0
+
+    @property
+    def shared(self):
+        return caches[getattr(settings, 'CACHE_SHARED_ALIAS', 'default')]
+
+    # Теги
+
+    def _versions(self, tags):
+        """Текущие версии тегов из общего кэша; отсутствующие создаются."""
+        if not tags:
+            return {}
+        keys = {TAG_PREFIX + tag: tag for tag in tags}
+        found = self.shared.get_many(list(keys))
+        versions = {}
+        for key, tag in keys.items():
+            version = found.get(key)
+            if version is None:
+                self.shared.add(key, time.time_ns(), None)
+                version = self.shared.get(key)
+            versions[tag] = version
+        return versions
+
+    def invalidate_tags(self, *tags):
+        now = time.monotonic()
+        version = time.time_ns()
+        self.shared.set_many({TAG_PREFIX + tag: version for tag in tags}, None)
+        with self._lock:
+            for tag in tags:
+                self._invalidated_at[tag] = now
+
+    def _is_current(self, entry, now):
+        """Совпадают ли версии тегов записи с текущими (с проверкой не чаще интервала)."""
+        invalidated = any(self._invalidated_at.get(tag, 0) >= entry.checked_at for tag in entry.versions)
+        interval = getattr(settings, 'CACHE_LOCAL_CHECK_INTERVAL', 1.0)
+        if not invalidated and now - entry.checked_at < interval:
+            return True
+        if self._versions(list(entry.versions)) != entry.versions:
+            return False
+        entry.checked_at = now
+        return True
+
+    # Уровни
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                self._local.move_to_end(key)
+            return entry
+
+    def _put_local(self, key, entry):
+        limit = getattr(settings, 'CACHE_LOCAL_MAX_ENTRIES', 1000)
+        with self._lock:
+            self._local[key] = entry
+            self._local.move_to_end(key)
+            while len(self._local) > limit:
+                self._local.popitem(last=False)
+
+    def _drop_local(self, key):
+        with self._lock:
+            self._local.pop(key, None)
+
+    def _lookup(self, key, now, wall):
+        """``(запись, из общего кэша ли она)`` или ``(None, False)``, если актуальной записи нет."""
+        entry = self._get_local(key)
+        if entry is not None:
+            if wall < entry.stale_until and self._is_current(entry, now):
+                return entry, False
+            self._drop_local(key)
+        stored = self.shared.get(KEY_PREFIX + key)
+        if stored is None:
+            return None, False
+        value, fresh_until, stale_until, versions = stored
+        if wall >= stale_until or self._versions(list(versions)) != versions:
+            return None, False
+        entry = _Entry(value, fresh_until, stale_until, versions, now)
+        self._put_local(key, entry)
+        return entry, True
+
+    def _store(self, key, value, ttl, stale_ttl, tags):
+        versions = self._versions(sorted(set(tags)))
+        wall = time.time()
+        entry = _Entry(value, wall + ttl, wall + ttl + stale_ttl, versions, time.monotonic())
+        self.shared.set(KEY_PREFIX + key, (value, entry.fresh_until, entry.stale_until, versions), ttl + stale_ttl)
+        self._put_local(key, entry)
+        return entry
+
+    # Загрузка
+
+    def _load(self, key, loader, ttl, stale_ttl, tags):
+        self.loads += 1
+        value = loader()
+        stored = _MISSING if value is None else value
+        entry_tags = tags(value) if callable(tags) else tags
+        self._store(key, stored, ttl, stale_ttl, entry_tags)
+        return value
+
+    def _load_shared(self, key, loader, ttl, stale_ttl, tags):
+        """Загрузить значение, взяв блокировку в общем кэше, или дождаться другого процесса."""
+        lock = LOCK_PREFIX + key
+        if self.shared.add(lock, 1, LOCK_TIMEOUT):
+            try:
+                return self._load(key, loader, ttl, stale_ttl, tags)
+            finally:
+                self.shared.delete(lock)
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            entry, _ = self._lookup(key, time.monotonic(), time.time())
+            if entry is not None:
+                return None if entry.value is _MISSING else entry.value
+            if self.shared.get(lock) is None:
+                break
+        return self._load(key, loader, ttl, stale_ttl, tags)
+
+    def _single_flight(self, key, loader, ttl, stale_ttl, tags):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = self._load_shared(key, loader, ttl, stale_ttl, tags)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _refresh_in_background(self, key, loader, ttl, stale_ttl, tags):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._single_flight(key, loader, ttl, stale_ttl, tags)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+                connections.close_all()
+
+        threading.Thread(target=refresh, name=f'cache-refresh:{key}', daemon=True).start()
+
+    def get_or_load(self, key, loader, ttl=None, stale_ttl=None, tags=()):
+        """Значение по ключу; при промахе — ``loader()``.
+
+        ``tags`` — список тегов или функция ``tags(value)``; ``None`` от
+        загрузчика тоже кэшируется.
+        """
+        ttl = DEFAULT_TTL if ttl is None else ttl
+        stale_ttl = DEFAULT_STALE_TTL if stale_ttl is None else stale_ttl
+        now, wall = time.monotonic(), time.time()
+        cache_name = key.split(':', 1)[0]
+        entry, shared = self._lookup(key, now, wall)
+        if entry is not None:
+            if wall >= entry.fresh_until:
+                self.stale_hits += 1
+                result = 'stale'
+                self._refresh_in_background(key, loader, ttl, stale_ttl, tags)
+            elif shared:
+                self.shared_hits += 1
+                result = 'shared'
+            else:
+                self.hits += 1
+                result = 'hit'
+            metrics.CACHE_REQUESTS.inc(cache=cache_name, result=result)
+            return None if entry.value is _MISSING else entry.value
+        self.misses += 1
+        metrics.CACHE_REQUESTS.inc(cache=cache_name, result='miss')
+        return self._single_flight(key, loader, ttl, stale_ttl, tags)
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+            self._invalidated_at.clear()
+
+
+tiered_cache = TieredCache()
+
+
+def get_or_load(key, loader, ttl=None, stale_ttl=None, tags=()):
+    return tiered_cache.get_or_load(key, loader, ttl=ttl, stale_ttl=stale_ttl, tags=tags)
+
+
+def invalidate_tags(*tags):
+    tiered_cache.invalidate_tags(*tags)
+
+
+def tag_versions(*tags):
+    """Текущие версии тегов — для данных, которые хранятся вне кэша, и для ETag."""
+    return tiered_cache._versions(list(tags))
+
+
+def word_tag(word_id):
+    return f'word:{word_id}'
+
+
+def invalidate_words(word_ids, listings=True):
+    """Сбросить записи слов (и при ``listings`` — списки слов).
+
+    Сбрасывает сразу и ещё раз после фиксации транзакции: иначе параллельный
+    запрос успел бы закэшировать данные, прочитанные до фиксации.
+    """
+    tags = [word_tag(word_id) for word_id in set(word_ids)]
+    if not tags:
+        return
+    if listings:
+        tags.append(WORDS_TAG)
+    invalidate_tags(*tags)
+    transaction.on_commit(lambda: invalidate_tags(*tags))
+
+
+def make_key(prefix, *args, **kwargs):
+    raw = repr((args, sorted(kwargs.items())))
+    return f'{prefix}:{hashlib.md5(raw.encode("utf-8")).hexdigest()}'
+
+
+def cached(prefix, ttl=None, stale_ttl=None, tags=()):
+    """Декоратор: кэшировать результат функции по её аргументам.
+
+    ``tags`` — список тегов или функция ``tags(результат, *args, **kwargs)``.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            entry_tags = (lambda value: tags(value, *args, **kwargs)) if callable(tags) else tags
+            return get_or_load(
+                make_key(prefix, *args, **kwargs),
+                lambda: func(*args, **kwargs),
+                ttl=ttl,
+                stale_ttl=stale_ttl,
+                tags=entry_tags,
+            )
+        return wrapper
+    return decorator
+
+
+class ChangeFeed:
+    """Журнал изменений структуры в памяти процессов, общий через кэш.
+
+    ``publish(changes)`` берёт следующий номер поколения и сохраняет под ним
+    список изменений. Процесс, который знает своё поколение, забирает
+    изменения после него (``since``) и применяет их к своей копии вместо
+    полной перестройки. Если изменения не восстановить (записи истекли,
+    процесс отстал больше чем на ``max_behind`` поколений, кэш очищен), ``since``
+    возвращает ``None`` — структуру нужно перечитать из БД.
+
+    Изменения должны быть идемпотентны: процесс получает обратно и свои.
+    """
+
+    def __init__(self, name, ttl=DEFAULT_CHANGES_TTL, max_behind=DEFAULT_CHANGES_MAX_BEHIND):
+        self.generation_key = f'{CHANGES_PREFIX}{name}:generation'
+        self._entry_prefix = f'{CHANGES_PREFIX}{name}:'
+        self.ttl = ttl
+        self.max_behind = max_behind
+
+    @property
+    def shared(self):
+        return caches[getattr(settings, 'CACHE_SHARED_ALIAS', 'default')]
+
+    def _entry_key(self, generation):
+        return f'{self._entry_prefix}{generation}'
+
+    def current(self):
+        """Текущее поколение (0, пока изменений не было)."""
+        generation = self.shared.get(self.generation_key)
+        if generation is None:
+            self.shared.add(self.generation_key, 0, None)
+            generation = self.shared.get(self.generation_key, 0)
+        return generation
+
+    def _next(self):
+        try:
+            return self.shared.incr(self.generation_key)
+        except ValueError:
+            # Счётчика ещё нет или его вытеснили из кэша
+            self.current()
+            return self.shared.incr(self.generation_key)
+
+    def publish(self, changes):
+        changes = list(changes)
+        if not changes:
+            return
+        generation = self._next()
+        if not self.shared.add(self._entry_key(generation), changes, self.ttl):
+            # Номер достался двум процессам (в бэкенде с неатомарным incr) —
+            # чьи-то изменения потеряны, пусть все перечитают структуру
+            self.shared.set(self._entry_key(self._next()), _RELOAD, self.ttl)
+
+    def publish_on_commit(self, changes):
+        """Опубликовать после фиксации транзакции: другие процессы не увидят отменённых изменений."""
+        changes = list(changes)
+        if changes:
+            transaction.on_commit(lambda: self.publish(changes))
+
+    def since(self, generation):
+        """``(текущее поколение, изменения после generation)``; изменения — ``None``, если их не восстановить."""
+        current = self.current()
+        if generation is None or current < generation or current - generation > self.max_behind:
+            return current, None
+        keys = [self._entry_key(number) for number in range(generation + 1, current + 1)]
+        found = self.shared.get_many(keys) if keys else {}
+        changes = []
+        for key in keys:
+            entry = found.get(key)
+            if entry is None or entry == _RELOAD:
+                return current, None
+            changes.extend(entry)
+        return current, changes
+
+
+class FileBasedCache(filebased.FileBasedCache):
+    """Файловый кэш Django, который проверяет переполнение не при каждой записи.
+
+    Штатный ``FileBasedCache`` перед каждым ``set`` перечисляет все файлы
+    каталога, чтобы сравнить их число с ``MAX_ENTRIES``; при тысячах записей
+    массовый сброс тегов становится квадратичным. Здесь каталог проверяется
+    не чаще раза в ``OPTIONS['CULL_INTERVAL']`` секунд (по умолчанию 5) на
+    процесс, и ``MAX_ENTRIES`` может ненадолго превышаться.
+
+    ``add`` и ``incr`` штатного кэша — это чтение и запись без блокировки: два
+    процесса могут оба «взять» блокировку загрузки или получить один номер
+    поколения ``ChangeFeed``. Здесь они выполняются под ``flock`` файла
+    ``LOCK_FILE`` в каталоге кэша.
+    """
+
+    LOCK_FILE = 'atomic.lock'
+    _process_lock = threading.Lock()   # без fcntl
+
+    _culled_at = {}   # каталог -> время последней проверки; экземпляры кэша свои у каждого потока
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self._cull_interval = float(params.get('OPTIONS', {}).get('CULL_INTERVAL', 5))
+
+    def _cull(self):
+        now = time.monotonic()
+        if now - self._culled_at.get(self._dir, float('-inf')) < self._cull_interval:
+            return
+        self._culled_at[self._dir] = now
+        super()._cull()
+
+    @contextmanager
+    def _atomic(self):
+        if fcntl is None:
+            with self._process_lock:
+                yield
+            return
+        os.makedirs(self._dir, 0o700, exist_ok=True)
+        # Блокировка flock принадлежит открытому файлу, поэтому исключает и потоки одного процесса
+        with open(os.path.join(self._dir, self.LOCK_FILE), 'a') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._atomic():
+            return super().add(key, value, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        with self._atomic():
+            return super().incr(key, delta, version)
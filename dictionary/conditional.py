@@ -0,0 +1,111 @@
+"""ETag и Last-Modified для условных GET-запросов (``django.views.decorators.http.condition``).
+
+Версии считаются по журналу синхронизации (``SyncChange``): любое изменение
+слова, его тегов, примеров и переводов (в том числе целевых слов) переносит
+их строки журнала в конец с новым ``seq``. Поэтому состояние страницы слова —
+это наибольший ``seq`` и ``changed_at`` среди строк самого слова, его
+переводов и слов на путях через промежуточные языки (пути берутся из графа
+переводов в памяти; один запрос по индексу), а состояние всего словаря для
+API — последняя строка журнала (один запрос по первичному ключу).
+
+Страница слова зависит ещё от пользователя (кнопки для персонала, язык
+названий тегов), от переводов названий (тег ``names`` в ``dictionary.caching``)
+и от графа переводов — их версии берутся из сессии и кэша и входят в ETag. Результаты запросов запоминаются
+на объекте запроса, чтобы ETag и Last-Modified не читали БД дважды.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Max, Q
+
+from . import caching, sync
+from .graph import GENERATION_CACHE_KEY as GRAPH_GENERATION_CACHE_KEY, get_translation_graph
+from .snapshot import get_snapshot
+
+
+def make_etag(*parts):
+    return hashlib.md5('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+
+def _memo(request, key, compute):
+    memo = request.__dict__.setdefault('_dictionary_conditional', {})
+    if key not in memo:
+        memo[key] = compute()
+    return memo[key]
+
+
+def latest_change(request):
+    """``(seq, changed_at)`` последнего изменения словаря или ``(0, None)``."""
+    from .models import SyncChange
+
+    def compute():
+        return SyncChange.objects.order_by('-seq').values_list('seq', 'changed_at').first() or (0, None)
+
+    return _memo(request, 'latest', compute)
+
+
+def word_state(request, word_id):
+    """``(seq, changed_at)`` последнего изменения слова, его переводов или слов переводов через другие языки."""
+    from .models import SyncChange, Translation
+
+    def compute():
+        # Текст и видимость слов на пути kk→ru→tr показываются на странице,
+        # а строки журнала их переводов с этим словом не связаны
+        via_ids = {
+            via_id
+            for path in get_translation_graph().lookup(word_id) if path.hops > 1
+            for via_id in path.path[1:]
+        }
+        state = SyncChange.objects.filter(
+            Q(model=sync.WORD, object_id__in=[word_id, *via_ids])
+            | Q(model=sync.TRANSLATION, object_id__in=Translation.objects.filter(from_word_id=word_id).values('id'))
+        ).aggregate(seq=Max('seq'), changed_at=Max('changed_at'))
+        return state['seq'] or 0, state['changed_at']
+
+    return _memo(request, ('word', word_id), compute)
+
+
+def _viewer(request):
+    """Часть ETag, зависящая от того, кто и на каком языке смотрит страницу."""
+    return (
+        request.user.pk if request.user.is_authenticated else '',
+        request.session.get('language', 'ru'),
+        getattr(request, 'LANGUAGE_CODE', ''),
+    )
+
+
+def word_etag(request, word_id):
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return make_etag('snapshot', word_id, snapshot.signature, *_viewer(request))
+    seq, _ = word_state(request, word_id)
+    return make_etag(
+        'word', word_id, seq, caching.tag_versions(caching.NAMES_TAG), cache.get(GRAPH_GENERATION_CACHE_KEY),
+        *_viewer(request),
+    )
+
+
+def word_last_modified(request, word_id):
+    if get_snapshot() is not None:
+        return None
+    return word_state(request, word_id)[1]
+
+
+def dictionary_etag(request, *args, **kwargs):
+    """ETag ответа API, который зависит только от параметров запроса и содержимого словаря."""
+    seq, _ = latest_change(request)
+    return make_etag(request.path, sorted(request.GET.lists()), seq)
+
+
+def dictionary_last_modified(request, *args, **kwargs):
+    return latest_change(request)[1]
+
+
+def search_etag(request):
+    """ETag автодополнения в ``translation_search``; у обычной страницы поиска ETag нет."""
+    if request.headers.get('X-Requested-With') != 'XMLHttpRequest':
+        return None
+    snapshot = get_snapshot()
+    if snapshot is not None and request.GET.get('fuzzy') != '1':
+        return make_etag('snapshot', sorted(request.GET.lists()), snapshot.signature)
+    return dictionary_etag(request)
@@ -0,0 +1,126 @@
+"""Матрица покрытия переводами: элемент × язык.
+
+Строится для категорий, тегов и ключей интерфейса одним проходом: по одному
+запросу на список языков, категорий и тегов и по одному сгруппированному
+запросу на каждую модель переводов. Из матрицы считаются и итоги по языкам,
+поэтому дашборды не делают запросов в цикле.
+
+Результат — обычные словари и списки (годятся и для шаблонов, и для JSON)
+и кэшируется в ``dictionary.caching`` на ``COVERAGE_CACHE_TIMEOUT`` секунд с
+тегами ``taxonomy`` и ``names``: изменения языков, категорий, тегов и переводов
+названий сбрасывают кэш сразу (см. ``dictionary.signals``).
+"""
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+
+from . import caching
+
+
+def _percentage(part, total):
+    return round(part / total * 100) if total else 0
+
+
+def _item_rows(items, names_by_item, language_codes):
+    """Строки матрицы для категорий или тегов."""
+    rows = []
+    for item_id, code in items:
+        names = names_by_item.get(item_id, {})
+        translated = sum(1 for language_code in language_codes if language_code in names)
+        rows.append({
+            'id': item_id,
+            'code': code,
+            'names': {language_code: names[language_code] for language_code in language_codes if language_code in names},
+            'missing': [language_code for language_code in language_codes if language_code not in names],
+            'translated': translated,
+            'total': len(language_codes),
+            'percentage': _percentage(translated, len(language_codes)),
+        })
+    return rows
+
+
+def _section(rows):
+    return {
+        'total': len(rows),
+        'complete': sum(1 for row in rows if row['percentage'] == 100),
+        'empty': sum(1 for row in rows if row['translated'] == 0),
+        'items': rows,
+    }
+
+
+def build_matrix():
+    """Построить матрицу покрытия без кэша."""
+    from .models import Category, CategoryTranslation, InterfaceTranslation, Language, Tag, TagTranslation
+
+    languages = list(Language.objects.order_by('code').values('id', 'code', 'name'))
+    codes = {language['id']: language['code'] for language in languages}
+    language_codes = [language['code'] for language in languages]
+
+    category_names = {}
+    for category_id, language_id, name in CategoryTranslation.objects.values_list('category_id', 'language_id', 'name'):
+        category_names.setdefault(category_id, {})[codes[language_id]] = name
+    tag_names = {}
+    for tag_id, language_id, name in TagTranslation.objects.values_list('tag_id', 'language_id', 'name'):
+        tag_names.setdefault(tag_id, {})[codes[language_id]] = name
+
+    categories = _section(_item_rows(
+        Category.objects.order_by('code').values_list('id', 'code'), category_names, language_codes
+    ))
+    tags = _section(_item_rows(
+        Tag.objects.order_by('code').values_list('id', 'code'), tag_names, language_codes
+    ))
+
+    # Ключи интерфейса: для каждого ключа — число языков, на которые он переведён,
+    # и для каждого языка — число переведённых ключей
+    key_counts = dict(
+        InterfaceTranslation.objects.values_list('key').annotate(count=Count('language', distinct=True)).order_by()
+    )
+    interface_by_language = dict(
+        InterfaceTranslation.objects.values_list('language_id').annotate(count=Count('key', distinct=True)).order_by()
+    )
+    total_keys = len(key_counts)
+    interface = {
+        'total': total_keys,
+        'complete': sum(1 for count in key_counts.values() if count >= len(language_codes)),
+        'items': [
+            {'key': key, 'translated': count, 'percentage': _percentage(count, len(language_codes))}
+            for key, count in sorted(key_counts.items())
+        ],
+    }
+
+    total_items = categories['total'] + tags['total']
+    by_language = {}
+    for language in languages:
+        code = language['code']
+        category_translations = sum(1 for row in categories['items'] if code in row['names'])
+        tag_translations = sum(1 for row in tags['items'] if code in row['names'])
+        interface_translations = interface_by_language.get(language['id'], 0)
+        by_language[code] = {
+            'language': language,
+            'category_translations': category_translations,
+            'tag_translations': tag_translations,
+            'interface_translations': interface_translations,
+            'interface_percentage': _percentage(interface_translations, total_keys),
+            'total_items': total_items,
+            'total_translations': category_translations + tag_translations,
+            'percentage': _percentage(category_translations + tag_translations, total_items),
+        }
+
+    return {
+        'generated_at': timezone.now().isoformat(),
+        'languages': languages,
+        'categories': categories,
+        'tags': tags,
+        'interface': interface,
+        'by_language': by_language,
+    }
+
+
+def get_matrix():
+    """Матрица покрытия из кэша (или построенная заново)."""
+    return caching.get_or_load(
+        'coverage',
+        build_matrix,
+        ttl=getattr(settings, 'COVERAGE_CACHE_TIMEOUT', 60),
+        tags=[caching.TAXONOMY_TAG, caching.NAMES_TAG],
+    )
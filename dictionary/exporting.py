@@ -0,0 +1,185 @@
+"""Потоковый экспорт словаря в NDJSON, CSV и TBX.
+
+Одобренные слова читаются через ``.iterator(chunk_size=...)`` и
+обрабатываются порциями: на каждую порцию приходится ровно три запроса
+(переводы, теги, примеры), поэтому число запросов растёт линейно с числом
+порций, а память не зависит от размера словаря. Функции возвращают
+генераторы строк — их можно отдать в ``StreamingHttpResponse`` или писать
+в файл (команда ``export_terms``).
+
+Столбцы CSV совпадают с форматом ``import_terms``, так что выгрузку можно
+загрузить обратно.
+"""
+import csv
+import datetime
+import json
+from itertools import islice
+from xml.sax.saxutils import escape, quoteattr
+
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.timezone import is_naive, make_aware
+
+from .importing import LIST_SEPARATOR, TRANSLATION_SEPARATOR
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+    'tbx': 'application/x-tbx+xml; charset=utf-8',
+}
+
+CHUNK_SIZE = 2000
+
+CSV_COLUMNS = [
+    'id', 'language', 'word', 'meaning', 'pronunciation', 'category', 'status',
+    'difficulty', 'tags', 'examples', 'translations', 'updated_at',
+]
+
+WORD_FIELDS = (
+    'id', 'word', 'meaning', 'pronunciation', 'status', 'difficulty', 'updated_at',
+    'language__code', 'category__code',
+)
+
+
+def parse_moment(value, end=False):
+    """Дата или дата-время из фильтра; дата без времени — начало (или конец) дня."""
+    if not value:
+        return None
+    # Сначала дата: parse_datetime в Python 3.11 принимает и дату без времени (как полночь)
+    day = parse_date(value)
+    if day is not None:
+        moment = datetime.datetime.combine(day, datetime.time.max if end else datetime.time.min)
+    else:
+        moment = parse_datetime(value)
+        if moment is None:
+            raise ValueError(f'Некорректная дата: {value}')
+    if is_naive(moment):
+        moment = make_aware(moment)
+    return moment
+
+
+def export_queryset(language=None, category=None, updated_from=None, updated_to=None):
+    """Одобренные слова с учётом фильтров, по возрастанию id."""
+    from .models import Word
+
+    words = Word.objects.filter(status='approved', is_deleted=False)
+    if language:
+        words = words.filter(language__code=language)
+    if category:
+        words = words.filter(category_id=category) if str(category).isdigit() else words.filter(category__code=category)
+    if updated_from:
+        words = words.filter(updated_at__gte=updated_from)
+    if updated_to:
+        words = words.filter(updated_at__lte=updated_to)
+    return words.order_by('id')
+
+
+def iter_entries(queryset, chunk_size=CHUNK_SIZE):
+    """Записи слов с тегами, примерами и переводами, порциями по ``chunk_size``."""
+    from .models import Example, Translation, Word
+
+    rows = queryset.values(*WORD_FIELDS).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        ids = [row['id'] for row in chunk]
+
+        tags = {}
+        for word_id, code in Word.tags.through.objects.filter(word_id__in=ids).values_list('word_id', 'tag__code'):
+            tags.setdefault(word_id, []).append(code)
+        examples = {}
+        for word_id, text in Example.objects.filter(word_id__in=ids).order_by('id').values_list('word_id', 'text'):
+            examples.setdefault(word_id, []).append(text)
+        translations = {}
+        for word_id, code, text in (
+            Translation.objects.filter(from_word_id__in=ids, status='approved', to_word__is_deleted=False)
+            .order_by('order', 'id')
+            .values_list('from_word_id', 'to_word__language__code', 'to_word__word')
+        ):
+            translations.setdefault(word_id, []).append({'language': code, 'word': text})
+
+        for row in chunk:
+            yield {
+                'id': row['id'],
+                'language': row['language__code'],
+                'word': row['word'],
+                'meaning': row['meaning'],
+                'pronunciation': row['pronunciation'],
+                'category': row['category__code'] or '',
+                'status': row['status'],
+                'difficulty': row['difficulty'],
+                'tags': sorted(tags.get(row['id'], [])),
+                'examples': examples.get(row['id'], []),
+                'translations': translations.get(row['id'], []),
+                'updated_at': row['updated_at'].isoformat() if row['updated_at'] else None,
+            }
+
+
+def render_ndjson(entries):
+    for entry in entries:
+        yield json.dumps(entry, ensure_ascii=False) + '\n'
+
+
+class _Echo:
+    """Псевдофайл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def render_csv(entries):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for entry in entries:
+        yield writer.writerow([
+            entry['id'], entry['language'], entry['word'], entry['meaning'], entry['pronunciation'],
+            entry['category'], entry['status'], entry['difficulty'],
+            LIST_SEPARATOR.join(entry['tags']),
+            LIST_SEPARATOR.join(entry['examples']),
+            LIST_SEPARATOR.join(
+                f"{item['language']}{TRANSLATION_SEPARATOR}{item['word']}" for item in entry['translations']
+            ),
+            entry['updated_at'] or '',
+        ])
+
+
+def render_tbx(entries, source_language='ru'):
+    """TBX-Basic: одна понятийная статья на слово, переводы — в языковых секциях."""
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield (
+        f'<tbx type="TBX-Basic" style="dca" xml:lang={quoteattr(source_language)} '
+        'xmlns="urn:iso:std:iso:30042:ed-2">\n'
+        '<tbxHeader><fileDesc><sourceDesc><p>dict_app</p></sourceDesc></fileDesc></tbxHeader>\n'
+        '<text><body>\n'
+    )
+    for entry in entries:
+        parts = [f'<conceptEntry id="w{entry["id"]}">']
+        if entry['category']:
+            parts.append(f'<descrip type="subjectField">{escape(entry["category"])}</descrip>')
+        parts.append(f'<langSec xml:lang={quoteattr(entry["language"])}><termSec>')
+        parts.append(f'<term>{escape(entry["word"])}</term>')
+        if entry['meaning']:
+            parts.append(f'<descrip type="definition">{escape(entry["meaning"])}</descrip>')
+        for example in entry['examples']:
+            parts.append(f'<descrip type="context">{escape(example)}</descrip>')
+        parts.append('</termSec></langSec>')
+        by_language = {}
+        for item in entry['translations']:
+            by_language.setdefault(item['language'], []).append(item['word'])
+        for code, terms in by_language.items():
+            parts.append(f'<langSec xml:lang={quoteattr(code)}>')
+            parts.extend(f'<termSec><term>{escape(term)}</term></termSec>' for term in terms)
+            parts.append('</langSec>')
+        parts.append('</conceptEntry>\n')
+        yield ''.join(parts)
+    yield '</body></text>\n</tbx>\n'
+
+
+def render(file_format, entries, **options):
+    if file_format == 'ndjson':
+        return render_ndjson(entries)
+    if file_format == 'csv':
+        return render_csv(entries)
+    if file_format == 'tbx':
+        return render_tbx(entries, **options)
+    raise ValueError(f'Неизвестный формат: {file_format}')
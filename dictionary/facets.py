@@ -0,0 +1,78 @@
+"""Счётчики фасетов для фильтров главной страницы.
+
+Для текущего состояния фильтров (запрос, язык, категория, тег) считается
+число одобренных слов по каждому языку, категории и тегу. Все три группировки
+объединяются через ``UNION ALL`` и выполняются одним запросом.
+
+Счётчики фасета не учитывают фильтр по самому этому фасету: при выбранном
+языке в списке языков видно, сколько слов нашлось бы на других языках.
+
+Результат кэшируется в ``dictionary.caching`` по комбинации фильтров с тегами
+``words`` и ``taxonomy``: изменения слов (статус, удаление, теги) и справочников
+сбрасывают все сохранённые счётчики.
+"""
+from django.conf import settings
+from django.db.models import CharField, Count, F, Value
+
+from . import caching
+from .search import search_filter
+
+FACETS = ('language', 'category', 'tag')
+
+# Поле Word, по которому группируется каждый фасет
+_FACET_FIELDS = {
+    'language': 'language_id',
+    'category': 'category_id',
+    'tag': 'tags',
+}
+
+
+def _filtered_words(filters, exclude):
+    from .models import Word
+
+    words = Word.objects.filter(status='approved', is_deleted=False)
+    if filters.get('query'):
+        words = words.filter(search_filter(filters['query']))
+    if filters.get('language') and exclude != 'language':
+        words = words.filter(language__code=filters['language'])
+    if filters.get('category') and exclude != 'category':
+        words = words.filter(category_id=filters['category'])
+    if filters.get('tag') and exclude != 'tag':
+        words = words.filter(tags__id=filters['tag'])
+    return words
+
+
+def _facet_query(filters, facet):
+    field = _FACET_FIELDS[facet]
+    return (
+        _filtered_words(filters, exclude=facet)
+        .filter(**{f'{field}__isnull': False})
+        .annotate(facet=Value(facet, output_field=CharField()), value=F(field))
+        .values('facet', 'value')
+        .annotate(count=Count('id', distinct=True))
+        .order_by()
+    )
+
+
+def compute_counts(filters):
+    """Счётчики без кэша: ``{'language': {id: n}, 'category': {...}, 'tag': {...}}``."""
+    first, *rest = [_facet_query(filters, facet) for facet in FACETS]
+    counts = {facet: {} for facet in FACETS}
+    for row in first.union(*rest, all=True):
+        counts[row['facet']][row['value']] = row['count']
+    return counts
+
+
+def get_counts(query='', language='', category='', tag=''):
+    """Счётчики фасетов для комбинации фильтров (из кэша, если есть).
+
+    Пустые значения фильтров означают «без фильтра». Ключи словарей —
+    id языка, категории и тега.
+    """
+    filters = {'query': query, 'language': language, 'category': str(category), 'tag': str(tag)}
+    return caching.get_or_load(
+        caching.make_key('facets', **filters),
+        lambda: compute_counts(filters),
+        ttl=getattr(settings, 'FACET_CACHE_TIMEOUT', 600),
+        tags=[caching.WORDS_TAG, caching.TAXONOMY_TAG],
+    )
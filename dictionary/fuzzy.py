@@ -0,0 +1,187 @@
+"""Нечёткий поиск слов с опечатками.
+
+Каждое слово раскладывается на символьные триграммы (как в pg_trgm: слово
+дополняется двумя пробелами слева и одним справа) и хранится в таблице
+``WordTrigram`` с индексом ``(trigram, language)``. Триграммы строятся по
+``Word.search_key``, то есть по правилам регистра и диакритики языка слова
+(``'İ'.casefold()`` дал бы «i» с комбинирующей точкой). Запрос нормализуется
+так же — для каждого языка по его правилам.
+
+Кандидаты выбираются одним сгруппированным запросом по индексу: из каждой
+триграммы запроса берётся не больше ``POSTING_LIMIT`` вхождений, поэтому частые
+триграммы (« к», «ова») не тянут в агрегацию половину словаря. Кандидаты
+ранжируются по числу общих триграмм и переупорядочиваются по ограниченному
+расстоянию Левенштейна. Таблица слов при этом не сканируется.
+"""
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db import connection
+from django.db.models import Count, Q
+
+from .models import Word, WordTrigram
+from .normalization import normalize_word
+from .search import languages
+
+# Сколько кандидатов брать из индекса перед переранжированием
+CANDIDATE_LIMIT = 50
+# Сколько вхождений одной триграммы участвует в агрегации
+POSTING_LIMIT = 1000
+# Минимальная доля общих триграмм (коэффициент Жаккара)
+MIN_SIMILARITY = 0.2
+
+
+def make_trigrams(key):
+    """Множество триграмм нормализованной строки (``Word.search_key``)."""
+    trigrams = set()
+    for token in key.split(' '):
+        if not token:
+            continue
+        padded = f'  {token} '
+        trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+
+def bounded_levenshtein(a, b, bound):
+    """Расстояние Левенштейна между ``a`` и ``b`` или ``bound + 1``, если оно больше ``bound``."""
+    if abs(len(a) - len(b)) > bound:
+        return bound + 1
+    if len(a) > len(b):
+        a, b = b, a
+    previous = list(range(len(a) + 1))
+    for j, char_b in enumerate(b, 1):
+        current = [j]
+        for i, char_a in enumerate(a, 1):
+            current.append(min(
+                previous[i] + 1,
+                current[i - 1] + 1,
+                previous[i - 1] + (char_a != char_b),
+            ))
+        if min(current) > bound:
+            return bound + 1
+        previous = current
+    return min(previous[-1], bound + 1)
+
+
+def max_distance(query):
+    """Допустимое число опечаток зависит от длины запроса."""
+    return max(1, len(query) // 4)
+
+
+def index_word(word):
+    """Пересобрать триграммы одного слова, если его текст или язык изменились после загрузки из БД."""
+    if getattr(word, '_indexed_text', None) == (word.word, word.language_id):
+        return
+    WordTrigram.objects.filter(word_id=word.id).delete()
+    WordTrigram.objects.bulk_create([
+        WordTrigram(word_id=word.id, language_id=word.language_id, trigram=trigram)
+        for trigram in make_trigrams(word.search_key)
+    ])
+
+
+def index_words(words):
+    """Пересобрать триграммы нескольких слов (после bulk_create, без сигналов).
+
+    Строк триграмм в несколько раз больше, чем слов, поэтому они вставляются
+    через ``executemany`` без создания экземпляров модели.
+    """
+    words = list(words)
+    if not words:
+        return
+    WordTrigram.objects.filter(word_id__in=[word.id for word in words]).delete()
+    table = connection.ops.quote_name(WordTrigram._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {table} (word_id, language_id, trigram) VALUES (%s, %s, %s)',
+            [
+                (word.id, word.language_id, trigram)
+                for word in words
+                for trigram in make_trigrams(word.search_key)
+            ],
+        )
+
+
+def rebuild_index(batch_size=2000):
+    """Пересобрать весь индекс триграмм. Возвращает число проиндексированных слов."""
+    WordTrigram.objects.all().delete()
+    batch = []
+    count = 0
+    rows = Word.objects.values_list('id', 'language_id', 'search_key').iterator(chunk_size=batch_size)
+    for word_id, language_id, key in rows:
+        batch.extend(
+            WordTrigram(word_id=word_id, language_id=language_id, trigram=trigram)
+            for trigram in make_trigrams(key)
+        )
+        count += 1
+        if len(batch) >= batch_size:
+            WordTrigram.objects.bulk_create(batch)
+            batch = []
+    WordTrigram.objects.bulk_create(batch)
+    return count
+
+
+def query_keys(query, language=None):
+    """Ключи запроса по языкам: ``{language_id: search_key}``.
+
+    ``language`` — код языка; без него запрос нормализуется для каждого языка.
+    """
+    return {
+        language_id: key
+        for language_id, code in languages()
+        if language in (None, code)
+        for key in [normalize_word(query, code)]
+        if key
+    }
+
+
+def _capped_postings(keys):
+    """Вхождения триграмм ключей, не больше ``POSTING_LIMIT`` на триграмму."""
+    languages_by_trigram = defaultdict(set)
+    for language_id, key in keys.items():
+        for trigram in make_trigrams(key):
+            languages_by_trigram[trigram].add(language_id)
+    return reduce(or_, (
+        Q(pk__in=WordTrigram.objects.filter(trigram=trigram, language_id__in=language_ids)
+          .values('pk')[:POSTING_LIMIT])
+        for trigram, language_ids in sorted(languages_by_trigram.items())
+    ))
+
+
+def fuzzy_search(query, language=None, approved_only=True, limit=10):
+    """Найти слова, похожие на ``query``, с учётом опечаток.
+
+    Ищутся не удалённые слова (при ``approved_only`` — только одобренные),
+    ``language`` — код языка. Возвращает список ``Word`` с атрибутами
+    ``similarity`` и ``distance``, лучшие первыми.
+    """
+    keys = query_keys(query, language)
+    if not keys:
+        return []
+
+    postings = WordTrigram.objects.filter(_capped_postings(keys), word__is_deleted=False)
+    if approved_only:
+        postings = postings.filter(word__status='approved')
+    candidates = (
+        postings.values('word_id')
+        .annotate(shared=Count('id'))
+        .order_by('-shared', 'word_id')[:CANDIDATE_LIMIT]
+    )
+    shared_by_id = {row['word_id']: row['shared'] for row in candidates}
+    if not shared_by_id:
+        return []
+
+    results = []
+    words = Word.objects.filter(id__in=shared_by_id).select_related('language', 'category')
+    for word in words:
+        key = keys[word.language_id]
+        bound = max_distance(key)
+        query_trigrams, word_trigrams = make_trigrams(key), make_trigrams(word.search_key)
+        shared = shared_by_id[word.id]
+        word.similarity = shared / (len(query_trigrams) + len(word_trigrams) - shared)
+        word.distance = bounded_levenshtein(key, word.search_key, bound)
+        if word.similarity >= MIN_SIMILARITY or word.distance <= bound:
+            results.append(word)
+
+    results.sort(key=lambda w: (w.distance, -w.similarity, w.word))
+    return results[:limit]
@@ -0,0 +1,369 @@
+"""Граф переводов для поиска через промежуточные языки.
+
+Одобренные переводы (``Translation``) — направленные рёбра между словами.
+Граф хранится в памяти процесса компактно, в формате CSR: слова нумеруются
+подряд (узлы), ``offsets[u]:offsets[u + 1]`` — срез ``targets`` с соседями
+узла ``u``. Это по 4–8 байт на узел и ребро вместо словарей и множеств, поэтому
+граф на несколько миллионов рёбер занимает десятки мегабайт (см. команду
+``benchmark_translation_graph``).
+
+Изменения применяются инкрементально через сигналы ``Translation``: новые
+рёбра попадают в небольшую дельту (словарь добавленных и множество удалённых),
+которая вливается в массивы, когда разрастается. После фиксации транзакции
+изменённые рёбра публикуются в журнал ``caching.ChangeFeed``, и другие процессы
+применяют их к своему графу так же инкрементально. Целиком граф перечитывается,
+только если изменения не восстановить из журнала, и раз в
+``TRANSLATION_GRAPH_TTL`` секунд; перечитывает его один поток процесса.
+
+``lookup()`` ищет в ширину кратчайшие пути от слова к словам нужного языка
+с ограничением на число переходов (например, kk→ru→tr, когда прямого
+перевода kk→tr нет).
+"""
+import threading
+import time
+from array import array
+from collections import deque, namedtuple
+
+from django.conf import settings
+
+from .caching import ChangeFeed
+
+changes = ChangeFeed('translation_graph')
+# Меняется при каждом изменении графа (входит в ETag страницы слова)
+GENERATION_CACHE_KEY = changes.generation_key
+
+DEFAULT_MAX_HOPS = 3
+
+# Дельта вливается в массивы, когда превышает эту долю рёбер (но не раньше MIN)
+COMPACT_RATIO = 0.05
+COMPACT_MIN = 1000
+
+# Изменения в журнале: добавление и удаление ребра
+ADD = 'add'
+REMOVE = 'remove'
+
+# Найденный путь: конечное слово, число переходов и все слова пути (включая оба конца)
+Path = namedtuple('Path', 'word_id hops path')
+
+
+class TranslationGraph:
+    """Направленный граф слов в формате CSR с дельтой изменений."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._ids = array('q')          # узел -> word_id
+        self._languages = array('i')    # узел -> language_id
+        self._nodes = {}                # word_id -> узел
+        self._offsets = array('q', [0])
+        self._targets = array('i')
+        self._added = {}                # узел -> {узел, ...} (рёбра вне массивов)
+        self._removed = set()           # {(узел, узел)} (удалённые рёбра из массивов)
+        self._delta_size = 0
+        self.loaded = False
+        self.loaded_at = 0
+        self.generation = None
+
+    # Построение
+
+    @classmethod
+    def from_edges(cls, edges, word_languages):
+        """Граф из пар ``(from_word_id, to_word_id)`` и словаря ``{word_id: language_id}``."""
+        graph = cls()
+        graph._build(edges, word_languages)
+        return graph
+
+    def _build(self, edges, word_languages):
+        ids, languages, nodes = array('q'), array('i'), {}
+
+        def node_of(word_id):
+            node = nodes.get(word_id)
+            if node is None:
+                node = nodes[word_id] = len(ids)
+                ids.append(word_id)
+                languages.append(word_languages[word_id])
+            return node
+
+        sources, targets = array('i'), array('i')
+        for from_id, to_id in edges:
+            sources.append(node_of(from_id))
+            targets.append(node_of(to_id))
+        offsets, ordered = _to_csr(len(ids), sources, targets)
+
+        with self._lock:
+            self._ids, self._languages, self._nodes = ids, languages, nodes
+            self._offsets, self._targets = offsets, ordered
+            self._added, self._removed, self._delta_size = {}, set(), 0
+            self.loaded = True
+            self.loaded_at = time.monotonic()
+
+    def load(self):
+        """Перечитать все одобренные рёбра из БД (один запрос)."""
+        from .models import Translation
+
+        # Поколение читается до запроса: изменения, опубликованные во время
+        # загрузки, ещё раз придут из журнала (они идемпотентны)
+        generation = changes.current()
+        rows = (
+            Translation.objects.filter(
+                status='approved', from_word__is_deleted=False, to_word__is_deleted=False,
+            )
+            .values_list('from_word_id', 'from_word__language_id', 'to_word_id', 'to_word__language_id')
+            .order_by()
+            .iterator(chunk_size=10000)
+        )
+        word_languages = {}
+
+        def edges():
+            for from_id, from_language, to_id, to_language in rows:
+                word_languages[from_id] = from_language
+                word_languages[to_id] = to_language
+                yield from_id, to_id
+
+        self._build(edges(), word_languages)
+        self.generation = generation
+
+    def invalidate(self):
+        with self._lock:
+            self._reset()
+
+    def is_expired(self):
+        if not self.loaded:
+            return True
+        ttl = getattr(settings, 'TRANSLATION_GRAPH_TTL', 3600)
+        return time.monotonic() - self.loaded_at > ttl
+
+    def catch_up(self):
+        """Применить изменения других процессов из журнала.
+
+        ``False`` — изменения не восстановить, граф нужно перечитать.
+        """
+        with self._lock:
+            generation, entries = changes.since(self.generation)
+            if entries is None:
+                return False
+            for change in entries:
+                if change[0] == ADD:
+                    self._add(*change[1:])
+                else:
+                    self._remove(*change[1:])
+            self.generation = generation
+            return True
+
+    @property
+    def node_count(self):
+        return len(self._ids)
+
+    @property
+    def edge_count(self):
+        return len(self._targets) - len(self._removed) + sum(len(nodes) for nodes in self._added.values())
+
+    def nbytes(self):
+        """Размер массивов в байтах (без словаря word_id -> узел и дельты)."""
+        return sum(a.itemsize * len(a) for a in (self._ids, self._languages, self._offsets, self._targets))
+
+    # Инкрементальные изменения
+
+    def _node(self, word_id, language_id):
+        node = self._nodes.get(word_id)
+        if node is None:
+            node = self._nodes[word_id] = len(self._ids)
+            self._ids.append(word_id)
+            self._languages.append(language_id)
+        return node
+
+    def _base_has(self, u, v):
+        if u + 1 >= len(self._offsets):
+            return False
+        start, end = self._offsets[u], self._offsets[u + 1]
+        return v in self._targets[start:end]
+
+    def _add(self, from_id, from_language, to_id, to_language):
+        u = self._node(from_id, from_language)
+        v = self._node(to_id, to_language)
+        added = self._added.setdefault(u, set())
+        if (u, v) in self._removed:
+            self._removed.discard((u, v))
+            self._delta_size -= 1
+        elif v not in added and not self._base_has(u, v):
+            added.add(v)
+            self._delta_size += 1
+        self._maybe_compact()
+
+    def _remove(self, from_id, to_id):
+        u, v = self._nodes.get(from_id), self._nodes.get(to_id)
+        if u is None or v is None:
+            return
+        added = self._added.get(u)
+        if added and v in added:
+            added.discard(v)
+            self._delta_size -= 1
+        elif (u, v) not in self._removed and self._base_has(u, v):
+            self._removed.add((u, v))
+            self._delta_size += 1
+
+    def apply(self, entries, publish=True):
+        """Применить изменения к графу процесса и (после фиксации) опубликовать их для остальных."""
+        entries = list(entries)
+        if self.loaded:
+            with self._lock:
+                for change in entries:
+                    if change[0] == ADD:
+                        self._add(*change[1:])
+                    else:
+                        self._remove(*change[1:])
+        if publish:
+            changes.publish_on_commit(entries)
+
+    def add_edge(self, from_id, from_language, to_id, to_language, publish=True):
+        self.apply([(ADD, from_id, from_language, to_id, to_language)], publish=publish)
+
+    def remove_edge(self, from_id, to_id, publish=True):
+        self.apply([(REMOVE, from_id, to_id)], publish=publish)
+
+    def refresh_translation(self, translation):
+        """Обновить ребро после сохранения перевода."""
+        self.refresh_translations([translation])
+
+    def refresh_translations(self, translations):
+        """Обновить рёбра после сохранения переводов: один запрос и одна запись в журнал."""
+        from .models import Word
+
+        translations = list(translations)
+        if not translations:
+            return
+        word_ids = {
+            word_id for t in translations if t.status == 'approved' for word_id in (t.from_word_id, t.to_word_id)
+        }
+        languages = dict(
+            Word.objects.filter(id__in=word_ids, is_deleted=False).values_list('id', 'language_id')
+        ) if word_ids else {}
+        entries = []
+        for translation in translations:
+            from_id, to_id = translation.from_word_id, translation.to_word_id
+            if translation.status == 'approved' and from_id in languages and to_id in languages:
+                entries.append((ADD, from_id, languages[from_id], to_id, languages[to_id]))
+            else:
+                entries.append((REMOVE, from_id, to_id))
+        self.apply(entries)
+
+    def _maybe_compact(self):
+        if self._delta_size > max(COMPACT_MIN, len(self._targets) * COMPACT_RATIO):
+            self.compact()
+
+    def compact(self):
+        """Влить дельту в CSR-массивы."""
+        with self._lock:
+            sources, targets = array('i'), array('i')
+            for u in range(len(self._ids)):
+                for v in self._neighbours(u):
+                    sources.append(u)
+                    targets.append(v)
+            self._offsets, self._targets = _to_csr(len(self._ids), sources, targets)
+            self._added, self._removed, self._delta_size = {}, set(), 0
+
+    # Поиск
+
+    def _neighbours(self, u):
+        if u + 1 < len(self._offsets):
+            start, end = self._offsets[u], self._offsets[u + 1]
+            if self._removed:
+                for v in self._targets[start:end]:
+                    if (u, v) not in self._removed:
+                        yield v
+            else:
+                yield from self._targets[start:end]
+        added = self._added.get(u)
+        if added:
+            yield from added
+
+    def lookup(self, word_id, language_id=None, max_hops=DEFAULT_MAX_HOPS, limit=None):
+        """Кратчайшие пути от слова к словам языка ``language_id`` (см. ``shortest_paths``)."""
+        with self._lock:
+            start = self._nodes.get(word_id)
+            if start is None:
+                return []
+            ids = self._ids
+            return [
+                Path(ids[path.word_id], path.hops, [ids[node] for node in path.path])
+                for path in shortest_paths(
+                    start, self._neighbours, self._languages.__getitem__, language_id, max_hops, limit,
+                )
+            ]
+
+
+def shortest_paths(start, neighbours, language_of, language=None, max_hops=DEFAULT_MAX_HOPS, limit=None):
+    """Обход в ширину от ``start``: кратчайшие пути к словам языка ``language``.
+
+    ``neighbours(node)`` — узлы, в которые есть перевод, ``language_of(node)`` —
+    язык узла. Без языка возвращаются все узлы других языков, достижимые не
+    более чем за ``max_hops`` переходов. Результат — список ``Path`` по
+    возрастанию числа переходов. Узлы целевого языка не используются как
+    промежуточные.
+    """
+    source_language = language_of(start)
+    parents = {start: None}
+    frontier = deque([(start, 0)])
+    found = []
+    while frontier:
+        u, depth = frontier.popleft()
+        if depth >= max_hops:
+            continue
+        for v in neighbours(u):
+            if v in parents:
+                continue
+            parents[v] = u
+            if language is None:
+                hit = language_of(v) != source_language
+            else:
+                hit = language_of(v) == language
+            if hit:
+                found.append(Path(v, depth + 1, _path(parents, v)))
+                if limit is not None and len(found) >= limit:
+                    return found
+                if language is not None:
+                    continue
+            frontier.append((v, depth + 1))
+    return found
+
+
+def _to_csr(node_count, sources, targets):
+    """Упорядочить рёбра по исходному узлу (сортировка подсчётом)."""
+    offsets = array('q', bytes(8 * (node_count + 1)))
+    for u in sources:
+        offsets[u + 1] += 1
+    for u in range(node_count):
+        offsets[u + 1] += offsets[u]
+    position = array('q', offsets[:-1]) if node_count else array('q')
+    ordered = array('i', bytes(4 * len(targets)))
+    for u, v in zip(sources, targets):
+        ordered[position[u]] = v
+        position[u] += 1
+    return offsets, ordered
+
+
+def _path(parents, node):
+    path = []
+    while node is not None:
+        path.append(node)
+        node = parents[node]
+    path.reverse()
+    return path
+
+
+translation_graph = TranslationGraph()
+_reload_lock = threading.Lock()
+
+
+def get_translation_graph():
+    """Граф процесса с изменениями других процессов; при необходимости перечитанный из БД."""
+    graph = translation_graph
+    if not graph.is_expired() and graph.catch_up():
+        return graph
+    with _reload_lock:
+        # Пока ждали блокировку, граф мог перечитать другой поток
+        if graph.is_expired() or not graph.catch_up():
+            graph.load()
+    return graph
@@ -0,0 +1,382 @@
+"""Потоковый импорт глоссариев (CSV, TSV, JSONL) — см. команду ``import_terms``.
+
+Файл читается конвейером генераторов: чтение записей → разбор → проверка по
+справочникам (``Language``, ``Category``, ``Tag``) → порции фиксированного
+размера. Каждая порция записывается в своей транзакции пакетными запросами
+(``bulk_create``/``bulk_update``), поэтому память не зависит от размера файла,
+а число запросов — от числа строк в порции.
+
+Одна запись — один термин на одном языке. Поля (столбцы CSV/TSV или ключи JSONL):
+
+* ``language``, ``word`` — обязательные;
+* ``meaning``, ``pronunciation``, ``category`` (код), ``status``, ``difficulty``;
+* ``tags`` — коды тегов (в CSV через ``|``);
+* ``examples`` — примеры употребления (в CSV через ``|``);
+* ``translations`` — переводы: в CSV ``en:contract|tr:sözleşme``, в JSONL
+  словарь ``{"en": "contract"}`` (значение может быть списком).
+
+Существующее слово (та же пара слово + язык) обновляется непустыми полями
+записи (статус по умолчанию к существующим словам не применяется), теги и примеры добавляются, переводы создаются через
+``dictionary.bulk.bulk_translate``. После каждой порции в файл контрольной
+точки записывается число обработанных записей: после сбоя импорт продолжается
+с первой незаписанной порции.
+"""
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from . import caching, metrics, static_pages, sync
+from .bulk import bulk_translate, words_created, words_updated
+from .normalization import normalize_word
+from .sqlite import serialized_writes
+
+FORMATS = ('csv', 'tsv', 'jsonl')
+
+LIST_SEPARATOR = '|'
+TRANSLATION_SEPARATOR = ':'
+
+# Поля слова, которые запись может обновить у существующего слова
+UPDATABLE_FIELDS = ('meaning', 'pronunciation', 'category_id', 'status', 'difficulty')
+
+
+class InvalidRecord(ValueError):
+    """Ошибка в отдельной записи; запись пропускается."""
+
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension in ('ndjson', 'json'):
+        return 'jsonl'
+    return extension if extension in FORMATS else None
+
+
+# Чтение и разбор
+
+def read_records(path, file_format):
+    """Сырые записи файла: ``(номер записи, dict)``, по одной за раз."""
+    with open(path, encoding='utf-8-sig', newline='') as handle:
+        if file_format == 'jsonl':
+            number = 0
+            for line in handle:
+                if not line.strip():
+                    continue
+                number += 1
+                try:
+                    yield number, json.loads(line)
+                except ValueError as e:
+                    yield number, InvalidRecord(f'некорректный JSON: {e}')
+        else:
+            delimiter = '\t' if file_format == 'tsv' else ','
+            for number, row in enumerate(csv.DictReader(handle, delimiter=delimiter), start=1):
+                yield number, row
+
+
+def _split(value):
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(item).strip() for item in value if str(item).strip()]
+    return [item.strip() for item in str(value).split(LIST_SEPARATOR) if item.strip()]
+
+
+def _translations(value):
+    """Пары ``(код языка, текст)`` из поля ``translations``."""
+    if not value:
+        return []
+    if isinstance(value, dict):
+        return [(code, text) for code, texts in value.items() for text in _split(texts)]
+    pairs = []
+    for item in _split(value):
+        code, separator, text = item.partition(TRANSLATION_SEPARATOR)
+        if not separator or not text.strip():
+            raise InvalidRecord(f'перевод «{item}» должен иметь вид код:слово')
+        pairs.append((code.strip(), text.strip()))
+    return pairs
+
+
+def parse_record(raw):
+    """Привести сырую запись к единому виду (без обращения к БД)."""
+    if isinstance(raw, InvalidRecord):
+        raise raw
+    if not isinstance(raw, dict):
+        raise InvalidRecord('запись должна быть объектом')
+    record = {key: (value.strip() if isinstance(value, str) else value) for key, value in raw.items() if key}
+    if not record.get('language') or not record.get('word'):
+        raise InvalidRecord('не заданы language и word')
+    return {
+        'language': record['language'],
+        'word': ' '.join(str(record['word']).split()),
+        'meaning': record.get('meaning') or '',
+        'pronunciation': record.get('pronunciation') or '',
+        'category': record.get('category') or '',
+        'status': record.get('status') or '',
+        'difficulty': record.get('difficulty') or '',
+        'tags': _split(record.get('tags')),
+        'examples': _split(record.get('examples')),
+        'translations': _translations(record.get('translations')),
+    }
+
+
+class Validator:
+    """Проверка записей по справочникам, загруженным один раз."""
+
+    def __init__(self, default_status):
+        from .models import Category, Language, Tag, Word
+
+        self.languages = dict(Language.objects.values_list('code', 'id'))
+        self.language_codes = {language_id: code for code, language_id in self.languages.items()}
+        self.categories = dict(Category.objects.values_list('code', 'id'))
+        self.tags = dict(Tag.objects.values_list('code', 'id'))
+        self.statuses = {value for value, _ in Word.STATUS_CHOICES}
+        self.difficulties = {value for value, _ in Word.DIFFICULTY_LEVELS}
+        if default_status not in self.statuses:
+            raise ValueError(f'Неизвестный статус по умолчанию: {default_status!r}')
+        self.default_status = default_status
+
+    def __call__(self, record):
+        if record['language'] not in self.languages:
+            raise InvalidRecord(f'неизвестный язык «{record["language"]}»')
+        if len(record['word']) > 100:
+            raise InvalidRecord('слово длиннее 100 символов')
+        if record['category'] and record['category'] not in self.categories:
+            raise InvalidRecord(f'неизвестная категория «{record["category"]}»')
+        unknown_tags = [code for code in record['tags'] if code not in self.tags]
+        if unknown_tags:
+            raise InvalidRecord(f'неизвестные теги: {", ".join(unknown_tags)}')
+        if record['status'] and record['status'] not in self.statuses:
+            raise InvalidRecord(f'неизвестный статус «{record["status"]}»')
+        if record['difficulty'] and record['difficulty'] not in self.difficulties:
+            raise InvalidRecord(f'неизвестная сложность «{record["difficulty"]}»')
+        unknown_languages = [code for code, _ in record['translations'] if code not in self.languages]
+        if unknown_languages:
+            raise InvalidRecord(f'неизвестные языки переводов: {", ".join(unknown_languages)}')
+
+        record['language_id'] = self.languages[record['language']]
+        record['category_id'] = self.categories.get(record['category'])
+        record['tag_ids'] = [self.tags[code] for code in record['tags']]
+        return record
+
+
+def batches(records, size):
+    iterator = iter(records)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+# Запись порции
+
+class ImportStats:
+    def __init__(self, **values):
+        self.records = values.get('records', 0)
+        self.errors = values.get('errors', 0)
+        self.duplicates = values.get('duplicates', 0)
+        self.words_created = values.get('words_created', 0)
+        self.words_updated = values.get('words_updated', 0)
+        self.translations_created = values.get('translations_created', 0)
+        self.examples_created = values.get('examples_created', 0)
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+def _dedupe(records, stats):
+    """Одна запись на пару (язык, слово) в порции: более поздняя дополняет раннюю."""
+    merged = {}
+    for record in records:
+        key = (record['language_id'], record['word'])
+        if key not in merged:
+            merged[key] = record
+            continue
+        stats.duplicates += 1
+        first = merged[key]
+        for field in ('meaning', 'pronunciation', 'category', 'category_id', 'difficulty'):
+            first[field] = record[field] or first[field]
+        first['status'] = record['status'] or first['status']
+        first['tag_ids'] = list(dict.fromkeys(first['tag_ids'] + record['tag_ids']))
+        first['examples'] = list(dict.fromkeys(first['examples'] + record['examples']))
+        first['translations'] = list(dict.fromkeys(first['translations'] + record['translations']))
+    return list(merged.values())
+
+
+def write_batch(records, validator, stats, user=None):
+    """Записать порцию проверенных записей (вызывать внутри транзакции)."""
+    from .models import Example, Word
+
+    records = _dedupe(records, stats)
+    by_language = {}
+    for record in records:
+        by_language.setdefault(record['language_id'], []).append(record)
+
+    # Слова: существующие обновляются, новые вставляются
+    words = {}
+    for language_id, items in by_language.items():
+        for word in Word.objects.filter(language_id=language_id, word__in=[record['word'] for record in items]):
+            words[(language_id, word.word)] = word
+
+    to_update, to_create = [], []
+    for record in records:
+        key = (record['language_id'], record['word'])
+        word = words.get(key)
+        if word is None:
+            to_create.append(Word(
+                word=record['word'],
+                search_key=normalize_word(record['word'], validator.language_codes[record['language_id']]),
+                language_id=record['language_id'],
+                meaning=record['meaning'],
+                pronunciation=record['pronunciation'],
+                category_id=record['category_id'],
+                category_code=record['category'],
+                status=record['status'] or validator.default_status,
+                difficulty=record['difficulty'] or 'medium',
+                created_by=user,
+            ))
+            continue
+        changed = False
+        for field in UPDATABLE_FIELDS:
+            value = record[field]
+            if value and getattr(word, field) != value:
+                setattr(word, field, value)
+                changed = True
+        if changed:
+            if record['category']:
+                word.category_code = record['category']
+            to_update.append(word)
+
+    if to_update:
+        Word.objects.bulk_update(to_update, UPDATABLE_FIELDS + ('category_code',))
+        stats.words_updated += len(to_update)
+        words_updated.send(sender=Word, words=to_update)
+    if to_create:
+        Word.objects.bulk_create(to_create, ignore_conflicts=True)
+        created = []
+        for language_id, items in by_language.items():
+            texts = [word.word for word in to_create if word.language_id == language_id]
+            if texts:
+                for word in Word.objects.filter(language_id=language_id, word__in=texts):
+                    if (language_id, word.word) not in words:
+                        created.append(word)
+                    words[(language_id, word.word)] = word
+        stats.words_created += len(created)
+        words_created.send(sender=Word, words=created)
+
+    # Теги: добавляются к уже назначенным
+    Through = Word.tags.through
+    Through.objects.bulk_create(
+        [
+            Through(word_id=words[(record['language_id'], record['word'])].id, tag_id=tag_id)
+            for record in records
+            for tag_id in record['tag_ids']
+        ],
+        ignore_conflicts=True,
+    )
+    # bulk_create связей не отправляет m2m_changed
+    tagged = [words[(record['language_id'], record['word'])].id for record in records if record['tag_ids']]
+    sync.record(sync.WORD, tagged)
+    caching.invalidate_words(tagged)
+    static_pages.invalidate(tagged)
+
+    # Примеры: без повторов уже сохранённых
+    word_ids = [words[(record['language_id'], record['word'])].id for record in records if record['examples']]
+    existing_examples = set(Example.objects.filter(word_id__in=word_ids).values_list('word_id', 'text'))
+    new_examples = []
+    for record in records:
+        word_id = words[(record['language_id'], record['word'])].id
+        for text in record['examples']:
+            if (word_id, text) not in existing_examples:
+                existing_examples.add((word_id, text))
+                new_examples.append(Example(word_id=word_id, text=text, author=user))
+    Example.objects.bulk_create(new_examples)
+    stats.examples_created += len(new_examples)
+    sync.record(sync.WORD, [example.word_id for example in new_examples])
+    caching.invalidate_words({example.word_id for example in new_examples}, listings=False)
+    static_pages.invalidate({example.word_id for example in new_examples})
+
+    # Переводы получают статус своей записи
+    items_by_status = {}
+    for record in records:
+        word_id = words[(record['language_id'], record['word'])].id
+        for code, text in record['translations']:
+            status = record['status'] or validator.default_status
+            items_by_status.setdefault(status, []).append((word_id, code, text))
+    for status, items in items_by_status.items():
+        result = bulk_translate(items, user=user, status=status)
+        stats.translations_created += result.translations_created
+        stats.words_created += result.words_created
+
+
+# Контрольная точка
+
+def read_checkpoint(path):
+    try:
+        with open(path, encoding='utf-8') as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def write_checkpoint(path, data):
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as handle:
+        json.dump(data, handle)
+    os.replace(temporary, path)
+
+
+def file_signature(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime': int(stat.st_mtime)}
+
+
+def run_import(path, file_format, batch_size=1000, default_status='pending', user=None,
+               checkpoint_path=None, resume=True, on_error=None, on_progress=None):
+    """Импортировать файл. Возвращает ``ImportStats``.
+
+    ``on_error(номер записи, сообщение)`` вызывается для пропущенных записей,
+    ``on_progress(stats, записей в секунду)`` — после каждой записанной порции.
+    """
+    validator = Validator(default_status)
+    stats = ImportStats()
+    skip = 0
+    signature = file_signature(path)
+    if checkpoint_path and resume:
+        checkpoint = read_checkpoint(checkpoint_path)
+        if checkpoint and checkpoint.get('file') == signature:
+            skip = checkpoint['records']
+            stats = ImportStats(**checkpoint['stats'])
+
+    def valid_records():
+        for number, raw in read_records(path, file_format):
+            if number <= skip:
+                continue
+            try:
+                yield number, validator(parse_record(raw))
+            except InvalidRecord as e:
+                stats.errors += 1
+                if on_error:
+                    on_error(number, str(e))
+
+    started = time.monotonic()
+    processed = 0
+    for batch in batches(valid_records(), batch_size):
+        batch_started = time.monotonic()
+        with serialized_writes():
+            write_batch([record for _, record in batch], validator, stats, user=user)
+        metrics.observe_bulk('import', len(batch), time.monotonic() - batch_started)
+        last_number = batch[-1][0]
+        processed += len(batch)
+        stats.records += len(batch)
+        if checkpoint_path:
+            write_checkpoint(checkpoint_path, {'file': signature, 'records': last_number, 'stats': stats.as_dict()})
+        if on_progress:
+            elapsed = time.monotonic() - started
+            on_progress(stats, processed / elapsed if elapsed else 0)
+
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    # Команда импорта завершится раньше фоновой записи метрик
+    metrics.registry.flush()
+    return stats
@@ -0,0 +1,138 @@
+"""Учёт SQL-запросов по представлениям.
+
+``QueryInstrumentationMiddleware`` на время запроса подключает к соединениям
+БД обёртку ``connection.execute_wrapper`` и считает запросы, их суммарное
+время и повторы одинаковых запросов (запросы сравниваются по «отпечатку»:
+SQL без литералов и с одним ``?`` вместо списков ``IN``). Много повторов
+одного отпечатка — почти всегда N+1: запрос внутри цикла по строкам.
+
+По каждому запросу в лог ``dictionary.queries`` пишется строка JSON, а в
+ответ добавляется заголовок ``Server-Timing`` (виден в DevTools браузера).
+Если представление выполнило больше запросов, чем указано для него в
+``QUERY_BUDGETS`` (ключ — имя URL вида ``dictionary:home`` или
+``admin:dictionary_word_changelist``), или какой-то отпечаток повторился не
+меньше ``QUERY_REPEAT_THRESHOLD`` раз, строка пишется с уровнем WARNING.
+
+Запросы потоковых ответов (``StreamingHttpResponse``), выполняемые уже при
+отправке тела, не учитываются.
+"""
+import json
+import logging
+import re
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('dictionary.queries')
+
+DEFAULT_REPEAT_THRESHOLD = 5
+# Сколько повторяющихся отпечатков писать в лог
+MAX_REPORTED_REPEATS = 5
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST_RE = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """SQL без значений: запросы, отличающиеся только параметрами, дают один отпечаток."""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _PLACEHOLDER_LIST_RE.sub('(?)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """Обёртка ``execute_wrapper``: число, время и отпечатки выполненных запросов."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = {}  # отпечаток -> [число, время]
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            stats = self.fingerprints.setdefault(fingerprint(sql), [0, 0.0])
+            stats[0] += 1
+            stats[1] += elapsed
+
+    def repeated(self, threshold):
+        """Отпечатки, выполненные не меньше ``threshold`` раз, — самые частые первыми."""
+        return sorted(
+            ((sql, count, duration) for sql, (count, duration) in self.fingerprints.items() if count >= threshold),
+            key=lambda item: -item[1],
+        )
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return ''
+    return match.view_name or match._func_path
+
+
+def budget(name):
+    """Допустимое число запросов представления или ``None``."""
+    return getattr(settings, 'QUERY_BUDGETS', {}).get(name)
+
+
+class QueryInstrumentationMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+
+        name = view_name(request)
+        request.query_stats = recorder
+        response['Server-Timing'] = ', '.join(filter(None, [
+            response.get('Server-Timing'),
+            f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries"',
+            f'app;dur={total * 1000:.1f}',
+        ]))
+        self.log(request, response, name, recorder, total)
+        return response
+
+    def log(self, request, response, name, recorder, total):
+        limit = budget(name)
+        threshold = getattr(settings, 'QUERY_REPEAT_THRESHOLD', DEFAULT_REPEAT_THRESHOLD)
+        repeated = recorder.repeated(threshold)
+        over_budget = limit is not None and recorder.count > limit
+        level = logging.WARNING if over_budget or repeated else logging.INFO
+        if not logger.isEnabledFor(level):
+            return
+        record = {
+            'view': name,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'sql_ms': round(recorder.duration * 1000, 1),
+            'total_ms': round(total * 1000, 1),
+        }
+        if limit is not None:
+            record['budget'] = limit
+            record['over_budget'] = over_budget
+        if repeated:
+            record['repeated'] = [
+                {'sql': sql[:300], 'count': count, 'sql_ms': round(duration * 1000, 1)}
+                for sql, count, duration in repeated[:MAX_REPORTED_REPEATS]
+            ]
+        logger.log(level, json.dumps(record, ensure_ascii=False))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from dictionary.models import Word
+from dictionary.normalization import normalize_word
+
+
+class Command(BaseCommand):
+    help = 'Пересчитать нормализованные ключи поиска (Word.search_key) для всех слов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        words = Word.objects.select_related('language').only('id', 'word', 'search_key', 'language__code')
+        batch = []
+        updated = 0
+        for word in words.iterator(chunk_size=batch_size):
+            key = normalize_word(word.word, word.language.code)
+            if key == word.search_key:
+                continue
+            word.search_key = key
+            batch.append(word)
+            if len(batch) >= batch_size:
+                Word.objects.bulk_update(batch, ['search_key'])
+                updated += len(batch)
+                batch = []
+        Word.objects.bulk_update(batch, ['search_key'])
+        updated += len(batch)
+        self.stdout.write(self.style.SUCCESS(f'Обновлено ключей поиска: {updated}'))
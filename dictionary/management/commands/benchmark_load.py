@@ -0,0 +1,69 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dictionary.benchmark import report
+from dictionary.benchmark.load import SCENARIOS, WRITE_SCENARIOS, LoadRunner, Targets
+
+
+class Command(BaseCommand):
+    help = 'Нагрузить работающий сервер смесью запросов и вывести p50/p95/p99 и пропускную способность'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='Адрес сервера')
+        parser.add_argument('--clients', type=int, default=10, help='Одновременных клиентов (по умолчанию 10)')
+        parser.add_argument('--duration', type=float, default=30, help='Длительность, с (по умолчанию 30)')
+        parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                            help='Оставить только этот сценарий (можно несколько раз)')
+        parser.add_argument('--no-writes', action='store_true', help='Без массовых сценариев записи')
+        parser.add_argument('--username', help='Сотрудник для массовых сценариев')
+        parser.add_argument('--password', default=os.environ.get('BENCHMARK_PASSWORD', ''),
+                            help='Пароль (по умолчанию из BENCHMARK_PASSWORD)')
+        parser.add_argument('--sample-size', type=int, default=5000, help='Сколько слов выбрать в цели запросов')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Сохранить прогон в JSON')
+        parser.add_argument('--compare', help='Сравнить с прогоном из JSON')
+
+    def handle(self, *args, **options):
+        scenarios = {name: SCENARIOS[name] for name in options['scenario'] or SCENARIOS}
+        if options['no_writes']:
+            scenarios = {name: weight for name, weight in scenarios.items() if name not in WRITE_SCENARIOS}
+        elif not options['username'] and WRITE_SCENARIOS & set(scenarios):
+            self.stdout.write('Без --username массовые сценарии пропускаются')
+
+        targets = Targets.from_database(sample_size=options['sample_size'], seed=options['seed'])
+        if not targets.word_ids:
+            raise CommandError('В БД нет слов, сначала запустите generate_benchmark_data')
+        baseline = report.load(options['compare']) if options['compare'] else None
+
+        runner = LoadRunner(
+            options['base_url'], targets,
+            clients=options['clients'],
+            duration=options['duration'],
+            scenarios=scenarios,
+            username=options['username'],
+            password=options['password'],
+            seed=options['seed'],
+        )
+        try:
+            samples, elapsed = runner.run()
+        except RuntimeError as error:
+            raise CommandError(str(error))
+
+        params = {
+            'base_url': options['base_url'],
+            'clients': options['clients'],
+            'duration': options['duration'],
+            'scenarios': runner.scenarios,
+            'words': len(targets.word_ids),
+        }
+        result = report.build(report.summarize(samples, elapsed), params, elapsed)
+        for line in report.format_table(result):
+            self.stdout.write(line)
+        if baseline is not None:
+            self.stdout.write('')
+            for line in report.compare(result, baseline):
+                self.stdout.write(line)
+        if options['output']:
+            report.save(result, options['output'])
+            self.stdout.write(self.style.SUCCESS(f'Прогон сохранён в {options["output"]}'))
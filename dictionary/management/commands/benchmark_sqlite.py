@@ -0,0 +1,152 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from dictionary import sqlite
+from dictionary.models import Example, Language, Translation, Word
+
+# Профиль «как было»: журнал отката и настройки SQLite по умолчанию
+DEFAULT_PROFILE = {'journal_mode': 'delete'}
+
+WRITE_BATCH = 50
+
+
+def _connect(path, pragmas):
+    db = sqlite3.connect(path, timeout=5, isolation_level=None)
+    sqlite.apply_pragmas(db, pragmas)
+    return db
+
+
+def _read(db, word_id):
+    """Запросы страницы слова: слово, переводы, примеры."""
+    db.execute(
+        f'SELECT w.*, l.* FROM {Word._meta.db_table} w JOIN {Language._meta.db_table} l ON l.id = w.language_id '
+        f'WHERE w.id = ?', (word_id,),
+    ).fetchall()
+    db.execute(
+        f'SELECT t.*, w.* FROM {Translation._meta.db_table} t JOIN {Word._meta.db_table} w ON w.id = t.to_word_id '
+        f'WHERE t.from_word_id = ?', (word_id,),
+    ).fetchall()
+    db.execute(f'SELECT * FROM {Example._meta.db_table} WHERE word_id = ?', (word_id,)).fetchall()
+
+
+def _write(db, word_ids, lock_path):
+    """Массовая правка: прочитать пачку слов и обновить их в одной транзакции."""
+    lock_file = None
+    if lock_path:
+        import fcntl
+        lock_file = open(lock_path, 'a')
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+    try:
+        db.execute('BEGIN')
+        try:
+            if lock_path:
+                db.execute('UPDATE django_migrations SET id = id WHERE 0')
+            placeholders = ','.join('?' * len(word_ids))
+            db.execute(f'SELECT id, meaning FROM {Word._meta.db_table} WHERE id IN ({placeholders})', word_ids).fetchall()
+            db.execute(
+                f"UPDATE {Word._meta.db_table} SET updated_at = datetime('now') WHERE id IN ({placeholders})", word_ids,
+            )
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+    finally:
+        if lock_file is not None:
+            lock_file.close()
+
+
+def _worker(role, path, pragmas, lock_path, word_ids, duration, seed, results):
+    rng = random.Random(seed)
+    db = _connect(path, pragmas)
+    timings, errors = [], 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            if role == 'read':
+                _read(db, rng.choice(word_ids))
+            else:
+                _write(db, rng.sample(word_ids, min(WRITE_BATCH, len(word_ids))), lock_path)
+        except sqlite3.OperationalError:
+            errors += 1
+            continue
+        timings.append(time.perf_counter() - started)
+    db.close()
+    results.put((role, timings, errors))
+
+
+class Command(BaseCommand):
+    help = 'Замерить чтение и запись SQLite при параллельной нагрузке: настройки по умолчанию и production-профиль'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8, help='Процессов-читателей (по умолчанию 8)')
+        parser.add_argument('--writers', type=int, default=2, help='Процессов массовой записи (по умолчанию 2)')
+        parser.add_argument('--duration', type=float, default=5, help='Длительность замера, с (по умолчанию 5)')
+        parser.add_argument('--profile', choices=('default', 'production', 'both'), default='both')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+            raise CommandError('Замер работает только с файловой БД SQLite')
+        word_ids = list(Word.objects.values_list('id', flat=True))
+        if not word_ids:
+            raise CommandError('В БД нет слов')
+
+        profiles = {
+            'default': (DEFAULT_PROFILE, False),
+            'production': (sqlite.pragmas(), True),
+        }
+        if options['profile'] != 'both':
+            profiles = {options['profile']: profiles[options['profile']]}
+
+        # Замер идёт на копии, чтобы не менять режим журнала и данные рабочей БД
+        with tempfile.TemporaryDirectory() as directory:
+            for name, (pragmas, serialized) in profiles.items():
+                path = os.path.join(directory, f'{name}.sqlite3')
+                connection.ensure_connection()
+                with sqlite3.connect(path) as target:
+                    connection.connection.backup(target)
+                self._run(name, path, pragmas, f'{path}.write-lock' if serialized else None, word_ids, options)
+                for suffix in ('', '-wal', '-shm', '.write-lock'):
+                    if os.path.exists(path + suffix):
+                        os.remove(path + suffix)
+
+    def _run(self, name, path, pragmas, lock_path, word_ids, options):
+        _connect(path, pragmas).close()  # режим журнала сохраняется в файле БД
+        results = multiprocessing.Queue()
+        roles = ['read'] * options['readers'] + ['write'] * options['writers']
+        processes = [
+            multiprocessing.Process(
+                target=_worker,
+                args=(role, path, pragmas, lock_path, word_ids, options['duration'], options['seed'] + number, results),
+            )
+            for number, role in enumerate(roles)
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+        self.stdout.write(f'{name}: {", ".join(f"{key}={value}" for key, value in pragmas.items())}'
+                          f'{", очередь записи" if lock_path else ""}')
+        for role, title in (('read', 'Чтение страницы слова'), ('write', f'Запись пачки из {WRITE_BATCH} слов')):
+            timings = sorted(t for r, items, _ in collected if r == role for t in items)
+            errors = sum(e for r, _, e in collected if r == role)
+            if not timings:
+                self.stdout.write(f'  {title}: нет успешных операций, ошибок блокировки {errors}')
+                continue
+            p50 = statistics.median(timings) * 1e3
+            p99 = timings[int(len(timings) * 0.99) - 1] * 1e3
+            self.stdout.write(
+                f'  {title}: {len(timings) / options["duration"]:.0f} оп/с, p50 {p50:.2f} мс, p99 {p99:.2f} мс, '
+                f'ошибок блокировки {errors}'
+            )
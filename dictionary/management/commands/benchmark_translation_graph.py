@@ -0,0 +1,76 @@
+import random
+import statistics
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from dictionary.graph import TranslationGraph
+
+
+class Command(BaseCommand):
+    help = 'Замерить построение и поиск в графе переводов на синтетическом графе'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--edges', type=int, default=3_000_000, help='Число рёбер (по умолчанию 3 000 000)')
+        parser.add_argument('--words', type=int, default=1_000_000, help='Число слов (по умолчанию 1 000 000)')
+        parser.add_argument('--languages', type=int, default=4, help='Число языков (по умолчанию 4)')
+        parser.add_argument('--lookups', type=int, default=10_000, help='Число поисков (по умолчанию 10 000)')
+        parser.add_argument('--max-hops', type=int, default=3, help='Ограничение на число переходов')
+        parser.add_argument('--updates', type=int, default=10_000, help='Число инкрементальных изменений')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        words, languages = options['words'], options['languages']
+
+        def language_of(word_id):
+            return word_id % languages + 1
+
+        def edges():
+            for _ in range(options['edges']):
+                from_id = rng.randint(1, words)
+                to_id = rng.randint(1, words)
+                if language_of(from_id) != language_of(to_id):
+                    yield from_id, to_id
+
+        word_languages = {word_id: language_of(word_id) for word_id in range(1, words + 1)}
+
+        started = time.perf_counter()
+        graph = TranslationGraph.from_edges(edges(), word_languages)
+        build_seconds = time.perf_counter() - started
+        node_map_bytes = sys.getsizeof(graph._nodes)
+        self.stdout.write(
+            f'Построение: {graph.node_count} узлов, {graph.edge_count} рёбер за {build_seconds:.2f} с; '
+            f'массивы {graph.nbytes() / 2**20:.1f} МБ, словарь узлов {node_map_bytes / 2**20:.1f} МБ'
+        )
+
+        timings, hits = [], 0
+        for _ in range(options['lookups']):
+            word_id = rng.randint(1, words)
+            target = rng.randint(1, languages)
+            started = time.perf_counter()
+            found = graph.lookup(word_id, target, max_hops=options['max_hops'], limit=1)
+            timings.append(time.perf_counter() - started)
+            hits += bool(found)
+        self._report('Поиск (limit=1)', timings)
+        self.stdout.write(f'  найдено путей: {hits} из {len(timings)}')
+
+        timings = []
+        for _ in range(options['updates']):
+            from_id, to_id = rng.randint(1, words), rng.randint(1, words)
+            started = time.perf_counter()
+            graph.add_edge(from_id, language_of(from_id), to_id, language_of(to_id), publish=False)
+            timings.append(time.perf_counter() - started)
+        self._report('Добавление ребра', timings)
+
+        started = time.perf_counter()
+        graph.compact()
+        self.stdout.write(f'Слияние дельты: {time.perf_counter() - started:.2f} с')
+
+    def _report(self, title, timings):
+        timings = sorted(timings)
+        p50 = statistics.median(timings) * 1e6
+        p95 = timings[int(len(timings) * 0.95) - 1] * 1e6 if timings else 0
+        p99 = timings[int(len(timings) * 0.99) - 1] * 1e6 if timings else 0
+        self.stdout.write(f'{title}: p50 {p50:.0f} мкс, p95 {p95:.0f} мкс, p99 {p99:.0f} мкс')
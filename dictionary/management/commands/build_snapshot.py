@@ -0,0 +1,30 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from dictionary import snapshot
+
+
+class Command(BaseCommand):
+    help = 'Собрать двоичный снимок одобренных слов и переводов для чтения через mmap'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', help='Файл снимка (по умолчанию DICTIONARY_SNAPSHOT_PATH)')
+
+    def handle(self, *args, **options):
+        path = options['output'] or getattr(settings, 'DICTIONARY_SNAPSHOT_PATH', None)
+        if not path:
+            raise CommandError('Укажите --output или настройку DICTIONARY_SNAPSHOT_PATH')
+
+        started = time.perf_counter()
+        try:
+            count = snapshot.build(path)
+        except OSError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+        size = os.path.getsize(path)
+        self.stdout.write(self.style.SUCCESS(
+            f'Снимок {path}: {count} слов, {size / 1024:.0f} КБ, собран за {elapsed:.2f} с'
+        ))
@@ -0,0 +1,41 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dictionary import exporting
+
+
+class Command(BaseCommand):
+    help = 'Выгрузить одобренные слова с переводами, тегами и примерами (NDJSON, CSV или TBX)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(exporting.FORMATS), default='ndjson')
+        parser.add_argument('--output', '-o', help='Файл для записи (по умолчанию stdout)')
+        parser.add_argument('--language', help='Код языка')
+        parser.add_argument('--category', help='Код или id категории')
+        parser.add_argument('--updated-from', help='Изменённые не раньше (дата или дата-время ISO 8601)')
+        parser.add_argument('--updated-to', help='Изменённые не позже (дата или дата-время ISO 8601)')
+        parser.add_argument('--chunk-size', type=int, default=exporting.CHUNK_SIZE, help='Слов в одной порции')
+
+    def handle(self, *args, **options):
+        try:
+            updated_from = exporting.parse_moment(options['updated_from'])
+            updated_to = exporting.parse_moment(options['updated_to'], end=True)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        words = exporting.export_queryset(
+            language=options['language'],
+            category=options['category'],
+            updated_from=updated_from,
+            updated_to=updated_to,
+        )
+        chunks = exporting.render(options['format'], exporting.iter_entries(words, chunk_size=options['chunk_size']))
+
+        output = open(options['output'], 'w', encoding='utf-8', newline='') if options['output'] else sys.stdout
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+        finally:
+            if options['output']:
+                output.close()
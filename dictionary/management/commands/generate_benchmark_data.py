@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dictionary.benchmark import generator
+
+
+class Command(BaseCommand):
+    help = 'Наполнить БД синтетическим словарём для нагрузочных замеров (или удалить его, --clear)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--words-per-language', type=int, default=10000,
+                            help='Слов на каждом языке (по умолчанию 10000)')
+        parser.add_argument('--languages', default='ru,kk,tr,en', help='Коды языков через запятую')
+        parser.add_argument('--fanout', type=int, default=2,
+                            help='На сколько других языков переводится каждое слово (по умолчанию 2)')
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--tags-per-word', type=int, default=2)
+        parser.add_argument('--examples', type=int, default=1, help='Примеров на слово (по умолчанию 1)')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Понятий в одной транзакции')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--clear', action='store_true', help='Удалить ранее сгенерированные данные и выйти')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted = generator.clear()
+            self.stdout.write(self.style.SUCCESS(f'Удалено сгенерированных слов: {deleted}'))
+            return
+
+        languages = [code.strip() for code in options['languages'].split(',') if code.strip()]
+        if not languages:
+            raise CommandError('Укажите хотя бы один язык')
+        total = options['words_per_language']
+        started = time.perf_counter()
+
+        def on_progress(done):
+            self.stdout.write(f'  {done}/{total} понятий, {time.perf_counter() - started:.1f} с')
+
+        totals = generator.generate(
+            total,
+            languages=languages,
+            fanout=options['fanout'],
+            categories=options['categories'],
+            tags=options['tags'],
+            tags_per_word=options['tags_per_word'],
+            examples_per_word=options['examples'],
+            batch_size=options['batch_size'],
+            seed=options['seed'],
+            on_progress=on_progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано слов: {totals["words"]}, переводов: {totals["translations"]}, '
+            f'примеров: {totals["examples"]} за {time.perf_counter() - started:.1f} с'
+        ))
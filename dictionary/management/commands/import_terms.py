@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from dictionary.importing import FORMATS, detect_format, run_import
+from dictionary.models import Word
+
+# Сколько ошибок в записях выводить подробно
+MAX_REPORTED_ERRORS = 20
+
+
+class Command(BaseCommand):
+    help = 'Импортировать термины из CSV, TSV или JSONL (потоково, порциями, с контрольной точкой)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл глоссария')
+        parser.add_argument('--format', choices=FORMATS, help='Формат файла (по умолчанию — по расширению)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Записей в одной транзакции (по умолчанию 1000)')
+        parser.add_argument('--status', default='pending', choices=[value for value, _ in Word.STATUS_CHOICES],
+                            help='Статус новых слов и переводов, если в записи не указан')
+        parser.add_argument('--user', help='Имя пользователя, от которого создаются слова')
+        parser.add_argument('--checkpoint', help='Файл контрольной точки (по умолчанию <файл>.checkpoint)')
+        parser.add_argument('--restart', action='store_true', help='Не продолжать с контрольной точки, начать заново')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or detect_format(path)
+        if file_format is None:
+            raise CommandError('Не удалось определить формат файла, укажите --format')
+
+        user = None
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(username=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'Пользователь {options["user"]} не найден')
+
+        reported = 0
+
+        def on_error(number, message):
+            nonlocal reported
+            reported += 1
+            if reported <= MAX_REPORTED_ERRORS:
+                self.stderr.write(f'Запись {number}: {message}')
+
+        def on_progress(stats, rate):
+            self.stdout.write(
+                f'{stats.records} записей, {rate:.0f} записей/с '
+                f'(создано слов {stats.words_created}, обновлено {stats.words_updated})'
+            )
+
+        try:
+            stats = run_import(
+                path,
+                file_format,
+                batch_size=options['batch_size'],
+                default_status=options['status'],
+                user=user,
+                checkpoint_path=options['checkpoint'] or f'{path}.checkpoint',
+                resume=not options['restart'],
+                on_error=on_error,
+                on_progress=on_progress,
+            )
+        except OSError as e:
+            raise CommandError(str(e))
+
+        if reported > MAX_REPORTED_ERRORS:
+            self.stderr.write(f'... и ещё {reported - MAX_REPORTED_ERRORS} ошибок')
+        self.stdout.write(self.style.SUCCESS(
+            f'Импорт завершён: {stats.records} записей, ошибок {stats.errors}, повторов {stats.duplicates}; '
+            f'слов создано {stats.words_created}, обновлено {stats.words_updated}; '
+            f'переводов {stats.translations_created}, примеров {stats.examples_created}'
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from dictionary import fuzzy, search
+
+
+class Command(BaseCommand):
+    help = 'Пересоздать поисковые индексы слов (полнотекстовый и триграммный) с нуля'
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            search.rebuild_index()
+            self.stdout.write('Полнотекстовый индекс FTS5 перестроен')
+        elif connection.vendor == 'postgresql':
+            search.rebuild_index()
+            self.stdout.write('Столбец tsvector и индексы pg_trgm перестроены')
+        else:
+            self.stdout.write(f'Полнотекстового индекса для {connection.vendor} нет, пропускаем')
+
+        count = fuzzy.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Индекс триграмм перестроен: {count} слов'))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dictionary import static_pages
+
+
+class Command(BaseCommand):
+    help = 'Отрисовать страницы слов в STATIC_PAGES_ROOT для отдачи через nginx'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--changed', action='store_true',
+            help='Только страницы, затронутые изменениями после прошлого запуска',
+        )
+
+    def handle(self, *args, **options):
+        if static_pages.root() is None:
+            raise CommandError('Не задана настройка STATIC_PAGES_ROOT')
+
+        started = time.perf_counter()
+        written = static_pages.render_changed() if options['changed'] else static_pages.render_all()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Страниц записано: {written} в {static_pages.root()} за {elapsed:.1f} с'
+        ))
@@ -0,0 +1,387 @@
+"""Метрики приложения в текстовом формате Prometheus (``/metrics``).
+
+Каждый процесс gunicorn копит значения в памяти, а фоновый поток раз в
+``METRICS_FLUSH_INTERVAL`` секунд записывает изменившиеся значения в файл
+процесса ``METRICS_DIR/<pid>-<время запуска>.json`` (атомарно, через
+``os.replace``; время запуска в имени нужно, чтобы процесс с повторно выданным
+pid не затёр чужие счётчики). ``/metrics`` суммирует файлы всех процессов,
+поэтому Prometheus опрашивает один адрес, в какой бы процесс ни попал запрос.
+
+Значения завершившихся процессов переносятся в ``archived.json`` и продолжают
+входить в сумму, поэтому счётчики не уменьшаются: процесс делает это сам при
+выходе, а файлы упавших процессов (pid которых больше не существует)
+переносит сбор ``/metrics``. Поэтому каталог должен быть общим только для
+процессов одной машины (одного контейнера). Без ``METRICS_DIR`` метрики видны
+только процессу, который отвечает на запрос.
+
+Гистограммы хранят накопленные значения корзин (``le``), поэтому их, как и
+счётчики, можно складывать между процессами.
+
+Метрики:
+
+* ``dictionary_requests_total``, ``dictionary_request_duration_seconds`` и
+  ``dictionary_request_queries`` — по имени URL ``dictionary:*`` (остальные
+  запросы — ``view="other"``), собирает ``MetricsMiddleware``;
+* ``dictionary_cache_requests_total`` — обращения к ``dictionary.caching``
+  по результату (``hit``, ``stale``, ``shared``, ``miss``);
+* ``dictionary_search_results`` — число результатов поиска;
+* ``dictionary_bulk_items_total`` и ``dictionary_bulk_seconds_total`` —
+  обработанные элементы и время массовых операций (пропускная способность —
+  отношение их ``rate()``).
+"""
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировка только внутри процесса
+    fcntl = None
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+RESULT_BUCKETS = (0, 1, 5, 10, 20, 50, 100, 500, 1000)
+
+ARCHIVE_FILE = 'archived.json'
+LOCK_FILE = '.lock'
+# Файл процесса: <pid>-<время запуска>.json (просто <pid>.json — из прежних версий)
+_PROCESS_FILE_RE = re.compile(r'^(?P<pid>\d+)(?:-\d+)?\.json$')
+
+
+def _labels_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+class Registry:
+    """Значения метрик текущего процесса и сборка всех процессов для ``/metrics``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._metrics = {}
+        self._values = {}   # (имя образца, метки) -> значение
+        self._dirty = False
+        self._flusher_pid = None
+        self._process_id = None
+        self._thread_lock = threading.Lock()
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def add(self, sample, labels, amount):
+        if self._flusher_pid != os.getpid():
+            self._start_flusher()
+        key = (sample, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+            self._dirty = True
+
+    # Файлы процессов
+
+    @staticmethod
+    def directory():
+        path = getattr(settings, 'METRICS_DIR', None)
+        return Path(path) if path else None
+
+    def _start_flusher(self):
+        # Поток создаётся в каждом процессе заново: после fork потоков родителя нет
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            if self._flusher_pid is not None:
+                # Значения родителя уже в его файле, в файле процесса им не место
+                self._values = {}
+            self._flusher_pid = os.getpid()
+            self._process_id = f'{os.getpid()}-{time.time_ns()}'
+        if self.directory() is None:
+            return
+
+        def run():
+            while True:
+                time.sleep(getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0))
+                self.flush()
+
+        threading.Thread(target=run, name='metrics-flush', daemon=True).start()
+
+    def _path(self, directory):
+        return directory / f'{self._process_id}.json'
+
+    def flush(self):
+        """Записать значения процесса в его файл, если они изменились."""
+        directory = self.directory()
+        if directory is None or not self._dirty or self._flusher_pid != os.getpid():
+            return
+        with self._lock:
+            rows = [[sample, list(labels), value] for (sample, labels), value in self._values.items()]
+            self._dirty = False
+        with self._flush_lock:
+            directory.mkdir(parents=True, exist_ok=True)
+            path = self._path(directory)
+            temporary = directory / f'.{path.name}.tmp'
+            temporary.write_text(json.dumps(rows), encoding='utf-8')
+            os.replace(temporary, path)
+
+    def close(self):
+        """Перенести значения процесса в архив (при выходе процесса)."""
+        directory = self.directory()
+        if directory is None or self._flusher_pid != os.getpid():
+            return
+        self.flush()
+        with self._flush_lock:
+            # После выхода файл процесса не должен появиться снова
+            self._flusher_pid = None
+            if self._path(directory).exists():
+                with self._files_lock(directory, exclusive=True):
+                    _archive(directory, [self._path(directory)])
+
+    def _files_lock(self, directory, exclusive):
+        """Блокировка каталога: архивирование не должно попасть между чтениями файлов при сборе."""
+        if fcntl is None:
+            return self._thread_lock
+        return _FileLock(directory / LOCK_FILE, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+    def collect(self):
+        """Сумма значений всех процессов: ``{(имя образца, метки): значение}``."""
+        directory = self.directory()
+        if directory is None:
+            with self._lock:
+                return dict(self._values)
+        self.flush()
+        directory.mkdir(parents=True, exist_ok=True)
+        dead = [path for path, pid in _process_files(directory) if not _alive(pid)]
+        if dead:
+            with self._files_lock(directory, exclusive=True):
+                _archive(directory, dead)
+
+        with self._files_lock(directory, exclusive=False):
+            archive = _read_archive(directory)
+            totals = _to_totals(archive['rows'])
+            archived = set(archive['processes'])
+            for path, _pid in _process_files(directory):
+                if path.stem in archived:
+                    continue
+                _add_rows(totals, _read_rows(path))
+        return totals
+
+    def render(self):
+        values = self.collect()
+        by_sample = {}
+        for (sample, labels), value in values.items():
+            by_sample.setdefault(sample, []).append((labels, value))
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for sample in metric.samples():
+                for labels, value in sorted(by_sample.get(sample, []), key=metric.sort_key):
+                    lines.append(f'{sample}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+class _FileLock:
+
+    def __init__(self, path, operation):
+        self.path = path
+        self.operation = operation
+
+    def __enter__(self):
+        self.file = open(self.path, 'a')
+        fcntl.flock(self.file, self.operation)
+
+    def __exit__(self, *exc_info):
+        fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+
+
+def _process_files(directory):
+    """Файлы процессов каталога: ``[(путь, pid)]``."""
+    files = []
+    for path in directory.iterdir():
+        match = _PROCESS_FILE_RE.match(path.name)
+        if match:
+            files.append((path, int(match['pid'])))
+    return files
+
+
+def _alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read_rows(path):
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return []
+
+
+def _read_archive(directory):
+    try:
+        return json.loads((directory / ARCHIVE_FILE).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {'processes': [], 'rows': []}
+
+
+def _to_totals(rows):
+    totals = {}
+    _add_rows(totals, rows)
+    return totals
+
+
+def _add_rows(totals, rows):
+    for sample, labels, value in rows:
+        key = (sample, tuple(tuple(pair) for pair in labels))
+        totals[key] = totals.get(key, 0) + value
+
+
+def _archive(directory, paths):
+    """Прибавить файлы процессов к ``archived.json`` и удалить их (под блокировкой каталога).
+
+    Имена перенесённых процессов хранятся в архиве, пока их файлы не удалены:
+    если процесс упадёт между записью архива и удалением, файл не учтётся дважды.
+    """
+    archive = _read_archive(directory)
+    archived = {process for process in archive['processes'] if (directory / f'{process}.json').exists()}
+    totals = _to_totals(archive['rows'])
+    for path in paths:
+        if path.stem not in archived and path.exists():
+            _add_rows(totals, _read_rows(path))
+            archived.add(path.stem)
+    rows = [[sample, list(labels), value] for (sample, labels), value in totals.items()]
+    temporary = directory / f'.{ARCHIVE_FILE}.tmp'
+    temporary.write_text(json.dumps({'processes': sorted(archived), 'rows': rows}), encoding='utf-8')
+    os.replace(temporary, directory / ARCHIVE_FILE)
+    for path in paths:
+        path.unlink(missing_ok=True)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, registry, name, help):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        registry.register(self)
+
+    def samples(self):
+        return [self.name]
+
+    @staticmethod
+    def sort_key(item):
+        return item[0]
+
+    def inc(self, amount=1, **labels):
+        self.registry.add(self.name, _labels_key(labels), amount)
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, registry, name, help, buckets):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        registry.register(self)
+
+    def samples(self):
+        return [f'{self.name}_bucket', f'{self.name}_sum', f'{self.name}_count']
+
+    @staticmethod
+    def sort_key(item):
+        # Корзины одного набора меток идут по возрастанию le, +Inf — последней
+        labels = [pair for pair in item[0] if pair[0] != 'le']
+        le = dict(item[0]).get('le')
+        return labels, float(le) if le is not None else 0.0
+
+    def observe(self, value, **labels):
+        key = _labels_key(labels)
+        for bound in self.buckets:
+            # Пустые корзины тоже выводятся: histogram_quantile нужен полный набор
+            self.registry.add(
+                f'{self.name}_bucket', _labels_key(dict(labels, le=_format_value(float(bound)))), int(value <= bound),
+            )
+        self.registry.add(f'{self.name}_bucket', _labels_key(dict(labels, le='+Inf')), 1)
+        self.registry.add(f'{self.name}_sum', key, value)
+        self.registry.add(f'{self.name}_count', key, 1)
+
+
+registry = Registry()
+atexit.register(registry.close)
+
+REQUESTS = Counter(registry, 'dictionary_requests_total', 'Запросы по имени URL и коду ответа')
+REQUEST_DURATION = Histogram(
+    registry, 'dictionary_request_duration_seconds', 'Время обработки запроса по имени URL', LATENCY_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(registry, 'dictionary_request_queries', 'SQL-запросов на запрос по имени URL', QUERY_BUCKETS)
+CACHE_REQUESTS = Counter(
+    registry, 'dictionary_cache_requests_total', 'Обращения к кэшу страниц по префиксу ключа и результату',
+)
+SEARCH_RESULTS = Histogram(registry, 'dictionary_search_results', 'Число результатов поиска', RESULT_BUCKETS)
+BULK_ITEMS = Counter(registry, 'dictionary_bulk_items_total', 'Элементы, обработанные массовыми операциями')
+BULK_SECONDS = Counter(registry, 'dictionary_bulk_seconds_total', 'Время массовых операций')
+
+
+def view_label(request):
+    """Имя URL ``dictionary:*`` или ``other``: число значений метки ограничено."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None or match.namespace != 'dictionary':
+        return 'other'
+    return match.view_name
+
+
+def observe_bulk(operation, items, seconds):
+    """Учесть порцию массовой операции: число элементов и время."""
+    BULK_ITEMS.inc(items, operation=operation)
+    BULK_SECONDS.inc(seconds, operation=operation)
+
+
+class MetricsMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+        view = view_label(request)
+        REQUESTS.inc(view=view, status=str(response.status_code))
+        REQUEST_DURATION.observe(elapsed, view=view)
+        query_stats = getattr(request, 'query_stats', None)
+        if query_stats is not None:
+            REQUEST_QUERIES.observe(query_stats.count, view=view)
+        return response
@@ -0,0 +1,58 @@
+from django.db import migrations
+
+# SQL зафиксирован здесь, а не импортируется из dictionary.search: миграция
+# должна выполняться так же, как в момент её создания, что бы ни стало с модулем
+
+FTS_TABLE = 'dictionary_word_fts'
+WORD_TABLE = 'dictionary_word'
+
+FTS_INSTALL_SQL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        word, meaning,
+        content='{WORD_TABLE}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {WORD_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, word, meaning) VALUES (new.id, new.word, new.meaning);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {WORD_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, word, meaning) VALUES ('delete', old.id, old.word, old.meaning);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF word, meaning ON {WORD_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, word, meaning) VALUES ('delete', old.id, old.word, old.meaning);
+        INSERT INTO {FTS_TABLE}(rowid, word, meaning) VALUES (new.id, new.word, new.meaning);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+FTS_UNINSTALL_SQL = FTS_INSTALL_SQL[:4]
+
+
+def forwards(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in FTS_INSTALL_SQL:
+        schema_editor.execute(sql)
+
+
+def backwards(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in FTS_UNINSTALL_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.0.8 on 2026-10-17 00:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def make_trigrams(text):
+    """Триграммы строки — копия ``dictionary.fuzzy.make_trigrams`` на момент миграции."""
+    trigrams = set()
+    for token in ' '.join(text.casefold().split()).split(' '):
+        if not token:
+            continue
+        padded = f'  {token} '
+        trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+
+def populate_trigrams(apps, schema_editor):
+    Word = apps.get_model('dictionary', 'Word')
+    WordTrigram = apps.get_model('dictionary', 'WordTrigram')
+    batch = []
+    for word_id, language_id, text in Word.objects.values_list('id', 'language_id', 'word').iterator():
+        batch.extend(
+            WordTrigram(word_id=word_id, language_id=language_id, trigram=trigram)
+            for trigram in make_trigrams(text)
+        )
+        if len(batch) >= 2000:
+            WordTrigram.objects.bulk_create(batch)
+            batch = []
+    WordTrigram.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0002_word_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WordTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('language', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='dictionary.language')),
+                ('word', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigrams', to='dictionary.word')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='wordtrigram',
+            index=models.Index(fields=['trigram', 'language'], name='dictionary__trigram_d3ace9_idx'),
+        ),
+        migrations.RunPython(populate_trigrams, migrations.RunPython.noop),
+    ]
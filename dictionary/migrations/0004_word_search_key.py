@@ -0,0 +1,81 @@
+# Generated by Django 4.0.8 on 2026-10-17 00:45
+
+import importlib
+import unicodedata
+
+from django.db import migrations, models
+
+# Нормализация и SQL зафиксированы здесь, а не импортируются из модулей
+# приложения: ключи, записанные миграцией, не должны зависеть от того, как
+# dictionary.normalization изменится позже (для этого есть backfill_search_keys)
+
+KAZAKH_FOLDING = str.maketrans({
+    'ә': 'а', 'ғ': 'г', 'қ': 'к', 'ң': 'н', 'ө': 'о',
+    'ұ': 'у', 'ү': 'у', 'һ': 'х', 'і': 'и', 'ё': 'е',
+})
+RUSSIAN_FOLDING = str.maketrans({'ё': 'е'})
+TURKISH_CASE = str.maketrans({'I': 'ı', 'İ': 'i'})
+TURKISH_FOLDING = str.maketrans({'ı': 'i'})
+
+
+def _strip_diacritics(text):
+    decomposed = unicodedata.normalize('NFKD', text)
+    return unicodedata.normalize('NFC', ''.join(c for c in decomposed if not unicodedata.combining(c)))
+
+
+def normalize_word(text, language_code):
+    text = ' '.join(text.split())
+    if language_code == 'tr':
+        text = text.translate(TURKISH_CASE).lower()
+        return _strip_diacritics(text.translate(TURKISH_FOLDING))
+    text = text.casefold()
+    if language_code == 'kk':
+        return text.translate(KAZAKH_FOLDING)
+    if language_code == 'ru':
+        return text.translate(RUSSIAN_FOLDING)
+    return _strip_diacritics(text)
+
+
+# Тот же SQL, что создаёт FTS в 0002
+FTS_INSTALL_SQL = importlib.import_module('dictionary.migrations.0002_word_fts').FTS_INSTALL_SQL
+
+
+def backfill_search_keys(apps, schema_editor):
+    Word = apps.get_model('dictionary', 'Word')
+    words = []
+    for word in Word.objects.select_related('language').only('id', 'word', 'language__code').iterator():
+        word.search_key = normalize_word(word.word, word.language.code)
+        words.append(word)
+        if len(words) >= 1000:
+            Word.objects.bulk_update(words, ['search_key'])
+            words = []
+    Word.objects.bulk_update(words, ['search_key'])
+
+
+def reinstall_fts(apps, schema_editor):
+    # SQLite пересоздаёт таблицу при AddField, триггеры FTS нужно вернуть
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in FTS_INSTALL_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0003_word_trigram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='word',
+            name='search_key',
+            field=models.CharField(blank=True, editable=False, help_text='Нормализованное слово для поиска (см. dictionary.normalization)', max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='word',
+            index=models.Index(fields=['language', 'search_key'], name='dictionary__languag_c248fe_idx'),
+        ),
+        migrations.RunPython(reinstall_fts, migrations.RunPython.noop),
+        migrations.RunPython(backfill_search_keys, migrations.RunPython.noop),
+    ]
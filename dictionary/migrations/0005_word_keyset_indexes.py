@@ -0,0 +1,25 @@
+# Generated by Django 4.0.8 on 2026-10-17 00:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0004_word_search_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='word',
+            index=models.Index(fields=['word', 'id'], name='dictionary__word_521819_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='word',
+            index=models.Index(fields=['created_at', 'id'], name='dictionary__created_18b2f4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='word',
+            index=models.Index(fields=['category', 'word', 'id'], name='dictionary__categor_8d6432_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.0.8 on 2026-10-17 01:05
+
+from django.db import migrations, models
+
+# Модели, попадающие в журнал синхронизации (имена — как в dictionary.sync)
+SYNCED_MODELS = (
+    ('word', 'Word'),
+    ('translation', 'Translation'),
+    ('category_translation', 'CategoryTranslation'),
+    ('tag_translation', 'TagTranslation'),
+    ('interface_translation', 'InterfaceTranslation'),
+)
+
+
+def seed_sync_log(apps, schema_editor):
+    # Уже существующие объекты попадают в журнал, чтобы клиент с cursor=0 получил всё
+    SyncChange = apps.get_model('dictionary', 'SyncChange')
+    for name, model_name in SYNCED_MODELS:
+        Model = apps.get_model('dictionary', model_name)
+        batch = []
+        for object_id in Model.objects.order_by('id').values_list('id', flat=True).iterator():
+            batch.append(SyncChange(model=name, object_id=object_id))
+            if len(batch) >= 1000:
+                SyncChange.objects.bulk_create(batch)
+                batch = []
+        SyncChange.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0005_word_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncChange',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(max_length=30)),
+                ('object_id', models.BigIntegerField()),
+                ('changed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('model', 'object_id')},
+            },
+        ),
+        migrations.RunPython(seed_sync_log, migrations.RunPython.noop),
+    ]
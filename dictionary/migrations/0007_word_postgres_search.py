@@ -0,0 +1,83 @@
+from django.db import migrations
+
+# SQL зафиксирован здесь, а не импортируется из dictionary.search: миграция
+# должна выполняться так же, как в момент её создания, что бы ни стало с модулем
+
+WORD_TABLE = 'dictionary_word'
+PG_VECTOR_COLUMN = 'search_vector'
+PG_VECTOR_FUNCTION = 'dictionary_word_search_vector'
+PG_VECTOR_TRIGGER = 'dictionary_word_search_vector_tg'
+
+# Конфигурация текстового поиска по коду языка; остальные языки — simple
+TS_CONFIGS = {
+    'ru': 'russian',
+    'en': 'english',
+    'tr': 'turkish',
+    'de': 'german',
+    'fr': 'french',
+    'es': 'spanish',
+    'it': 'italian',
+}
+
+_TS_CONFIG_CASE = ' '.join(f"WHEN '{code}' THEN '{config}'" for code, config in TS_CONFIGS.items())
+
+PG_INSTALL_SQL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    f'ALTER TABLE {WORD_TABLE} ADD COLUMN IF NOT EXISTS {PG_VECTOR_COLUMN} tsvector',
+    f"""CREATE OR REPLACE FUNCTION {PG_VECTOR_FUNCTION}() RETURNS trigger AS $$
+    DECLARE
+        config regconfig;
+    BEGIN
+        SELECT (CASE code {_TS_CONFIG_CASE} ELSE 'simple' END)::regconfig INTO config
+        FROM dictionary_language WHERE id = NEW.language_id;
+        config := COALESCE(config, 'simple'::regconfig);
+        NEW.{PG_VECTOR_COLUMN} :=
+            setweight(to_tsvector(config, COALESCE(NEW.word, '')), 'A')
+            || setweight(to_tsvector('simple', COALESCE(NEW.word, '')), 'A')
+            || setweight(to_tsvector(config, COALESCE(NEW.meaning, '')), 'B')
+            || setweight(to_tsvector('simple', COALESCE(NEW.meaning, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql""",
+    f'DROP TRIGGER IF EXISTS {PG_VECTOR_TRIGGER} ON {WORD_TABLE}',
+    f"""CREATE TRIGGER {PG_VECTOR_TRIGGER} BEFORE INSERT OR UPDATE OF word, meaning, language_id
+        ON {WORD_TABLE} FOR EACH ROW EXECUTE FUNCTION {PG_VECTOR_FUNCTION}()""",
+    f'UPDATE {WORD_TABLE} SET word = word',
+    f'CREATE INDEX IF NOT EXISTS dictionary_word_search_vector_gin ON {WORD_TABLE} USING gin ({PG_VECTOR_COLUMN})',
+    f'CREATE INDEX IF NOT EXISTS dictionary_word_word_trgm ON {WORD_TABLE} USING gin (word gin_trgm_ops)',
+    f'CREATE INDEX IF NOT EXISTS dictionary_word_meaning_trgm ON {WORD_TABLE} USING gin (meaning gin_trgm_ops)',
+]
+
+PG_UNINSTALL_SQL = [
+    'DROP INDEX IF EXISTS dictionary_word_meaning_trgm',
+    'DROP INDEX IF EXISTS dictionary_word_word_trgm',
+    'DROP INDEX IF EXISTS dictionary_word_search_vector_gin',
+    f'DROP TRIGGER IF EXISTS {PG_VECTOR_TRIGGER} ON {WORD_TABLE}',
+    f'DROP FUNCTION IF EXISTS {PG_VECTOR_FUNCTION}()',
+    f'ALTER TABLE {WORD_TABLE} DROP COLUMN IF EXISTS {PG_VECTOR_COLUMN}',
+]
+
+
+def forwards(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in PG_INSTALL_SQL:
+        schema_editor.execute(sql)
+
+
+def backwards(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in PG_UNINSTALL_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0006_sync_change'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
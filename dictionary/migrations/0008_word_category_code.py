@@ -0,0 +1,48 @@
+# Generated by Django 4.0.8 on 2026-10-17 02:12
+
+import importlib
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+# Тот же SQL, что создаёт FTS в 0002
+FTS_INSTALL_SQL = importlib.import_module('dictionary.migrations.0002_word_fts').FTS_INSTALL_SQL
+
+
+def reinstall_fts(apps, schema_editor):
+    # SQLite пересоздаёт таблицу при AddField и RemoveField, триггеры FTS нужно вернуть
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in FTS_INSTALL_SQL:
+        schema_editor.execute(sql)
+
+
+def backfill_category_codes(apps, schema_editor):
+    Category = apps.get_model('dictionary', 'Category')
+    Word = apps.get_model('dictionary', 'Word')
+    Word.objects.filter(category__isnull=False).update(
+        category_code=Subquery(Category.objects.filter(id=OuterRef('category_id')).values('code')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0007_word_postgres_search'),
+    ]
+
+    operations = [
+        # При откате выполняется последней, после RemoveField
+        migrations.RunPython(migrations.RunPython.noop, reinstall_fts),
+        migrations.AddField(
+            model_name='word',
+            name='category_code',
+            field=models.CharField(blank=True, editable=False, help_text='Код категории (копия для сортировки по индексу)', max_length=50),
+        ),
+        migrations.RunPython(backfill_category_codes, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='word',
+            index=models.Index(fields=['category_code', 'word', 'id'], name='dictionary__categor_db3077_idx'),
+        ),
+        migrations.RunPython(reinstall_fts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+
+def make_trigrams(key):
+    """Триграммы ключа — копия ``dictionary.fuzzy.make_trigrams`` на момент миграции."""
+    trigrams = set()
+    for token in key.split(' '):
+        if not token:
+            continue
+        padded = f'  {token} '
+        trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+
+def rebuild_trigrams(apps, schema_editor):
+    """Пересобрать триграммы по ``search_key``: раньше они строились по ``word.casefold()``."""
+    Word = apps.get_model('dictionary', 'Word')
+    WordTrigram = apps.get_model('dictionary', 'WordTrigram')
+    WordTrigram.objects.all().delete()
+    batch = []
+    for word_id, language_id, key in Word.objects.values_list('id', 'language_id', 'search_key').iterator():
+        batch.extend(
+            WordTrigram(word_id=word_id, language_id=language_id, trigram=trigram)
+            for trigram in make_trigrams(key)
+        )
+        if len(batch) >= 2000:
+            WordTrigram.objects.bulk_create(batch)
+            batch = []
+    WordTrigram.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0008_word_category_code'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_trigrams, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,8 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils import translation
 
+from .normalization import normalize_word
+
 class Language(models.Model):
     """Справочник поддерживаемых языков."""
     code = models.CharField(max_length=10, unique=True)  # 'ru', 'kk', 'en', 'tr'
@@ -64,11 +66,13 @@ class Word(models.Model):
         ('hard', 'Сложно'),
     ]
     word = models.CharField(max_length=100)
+    search_key = models.CharField(max_length=100, blank=True, editable=False, help_text='Нормализованное слово для поиска (см. dictionary.normalization)')
     language = models.ForeignKey(Language, on_delete=models.CASCADE)
     meaning = models.TextField()
     # Если нужно поддерживать несколько категорий для одного слова, раскомментируйте:
     # categories = models.ManyToManyField(Category, blank=True, related_name='words')
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name='words')
+    category_code = models.CharField(max_length=50, blank=True, editable=False, help_text='Код категории (копия для сортировки по индексу)')
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     tags = models.ManyToManyField(Tag, blank=True, related_name='words')
     image = models.ImageField(upload_to='word_images/', blank=True, null=True)
@@ -88,7 +92,35 @@ class Word(models.Model):
             models.Index(fields=['word']),
             models.Index(fields=['language']),
             models.Index(fields=['status']),
+            models.Index(fields=['language', 'search_key']),
+            # Keyset-пагинация: по одному индексу на каждый вариант сортировки
+            models.Index(fields=['word', 'id']),
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['category', 'word', 'id']),
+            models.Index(fields=['category_code', 'word', 'id']),
         ]
+    # Поля, от которых зависят триграммы нечёткого поиска (dictionary.fuzzy)
+    INDEXED_TEXT_FIELDS = frozenset({'word', 'language', 'language_id'})
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Текст и язык из БД: триграммы пересобираются, только если они изменились
+        instance._indexed_text = (instance.__dict__.get('word'), instance.__dict__.get('language_id'))
+        return instance
+    def save(self, *args, **kwargs):
+        self.search_key = normalize_word(self.word, self.language.code)
+        self.category_code = self.category.code if self.category_id else ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'word' in update_fields:
+                update_fields.add('search_key')
+            if update_fields & {'category', 'category_id'}:
+                update_fields.add('category_code')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+        if update_fields is None or update_fields & self.INDEXED_TEXT_FIELDS:
+            self._indexed_text = (self.word, self.language_id)
     def __str__(self):
         w = self.word if len(self.word) <= 20 else self.word[:17] + '...'
         return f'{w} ({self.language.code})'
@@ -108,6 +140,16 @@ class Translation(models.Model):
         tw = self.to_word.word if len(self.to_word.word) <= 15 else self.to_word.word[:12] + '...'
         return f'{fw} → {tw}'
 
+class WordTrigram(models.Model):
+    """Инвертированный индекс триграмм слов для нечёткого поиска (см. dictionary.fuzzy)."""
+    word = models.ForeignKey(Word, on_delete=models.CASCADE, related_name='trigrams')
+    language = models.ForeignKey(Language, on_delete=models.CASCADE)
+    trigram = models.CharField(max_length=3)
+    class Meta:
+        indexes = [
+            models.Index(fields=['trigram', 'language']),
+        ]
+
 class Example(models.Model):
     word = models.ForeignKey(Word, on_delete=models.CASCADE, related_name='examples')
     text = models.TextField()
@@ -161,4 +203,15 @@ class InterfaceTranslation(models.Model):
         v = self.value if len(self.value) <= 20 else self.value[:17] + '...'
         return f'{self.language.code}: {self.key} = {v}'
 
-        
\ No newline at end of file
+        
+class SyncChange(models.Model):
+    """Журнал изменений для дельта-синхронизации клиентов (см. dictionary.sync).
+    На каждый объект хранится одна строка — с последним номером изменения."""
+    seq = models.BigAutoField(primary_key=True)
+    model = models.CharField(max_length=30)     # 'word', 'translation', ...
+    object_id = models.BigIntegerField()
+    changed_at = models.DateTimeField(auto_now=True)
+    class Meta:
+        unique_together = ('model', 'object_id')
+    def __str__(self):
+        return f'#{self.seq} {self.model}:{self.object_id}'
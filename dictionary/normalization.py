@@ -0,0 +1,75 @@
+"""Нормализация слов для индексируемого поиска.
+
+``Word.search_key`` хранит слово, приведённое к нижнему регистру по правилам
+его языка и очищенное от диакритики: так поиск по префиксу или точному
+совпадению идёт по обычному индексу, а не через ``LIKE '%q%'``, который в
+SQLite не учитывает регистр для не-ASCII символов.
+"""
+import unicodedata
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+
+# Верхняя граница для диапазонного поиска по префиксу
+PREFIX_UPPER_BOUND = '\U0010ffff'
+
+# Казахские буквы приводятся к ближайшим русским: так слово находится,
+# даже если его набрали на русской раскладке
+KAZAKH_FOLDING = str.maketrans({
+    'ә': 'а', 'ғ': 'г', 'қ': 'к', 'ң': 'н', 'ө': 'о',
+    'ұ': 'у', 'ү': 'у', 'һ': 'х', 'і': 'и', 'ё': 'е',
+})
+
+RUSSIAN_FOLDING = str.maketrans({'ё': 'е'})
+
+# В турецком у I/İ своя пара регистров: I -> ı, İ -> i
+TURKISH_CASE = str.maketrans({'I': 'ı', 'İ': 'i'})
+TURKISH_FOLDING = str.maketrans({'ı': 'i'})
+
+
+def _strip_diacritics(text):
+    decomposed = unicodedata.normalize('NFKD', text)
+    return unicodedata.normalize('NFC', ''.join(c for c in decomposed if not unicodedata.combining(c)))
+
+
+def _squash_spaces(text):
+    return ' '.join(text.split())
+
+
+def normalize_word(text, language_code):
+    """Ключ поиска для ``text`` на языке ``language_code``."""
+    text = _squash_spaces(text)
+    if language_code == 'tr':
+        text = text.translate(TURKISH_CASE).lower()
+        return _strip_diacritics(text.translate(TURKISH_FOLDING))
+    text = text.casefold()
+    if language_code == 'kk':
+        return text.translate(KAZAKH_FOLDING)
+    if language_code == 'ru':
+        return text.translate(RUSSIAN_FOLDING)
+    return _strip_diacritics(text)
+
+
+def prefix_range(key):
+    """Условия для поиска по префиксу через диапазон (использует обычный индекс)."""
+    return {'search_key__gte': key, 'search_key__lt': key + PREFIX_UPPER_BOUND}
+
+
+def search_key_filter(query, languages, prefix=True):
+    """Q-условие по ``search_key`` для запроса на любом из ``languages``.
+
+    ``languages`` — пары ``(language_id, code)``; для каждого языка запрос
+    нормализуется по его правилам, поэтому условие опирается на индекс
+    ``(language, search_key)``.
+    """
+    conditions = []
+    for language_id, code in languages:
+        key = normalize_word(query, code)
+        if not key:
+            continue
+        lookup = prefix_range(key) if prefix else {'search_key': key}
+        conditions.append(Q(language_id=language_id, **lookup))
+    if not conditions:
+        return Q(pk__in=[])
+    return reduce(or_, conditions)
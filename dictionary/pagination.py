@@ -0,0 +1,225 @@
+"""Keyset-пагинация (пагинация по курсору).
+
+В отличие от ``Paginator`` не выполняет ``COUNT(*)`` и ``OFFSET n``: следующая
+страница выбирается условием «строки после последней показанной» по полям
+сортировки, поэтому глубокие страницы стоят столько же, сколько первая, при
+наличии индекса по этим полям (см. ``Word.Meta.indexes``).
+
+Курсор — непрозрачный токен (base64 от JSON со значениями полей сортировки
+граничной строки и направлением). Последнее поле сортировки должно быть
+уникальным (обычно ``id``). NULL считается наименьшим значением: при
+сортировке по возрастанию пустые значения идут первыми, по убыванию — последними.
+``NULLS FIRST``/``NULLS LAST`` и проверки ``IS NULL`` добавляются только для полей,
+которые могут быть NULL (и для аннотаций): в PostgreSQL ``ASC NULLS FIRST``
+не совпадает с порядком обычного индекса, и сортировка по нему шла бы без индекса.
+
+Число найденных строк, если оно всё же нужно, считает ``capped_count``: не
+дальше ``COUNT_LIMIT`` строк, чтобы широкий фильтр не стоил полного ``COUNT(*)``.
+"""
+import base64
+import binascii
+import datetime
+import json
+from collections import namedtuple
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F, Model, Q
+
+FORWARD = 'n'
+BACKWARD = 'p'
+
+COUNT_LIMIT = 1000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values, direction):
+    payload = json.dumps({'v': values, 'd': direction}, separators=(',', ':'), default=_json_default)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        values, direction = payload['v'], payload['d']
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+        raise InvalidCursor(token)
+    if direction not in (FORWARD, BACKWARD) or not isinstance(values, list):
+        raise InvalidCursor(token)
+    return values, direction
+
+
+class CappedCount(namedtuple('CappedCount', 'value exact')):
+    """Число строк не больше предела; ``exact`` ложно, если строк больше."""
+
+    def __str__(self):
+        return str(self.value) if self.exact else f'{self.value}+'
+
+
+def capped_count(queryset, limit=COUNT_LIMIT):
+    """Посчитать строки ``queryset``, но не больше ``limit``: ``COUNT`` по подзапросу с ``LIMIT``."""
+    value = queryset[:limit + 1].count()
+    return CappedCount(min(value, limit), value <= limit)
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f'Нельзя сериализовать {type(value).__name__} в курсор')
+
+
+def _nullable(model, path):
+    """Может ли поле ``path`` (через ``__``) быть NULL; аннотации считаются допускающими NULL."""
+    field = None
+    for attr in path.split('__'):
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return True
+        if field.null:
+            return True
+        if field.is_relation:
+            model = field.related_model
+    return field is None
+
+
+def _parse_ordering(ordering, model):
+    fields = []
+    for name in ordering:
+        descending = name.startswith('-')
+        name = name.lstrip('-')
+        fields.append((name, descending, _nullable(model, name)))
+    return fields
+
+
+def _order_expressions(fields, reverse=False):
+    expressions = []
+    for name, descending, nullable in fields:
+        if descending != reverse:
+            expressions.append(F(name).desc(nulls_last=True) if nullable else F(name).desc())
+        else:
+            expressions.append(F(name).asc(nulls_first=True) if nullable else F(name).asc())
+    return expressions
+
+
+def _seek_filter(fields, values, forward):
+    """Условие «строка идёт после (или до) строки со значениями ``values``»."""
+    (name, descending, nullable), rest = fields[0], fields[1:]
+    value = values[0]
+    increasing = descending != forward
+    if value is None:
+        beyond = Q(**{f'{name}__isnull': False}) if increasing else Q(pk__in=[])
+        same = Q(**{f'{name}__isnull': True})
+    else:
+        if increasing:
+            beyond = Q(**{f'{name}__gt': value})
+        elif nullable:
+            beyond = Q(**{f'{name}__lt': value}) | Q(**{f'{name}__isnull': True})
+        else:
+            beyond = Q(**{f'{name}__lt': value})
+        same = Q(**{name: value})
+    if not rest:
+        return beyond
+    return beyond | (same & _seek_filter(rest, values[1:], forward))
+
+
+def _value_of(obj, path):
+    for attr in path.split('__'):
+        if obj is None:
+            return None
+        obj = getattr(obj, attr)
+    # Сортировка по внешнему ключу идёт по его id
+    if isinstance(obj, Model):
+        return obj.pk
+    return obj
+
+
+class KeysetPage:
+    """Страница результатов; итерируется как список объектов."""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def __getstate__(self):
+        # В кэш страница попадает без paginator (его queryset при pickle выполнился бы целиком),
+        # поэтому курсоры вычисляются заранее
+        state = dict(self.__dict__, paginator=None)
+        state['_cursors'] = (self.next_cursor, self.previous_cursor)
+        return state
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    @property
+    def next_cursor(self):
+        if not self.has_next:
+            return ''
+        if self.paginator is None:
+            return self._cursors[0]
+        return encode_cursor(self.paginator.cursor_values(self.object_list[-1]), FORWARD)
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous:
+            return ''
+        if self.paginator is None:
+            return self._cursors[1]
+        return encode_cursor(self.paginator.cursor_values(self.object_list[0]), BACKWARD)
+
+
+class KeysetPaginator:
+    """Пагинация queryset по курсору.
+
+    ``ordering`` — поля сортировки как в ``order_by()`` (в том числе через
+    ``__`` и аннотации); последнее поле должно быть уникальным.
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = list(ordering)
+        self.fields = _parse_ordering(self.ordering, queryset.model)
+        self.per_page = per_page
+
+    def cursor_values(self, obj):
+        return [_value_of(obj, name) for name, _, _ in self.fields]
+
+    def get_page(self, cursor=None):
+        """Страница по курсору; пустой или испорченный курсор даёт первую страницу."""
+        values, direction = None, FORWARD
+        if cursor:
+            try:
+                values, direction = decode_cursor(cursor)
+            except InvalidCursor:
+                values = None
+            if values is not None and len(values) != len(self.fields):
+                values, direction = None, FORWARD
+
+        forward = direction == FORWARD
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(_seek_filter(self.fields, values, forward))
+        queryset = queryset.order_by(*_order_expressions(self.fields, reverse=not forward))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if forward:
+            return KeysetPage(rows, self, has_next=has_more, has_previous=values is not None)
+        rows.reverse()
+        return KeysetPage(rows, self, has_next=True, has_previous=has_more)
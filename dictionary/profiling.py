@@ -0,0 +1,232 @@
+"""Выборочное профилирование запросов.
+
+``ProfilingMiddleware`` профилирует долю ``PROFILING_SAMPLE_RATE`` всех
+запросов и любой запрос сотрудника с заголовком ``PROFILING_HEADER``
+(``X-Profile: 1`` — режим по умолчанию, ``X-Profile: sample`` или
+``X-Profile: cprofile`` — указанный). Режимы (``PROFILING_MODE``):
+
+* ``cprofile`` — ``cProfile`` по всем вызовам, файл ``.prof`` для
+  ``python -m pstats`` или snakeviz;
+* ``sample`` — фоновый поток раз в ``PROFILING_INTERVAL`` секунд снимает
+  стек потока запроса; файл ``.collapsed`` — строки ``кадр;кадр;… число``
+  для flamegraph.pl или speedscope. Замедляет запрос заметно меньше
+  ``cProfile``, но короткие вызовы в него не попадают.
+
+Профили пишутся в ``PROFILING_DIR`` под именами вида
+``20260101-120000-123456-4242-350ms-dictionary.quick_translate_detail.prof``
+(время, pid, длительность, имя URL): страница ``/profiles/`` строит список
+по именам файлов, общего для процессов индекса нет. Хранятся последние
+``PROFILING_MAX_FILES`` профилей.
+
+Запрос, который не профилируется, стоит одного ``random.random()`` и поиска
+заголовка; без ``PROFILING_DIR`` middleware отключается целиком. Middleware
+стоит после ``AuthenticationMiddleware`` (нужен ``request.user``), поэтому
+сессия и аутентификация в профиль не входят, как и отправка тела потоковых
+ответов.
+"""
+import cProfile
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, namedtuple
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .instrumentation import view_name
+
+logger = logging.getLogger('dictionary.profiling')
+
+CPROFILE = 'cprofile'
+SAMPLE = 'sample'
+EXTENSIONS = {CPROFILE: '.prof', SAMPLE: '.collapsed'}
+
+DEFAULT_HEADER = 'X-Profile'
+DEFAULT_INTERVAL = 0.005
+DEFAULT_MAX_FILES = 500
+
+_UNSAFE_RE = re.compile(r'[^\w.-]+')
+_NAME_RE = re.compile(
+    r'^(?P<created>\d{8}-\d{6}-\d{6})-(?P<pid>\d+)-(?P<duration>\d+)ms-(?P<view>[\w.-]+)'
+    r'(?P<extension>\.prof|\.collapsed)$'
+)
+
+# Профиль из каталога: имя файла, имя URL, длительность запроса, время, режим и размер
+Profile = namedtuple('Profile', 'name view duration_ms created mode size')
+
+
+def directory():
+    path = getattr(settings, 'PROFILING_DIR', None)
+    return Path(path) if path else None
+
+
+class StackSampler:
+    """Фоновый поток, который раз в ``interval`` секунд запоминает стек потока ``thread_id``."""
+
+    def __init__(self, thread_id, interval=DEFAULT_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiling-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[_collapse(frame)] += 1
+
+    def collapsed(self):
+        """Стеки в формате flamegraph.pl: корень слева, число снимков в конце строки."""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+def _collapse(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        # «;» разделяет кадры, пробел — стек и число
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+                     .replace(';', ':').replace(' ', '_'))
+        frame = frame.f_back
+    names.reverse()
+    return ';'.join(names)
+
+
+def profile_name(view, duration, mode, now=None):
+    now = now or datetime.now()
+    view = _UNSAFE_RE.sub('_', view.replace(':', '.')) or 'unresolved'
+    return f'{now:%Y%m%d-%H%M%S-%f}-{os.getpid()}-{round(duration * 1000)}ms-{view}{EXTENSIONS[mode]}'
+
+
+def save(write, view, duration, mode):
+    """Записать профиль в ``PROFILING_DIR`` и удалить самые старые сверх ``PROFILING_MAX_FILES``.
+
+    ``write(path)`` сохраняет профиль в файл; имя получившегося профиля возвращается.
+    """
+    root = directory()
+    root.mkdir(parents=True, exist_ok=True)
+    name = profile_name(view, duration, mode)
+    # Страница профилей не должна увидеть файл недописанным
+    temporary = root / f'.{name}.tmp'
+    write(temporary)
+    os.replace(temporary, root / name)
+    prune(root, getattr(settings, 'PROFILING_MAX_FILES', DEFAULT_MAX_FILES))
+    return name
+
+
+def prune(root, keep):
+    names = sorted(path.name for path in root.iterdir() if _NAME_RE.match(path.name))
+    for name in names[:max(len(names) - keep, 0)]:
+        # Тот же файл может удалять соседний процесс
+        (root / name).unlink(missing_ok=True)
+
+
+def list_profiles():
+    """Профили из ``PROFILING_DIR``, новые первыми."""
+    root = directory()
+    if root is None or not root.is_dir():
+        return []
+    profiles = []
+    for path in root.iterdir():
+        match = _NAME_RE.match(path.name)
+        if match is None:
+            continue
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            continue
+        profiles.append(Profile(
+            name=path.name,
+            view=match['view'],
+            duration_ms=int(match['duration']),
+            created=datetime.strptime(match['created'], '%Y%m%d-%H%M%S-%f'),
+            mode=CPROFILE if match['extension'] == EXTENSIONS[CPROFILE] else SAMPLE,
+            size=size,
+        ))
+    profiles.sort(key=lambda profile: profile.name, reverse=True)
+    return profiles
+
+
+def profile_path(name):
+    """Путь к профилю по имени файла или ``None``, если такого профиля нет."""
+    root = directory()
+    if root is None or not _NAME_RE.match(name):
+        return None
+    path = root / name
+    return path if path.is_file() else None
+
+
+class ProfilingMiddleware:
+
+    def __init__(self, get_response):
+        if directory() is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+        self.header = getattr(settings, 'PROFILING_HEADER', DEFAULT_HEADER)
+        self.mode = getattr(settings, 'PROFILING_MODE', CPROFILE)
+        self.interval = getattr(settings, 'PROFILING_INTERVAL', DEFAULT_INTERVAL)
+
+    def __call__(self, request):
+        requested = request.headers.get(self.header) if self.header else None
+        forced = bool(requested) and request.user.is_staff
+        if forced:
+            mode = requested if requested in EXTENSIONS else self.mode
+        elif self.sample_rate and random.random() < self.sample_rate:
+            mode = self.mode
+        else:
+            return self.get_response(request)
+
+        if mode == SAMPLE:
+            response, duration, write = self._sample(request)
+        else:
+            response, duration, write = self._cprofile(request)
+        if write is None:
+            return response
+        try:
+            name = save(write, view_name(request), duration, mode)
+        except OSError:
+            # Без профиля ответ всё равно нужно отдать
+            logger.exception('Не удалось сохранить профиль запроса %s', request.path)
+            return response
+        if forced:
+            response[f'{self.header}-File'] = name
+        return response
+
+    def _cprofile(self, request):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Поток уже профилируется (например, отладчиком) — запрос идёт как обычно
+            return self.get_response(request), 0, None
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        return response, time.perf_counter() - started, profiler.dump_stats
+
+    def _sample(self, request):
+        sampler = StackSampler(threading.get_ident(), self.interval)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            sampler.stop()
+        return response, time.perf_counter() - started, lambda path: Path(path).write_text(sampler.collapsed())
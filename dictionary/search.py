@@ -0,0 +1,339 @@
+"""Полнотекстовый поиск по словам (Word.word и Word.meaning).
+
+Поиск выполняет бэкенд, выбранный по текущей БД (``get_backend()``):
+
+* ``PostgresSearchBackend`` — столбец ``search_vector`` (tsvector) с GIN-индексом
+  и GIN-индексы pg_trgm по ``word`` и ``meaning``. Вектор заполняет триггер БД
+  с конфигурацией текстового поиска языка слова (``TS_CONFIGS``) и, чтобы
+  работал поиск по префиксу, с конфигурацией ``simple``. Столбец, триггер и
+  индексы не описаны в модели и создаются миграцией.
+* ``SQLiteSearchBackend`` — виртуальная таблица FTS5 ``dictionary_word_fts`` в режиме
+  external content: rowid совпадает с ``Word.id``, а синхронизацию с таблицей слов
+  выполняют триггеры БД, поэтому индекс остаётся актуальным и при ``save()``/``delete()``,
+  и при ``bulk_create``/``update``.
+* ``SearchBackend`` — без индексов: значение не ищется, остаётся только
+  поиск по ``search_key`` (``LIKE '%q%'`` по значению читал бы всю таблицу).
+
+Помимо этого запрос сравнивается с ``Word.search_key`` по префиксу (с учётом
+правил регистра и диакритики каждого языка), см. ``dictionary.normalization``.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q, Value, FloatField
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+
+from . import caching
+from .normalization import search_key_filter
+
+FTS_TABLE = 'dictionary_word_fts'
+WORD_TABLE = 'dictionary_word'
+
+# Вес совпадений в самом слове выше, чем в значении
+FTS_RANK = 'bm25(10.0, 1.0)'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+FTS_INSTALL_SQL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        word, meaning,
+        content='{WORD_TABLE}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {WORD_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, word, meaning) VALUES (new.id, new.word, new.meaning);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {WORD_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, word, meaning) VALUES ('delete', old.id, old.word, old.meaning);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF word, meaning ON {WORD_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, word, meaning) VALUES ('delete', old.id, old.word, old.meaning);
+        INSERT INTO {FTS_TABLE}(rowid, word, meaning) VALUES (new.id, new.word, new.meaning);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', '{FTS_RANK}')",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+FTS_UNINSTALL_SQL = FTS_INSTALL_SQL[:4]
+
+# PostgreSQL: конфигурация текстового поиска по коду языка; остальные языки — simple
+TS_CONFIGS = {
+    'ru': 'russian',
+    'en': 'english',
+    'tr': 'turkish',
+    'de': 'german',
+    'fr': 'french',
+    'es': 'spanish',
+    'it': 'italian',
+}
+
+PG_VECTOR_COLUMN = 'search_vector'
+PG_VECTOR_FUNCTION = 'dictionary_word_search_vector'
+PG_VECTOR_TRIGGER = 'dictionary_word_search_vector_tg'
+
+_TS_CONFIG_CASE = ' '.join(f"WHEN '{code}' THEN '{config}'" for code, config in TS_CONFIGS.items())
+
+PG_INSTALL_SQL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    f'ALTER TABLE {WORD_TABLE} ADD COLUMN IF NOT EXISTS {PG_VECTOR_COLUMN} tsvector',
+    f"""CREATE OR REPLACE FUNCTION {PG_VECTOR_FUNCTION}() RETURNS trigger AS $$
+    DECLARE
+        config regconfig;
+    BEGIN
+        SELECT (CASE code {_TS_CONFIG_CASE} ELSE 'simple' END)::regconfig INTO config
+        FROM dictionary_language WHERE id = NEW.language_id;
+        config := COALESCE(config, 'simple'::regconfig);
+        NEW.{PG_VECTOR_COLUMN} :=
+            setweight(to_tsvector(config, COALESCE(NEW.word, '')), 'A')
+            || setweight(to_tsvector('simple', COALESCE(NEW.word, '')), 'A')
+            || setweight(to_tsvector(config, COALESCE(NEW.meaning, '')), 'B')
+            || setweight(to_tsvector('simple', COALESCE(NEW.meaning, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql""",
+    f'DROP TRIGGER IF EXISTS {PG_VECTOR_TRIGGER} ON {WORD_TABLE}',
+    f"""CREATE TRIGGER {PG_VECTOR_TRIGGER} BEFORE INSERT OR UPDATE OF word, meaning, language_id
+        ON {WORD_TABLE} FOR EACH ROW EXECUTE FUNCTION {PG_VECTOR_FUNCTION}()""",
+    f'UPDATE {WORD_TABLE} SET word = word',
+    f'CREATE INDEX IF NOT EXISTS dictionary_word_search_vector_gin ON {WORD_TABLE} USING gin ({PG_VECTOR_COLUMN})',
+    f'CREATE INDEX IF NOT EXISTS dictionary_word_word_trgm ON {WORD_TABLE} USING gin (word gin_trgm_ops)',
+    f'CREATE INDEX IF NOT EXISTS dictionary_word_meaning_trgm ON {WORD_TABLE} USING gin (meaning gin_trgm_ops)',
+]
+
+PG_UNINSTALL_SQL = [
+    'DROP INDEX IF EXISTS dictionary_word_meaning_trgm',
+    'DROP INDEX IF EXISTS dictionary_word_word_trgm',
+    'DROP INDEX IF EXISTS dictionary_word_search_vector_gin',
+    f'DROP TRIGGER IF EXISTS {PG_VECTOR_TRIGGER} ON {WORD_TABLE}',
+    f'DROP FUNCTION IF EXISTS {PG_VECTOR_FUNCTION}()',
+    f'ALTER TABLE {WORD_TABLE} DROP COLUMN IF EXISTS {PG_VECTOR_COLUMN}',
+]
+
+# Выбранный бэкенд поиска по псевдониму соединения
+_backends = {}
+
+
+def install_fts(schema_editor):
+    """Создать (или пересоздать) FTS-таблицу и триггеры (у миграций своя копия SQL)."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in FTS_INSTALL_SQL:
+        schema_editor.execute(sql)
+    _backends.clear()
+
+
+def uninstall_fts(schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in FTS_UNINSTALL_SQL:
+        schema_editor.execute(sql)
+    _backends.clear()
+
+
+def install_postgres_search(schema_editor):
+    """Создать столбец tsvector, триггер и GIN-индексы на PostgreSQL (у миграций своя копия SQL)."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in PG_INSTALL_SQL:
+        schema_editor.execute(sql)
+    _backends.clear()
+
+
+def uninstall_postgres_search(schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in PG_UNINSTALL_SQL:
+        schema_editor.execute(sql)
+    _backends.clear()
+
+
+def build_match_query(query):
+    """Преобразовать пользовательский запрос в выражение FTS5 MATCH.
+
+    Каждое слово запроса ищется как префикс, все слова обязательны:
+    ``договор аренды`` -> ``"договор"* "аренды"*``.
+    """
+    tokens = _TOKEN_RE.findall(query)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def build_tsquery(query):
+    """То же для ``to_tsquery('simple', ...)``: ``договор аренды`` -> ``'договор':* & 'аренды':*``."""
+    tokens = _TOKEN_RE.findall(query)
+    return ' & '.join(f"'{token}':*" for token in tokens)
+
+
+class SearchBackend:
+    """Поиск без полнотекстового индекса: значение не участвует в поиске."""
+
+    vendor = None
+
+    def available(self, connection):
+        return self.vendor is None or connection.vendor == self.vendor
+
+    def filter(self, query):
+        return Q(pk__in=[])
+
+    def rank(self, query):
+        """Выражение релевантности для annotate(): чем меньше, тем релевантнее."""
+        return Value(0.0, output_field=FloatField())
+
+    def rebuild(self, schema_editor):
+        pass
+
+
+class SQLiteSearchBackend(SearchBackend):
+    vendor = 'sqlite'
+
+    def available(self, connection):
+        return super().available(connection) and FTS_TABLE in connection.introspection.table_names()
+
+    def filter(self, query):
+        return Q(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', (build_match_query(query),)
+        ))
+
+    def rank(self, query):
+        # Слова, найденные только по search_key, идут после совпадений FTS
+        return Coalesce(
+            RawSQL(
+                f'SELECT rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'AND rowid = "{WORD_TABLE}"."id"',
+                (build_match_query(query),),
+                output_field=FloatField(),
+            ),
+            Value(0.0),
+            output_field=FloatField(),
+        )
+
+    def rebuild(self, schema_editor):
+        install_fts(schema_editor)
+
+
+class PostgresSearchBackend(SearchBackend):
+    vendor = 'postgresql'
+
+    def available(self, connection):
+        if not super().available(connection):
+            return False
+        with connection.cursor() as cursor:
+            columns = connection.introspection.get_table_description(cursor, WORD_TABLE)
+        return any(column.name == PG_VECTOR_COLUMN for column in columns)
+
+    def _tsquery(self, query):
+        """Префиксный запрос по словам как есть или по основам слов в конфигурации любого языка."""
+        sql = ' || '.join(
+            ["to_tsquery('simple', %s)"]
+            + [f"plainto_tsquery('{config}', %s)" for config in sorted(set(TS_CONFIGS.values()))]
+        )
+        params = [build_tsquery(query)] + [query] * len(set(TS_CONFIGS.values()))
+        return f'({sql})', params
+
+    def filter(self, query):
+        # ILIKE использует GIN-индексы pg_trgm и находит совпадения внутри слова;
+        # «%», «_» и «\» в запросе экранируются, как в icontains
+        tsquery, params = self._tsquery(query)
+        pattern = f'%{connection.ops.prep_for_like_query(query)}%'
+        return Q(pk__in=RawSQL(
+            f'SELECT id FROM {WORD_TABLE} WHERE {PG_VECTOR_COLUMN} @@ {tsquery} '
+            f'OR word ILIKE %s OR meaning ILIKE %s',
+            (*params, pattern, pattern),
+        ))
+
+    def rank(self, query):
+        tsquery, params = self._tsquery(query)
+        return RawSQL(
+            f'-(ts_rank("{WORD_TABLE}"."{PG_VECTOR_COLUMN}", {tsquery}) + similarity("{WORD_TABLE}"."word", %s))',
+            (*params, query),
+            output_field=FloatField(),
+        )
+
+    def rebuild(self, schema_editor):
+        install_postgres_search(schema_editor)
+
+
+# Первый доступный бэкенд используется для поиска
+BACKENDS = [PostgresSearchBackend(), SQLiteSearchBackend(), SearchBackend()]
+
+
+def reset_backends(**kwargs):
+    """Выбрать бэкенды заново: после миграций индексы могли появиться или пропасть."""
+    _backends.clear()
+
+
+def get_backend():
+    """Бэкенд поиска для текущей БД (выбирается один раз на соединение)."""
+    alias = connection.alias
+    if alias not in _backends:
+        _backends[alias] = next(backend for backend in BACKENDS if backend.available(connection))
+    return _backends[alias]
+
+
+def fts_enabled():
+    """Есть ли в текущей БД полнотекстовый индекс слов."""
+    return type(get_backend()) is not SearchBackend
+
+
+def rebuild_index():
+    """Полностью перестроить индекс по текущему содержимому таблицы слов."""
+    with connection.schema_editor() as schema_editor:
+        for backend in BACKENDS:
+            if backend.vendor == connection.vendor:
+                backend.rebuild(schema_editor)
+
+
+@caching.cached('search_languages', ttl=3600, tags=[caching.TAXONOMY_TAG])
+def languages():
+    """Пары ``(id, code)`` всех языков.
+
+    Кэшируются: один поиск строит условия несколько раз (страница, счётчики
+    фасетов, нечёткий поиск).
+    """
+    from .models import Language
+    return list(Language.objects.values_list('id', 'code'))
+
+
+def search_filter(query):
+    """Q-условие «слово или значение совпадает с запросом».
+
+    Удобно для комбинирования с другими условиями (категория, теги).
+    """
+    if not build_match_query(query):
+        return Q(pk__in=[])
+    return search_key_filter(query, languages()) | get_backend().filter(query)
+
+
+def taxonomy_filter(query):
+    """Q-условие «код категории или тега равен запросу».
+
+    Категория сравнивается по ``Word.category_code``, тег — подзапросом к
+    связующей таблице: оба условия идут по индексам и не размножают строки
+    слов, поэтому ``distinct()`` не нужен.
+    """
+    from .models import Word
+    codes = {query.strip(), query.strip().lower()} - {''}
+    if not codes:
+        return Q(pk__in=[])
+    tagged = Word.tags.through.objects.filter(tag__code__in=codes).values('word_id')
+    return Q(category_code__in=codes) | Q(pk__in=tagged)
+
+
+def search_rank(query):
+    """Выражение релевантности для annotate(): чем меньше, тем релевантнее."""
+    if not build_match_query(query):
+        return Value(0.0, output_field=FloatField())
+    return get_backend().rank(query)
+
+
+def search_words(queryset, query):
+    """Отфильтровать queryset слов по запросу и упорядочить по релевантности."""
+    return (
+        queryset.filter(search_filter(query))
+        .annotate(search_rank=search_rank(query))
+        .order_by('search_rank', 'word')
+    )
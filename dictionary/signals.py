@@ -0,0 +1,182 @@
+"""Обработчики сигналов моделей словаря.
+
+Подключаются в ``DictionaryConfig.ready()``.
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import caching, fuzzy, static_pages, sync
+from .autocomplete import prefix_index
+from .bulk import translations_created, words_created, words_updated
+from .graph import translation_graph
+from .models import (
+    Category, CategoryTranslation, Example, InterfaceTranslation, Language, Tag, TagTranslation, Translation, Word,
+)
+from .translation_names import translation_names
+
+
+@receiver(post_save, sender=Word)
+def word_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    prefix_index.refresh_word(instance)
+    update_fields = kwargs.get('update_fields')
+    if update_fields is None or update_fields & Word.INDEXED_TEXT_FIELDS:
+        fuzzy.index_word(instance)
+    sync.record_words([instance.id])
+    caching.invalidate_words([instance.id])
+    static_pages.refresh_on_commit([instance.id], dependents=True)
+
+
+@receiver(post_delete, sender=Word)
+def word_deleted(sender, instance, **kwargs):
+    prefix_index.remove_word(instance.id)
+    sync.record(sync.WORD, [instance.id])
+    caching.invalidate_words([instance.id])
+    static_pages.invalidate([instance.id])
+
+
+@receiver(post_save, sender=Example)
+@receiver(post_delete, sender=Example)
+def example_changed(sender, instance, raw=False, **kwargs):
+    # Примеры входят в страницу слова: новая строка журнала меняет её ETag
+    if not raw:
+        sync.record(sync.WORD, [instance.word_id])
+        caching.invalidate_words([instance.word_id], listings=False)
+        static_pages.refresh_on_commit([instance.word_id])
+
+
+@receiver(m2m_changed, sender=Word.tags.through)
+def word_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        # При изменении со стороны тега pk_set — id слов
+        word_ids = (pk_set or ()) if reverse else [instance.id]
+        if not word_ids:
+            # tag.words.clear(): id слов неизвестны, сбрасываем хотя бы списки и счётчики
+            caching.invalidate_tags(caching.WORDS_TAG)
+        sync.record(sync.WORD, word_ids)
+        caching.invalidate_words(word_ids)
+        static_pages.refresh_on_commit(word_ids)
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, raw=False, **kwargs):
+    prefix_index.rename_category(instance.id, instance.code)
+    caching.invalidate_tags(caching.TAXONOMY_TAG)
+    if not kwargs.get('created'):
+        instance.words.exclude(category_code=instance.code).update(category_code=instance.code)
+        word_ids = list(instance.words.values_list('id', flat=True))
+        sync.record(sync.WORD, word_ids)
+        static_pages.invalidate(word_ids)
+
+
+@receiver(pre_delete, sender=Category)
+def category_deleting(sender, instance, **kwargs):
+    # После удаления у слов category=NULL и найти их будет нельзя
+    instance.words.update(category_code='')
+    prefix_index.rename_category(instance.id, '')
+    word_ids = list(instance.words.values_list('id', flat=True))
+    sync.record(sync.WORD, word_ids)
+    caching.invalidate_tags(caching.TAXONOMY_TAG)
+    static_pages.invalidate(word_ids)
+
+
+@receiver(post_save, sender=Tag)
+def tag_saved(sender, instance, created=False, raw=False, **kwargs):
+    caching.invalidate_tags(caching.TAXONOMY_TAG)
+    if not created:
+        word_ids = list(instance.words.values_list('id', flat=True))
+        sync.record(sync.WORD, word_ids)
+        static_pages.invalidate(word_ids)
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleting(sender, instance, **kwargs):
+    word_ids = list(instance.words.values_list('id', flat=True))
+    sync.record(sync.WORD, word_ids)
+    caching.invalidate_tags(caching.TAXONOMY_TAG)
+    static_pages.invalidate(word_ids)
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Tag)
+def taxonomy_deleted(sender, **kwargs):
+    # Сброс в pre_delete мог опередить загрузку справочников другим процессом
+    caching.invalidate_tags(caching.TAXONOMY_TAG)
+
+
+@receiver(post_save, sender=InterfaceTranslation)
+@receiver(post_delete, sender=InterfaceTranslation)
+def interface_translation_changed(sender, instance, **kwargs):
+    caching.invalidate_tags(caching.NAMES_TAG)
+    sync.record(sync.INTERFACE_TRANSLATION, [instance.id])
+
+
+@receiver(post_save, sender=Language)
+@receiver(post_delete, sender=Language)
+def language_changed(sender, **kwargs):
+    prefix_index.invalidate()
+    translation_names.invalidate()
+    caching.invalidate_tags(caching.TAXONOMY_TAG)
+
+
+@receiver(post_save, sender=CategoryTranslation)
+@receiver(post_delete, sender=CategoryTranslation)
+@receiver(post_save, sender=TagTranslation)
+@receiver(post_delete, sender=TagTranslation)
+def name_translation_changed(sender, instance, **kwargs):
+    translation_names.invalidate()
+    sync.record(
+        sync.CATEGORY_TRANSLATION if sender is CategoryTranslation else sync.TAG_TRANSLATION, [instance.id],
+    )
+    if sender is TagTranslation:
+        # Названий тегов на страницах может быть много — перерисует render_static_pages
+        static_pages.invalidate(Word.tags.through.objects.filter(tag_id=instance.tag_id).values_list('word_id', flat=True))
+
+
+@receiver(post_save, sender=Translation)
+def translation_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    translation_graph.refresh_translation(instance)
+    sync.record(sync.TRANSLATION, [instance.id])
+    caching.invalidate_words([instance.from_word_id, instance.to_word_id], listings=False)
+    static_pages.refresh_on_commit([instance.from_word_id])
+
+
+@receiver(post_delete, sender=Translation)
+def translation_deleted(sender, instance, **kwargs):
+    translation_graph.remove_edge(instance.from_word_id, instance.to_word_id)
+    sync.record(sync.TRANSLATION, [instance.id])
+    # Удалённый перевод не найти по id: отмечаем исходное слово, чтобы сменились его ETag и страница
+    sync.record(sync.WORD, [instance.from_word_id])
+    caching.invalidate_words([instance.from_word_id, instance.to_word_id], listings=False)
+    static_pages.refresh_on_commit([instance.from_word_id])
+
+
+@receiver(words_created)
+def words_bulk_created(sender, words, **kwargs):
+    prefix_index.refresh_words(word for word in words if word.status == 'approved')
+    fuzzy.index_words(words)
+    sync.record_words(word.id for word in words)
+    caching.invalidate_words(word.id for word in words)
+    # Страниц у новых слов ещё нет, а страницы с их переводами сбросит translations_created
+
+
+@receiver(words_updated)
+def words_bulk_updated(sender, words, **kwargs):
+    # Текст слова не меняется, поэтому триграммы пересобирать не нужно
+    prefix_index.refresh_words(words)
+    sync.record_words(word.id for word in words)
+    caching.invalidate_words(word.id for word in words)
+    static_pages.invalidate([word.id for word in words], dependents=True)
+
+
+@receiver(translations_created)
+def translations_bulk_created(sender, translations, **kwargs):
+    translation_graph.refresh_translations(t for t in translations if t.status == 'approved')
+    # id переводам проставляет bulk_translate, перечитав вставленные пары
+    pairs = {(translation.from_word_id, translation.to_word_id) for translation in translations}
+    sync.record(sync.TRANSLATION, [translation.id for translation in translations])
+    caching.invalidate_words({word_id for pair in pairs for word_id in pair}, listings=False)
+    static_pages.invalidate({from_id for from_id, _ in pairs})
@@ -0,0 +1,523 @@
+"""Двоичный снимок словаря для чтения через ``mmap``.
+
+Команда ``build_snapshot`` собирает одобренные слова, их переводы, теги,
+примеры и названия категорий и тегов в один файл. Читатель (``Snapshot``)
+отображает файл в память и ничего не загружает при открытии: таблицы — это
+``memoryview`` поверх ``mmap``, строки декодируются только при обращении.
+Поэтому открытие занимает микросекунды, а память процесса не растёт с
+размером словаря — страницы файла делят все процессы через кэш ОС.
+
+Формат (little-endian, секции выровнены по 8 байт)::
+
+    заголовок   MAGIC, VERSION, число секций, [(смещение, длина), ...]
+    строки      u32-смещения (n + 1) и общий UTF-8 блоб; все строки уникальны
+    языки       (код, название, первая строка слов, число слов)
+    категории   код; теги — код
+    слова       записи WORD_RECORD, отсортированы по (язык, ключ, id):
+                у каждого языка своя непрерывная секция, внутри — по ключу
+    индекс id   отсортированные id (i64) и номера строк слов (u32)
+    переводы    (строка целевого слова, примечание, порядок) — подряд для
+                каждого исходного слова
+    теги слов, примеры слов — массивы u32
+    названия    (категория или тег, язык, строка), отсортированы
+
+Ключ слова — ``Word.search_key``; порядок байт UTF-8 совпадает с порядком
+строк Python, поэтому двоичный поиск сравнивает байты без декодирования.
+
+Снимок только для чтения и отражает состояние БД на момент сборки. Если
+задан ``DICTIONARY_SNAPSHOT_PATH``, ``word_detail`` и автодополнение в
+``translation_search`` читают из него (см. ``open_snapshot``); файл
+заменяется атомарно, и процессы переоткрывают его при смене. Старый снимок
+закрывается, когда его отпустит последний читатель.
+"""
+import heapq
+import mmap
+import os
+import struct
+import sys
+import threading
+from bisect import bisect_left
+from collections import namedtuple
+from contextlib import contextmanager
+from itertools import islice
+
+from django.conf import settings
+
+from .normalization import normalize_word
+
+MAGIC = b'DICTSNP\x00'
+VERSION = 1
+
+HEADER = struct.Struct('<8sII')
+SECTION = struct.Struct('<QQ')
+
+# id, ключ, слово, значение, произношение, сложность, категория (-1 — нет),
+# первый перевод, число переводов, первый тег, число тегов,
+# первый пример, число примеров, язык
+WORD_RECORD = struct.Struct('<qIIIIIiIIIIIIH')
+LANGUAGE_RECORD = struct.Struct('<IIII')
+TRANSLATION_RECORD = struct.Struct('<III')
+NAME_RECORD = struct.Struct('<III')
+
+(
+    STRING_OFFSETS, STRING_BLOB, LANGUAGES, CATEGORIES, TAGS, WORDS, ID_KEYS, ID_ROWS,
+    TRANSLATIONS, WORD_TAGS, WORD_EXAMPLES, CATEGORY_NAMES, TAG_NAMES,
+) = range(13)
+SECTION_COUNT = 13
+
+WordEntry = namedtuple(
+    'WordEntry', 'id word language meaning pronunciation category difficulty tags examples',
+)
+TranslationEntry = namedtuple('TranslationEntry', 'word note order')
+
+
+class SnapshotError(Exception):
+    pass
+
+
+# Сборка
+
+class _Strings:
+    """Пул уникальных строк: индекс по тексту, UTF-8 блоб и смещения."""
+
+    def __init__(self):
+        self._index = {}
+        self._parts = []
+        self._offsets = [0]
+
+    def add(self, value):
+        value = value or ''
+        index = self._index.get(value)
+        if index is None:
+            data = value.encode('utf-8')
+            index = self._index[value] = len(self._parts)
+            self._parts.append(data)
+            self._offsets.append(self._offsets[-1] + len(data))
+        return index
+
+    def sections(self):
+        return struct.pack(f'<{len(self._offsets)}I', *self._offsets), b''.join(self._parts)
+
+
+def _pack_array(code, values):
+    return struct.pack(f'<{len(values)}{code}', *values)
+
+
+def _pack_records(record, rows):
+    return b''.join(record.pack(*row) for row in rows)
+
+
+def build(path):
+    """Собрать снимок из БД в ``path`` (через временный файл и ``os.replace``).
+
+    Возвращает число слов в снимке.
+    """
+    from .models import Category, CategoryTranslation, Example, Language, Tag, TagTranslation, Translation, Word
+
+    strings = _Strings()
+    languages = list(Language.objects.order_by('code').values_list('id', 'code', 'name'))
+    language_index = {language_id: index for index, (language_id, _, _) in enumerate(languages)}
+    categories = list(Category.objects.order_by('id').values_list('id', 'code'))
+    category_index = {category_id: index for index, (category_id, _) in enumerate(categories)}
+    tags = list(Tag.objects.order_by('id').values_list('id', 'code'))
+    tag_index = {tag_id: index for index, (tag_id, _) in enumerate(tags)}
+
+    visible = Word.objects.filter(status='approved', is_deleted=False)
+    words = []
+    for word_id, language_id, word, search_key, meaning, pronunciation, category_id, difficulty in (
+        visible.values_list(
+            'id', 'language_id', 'word', 'search_key', 'meaning', 'pronunciation', 'category_id', 'difficulty',
+        ).iterator()
+    ):
+        language = language_index[language_id]
+        key = search_key or normalize_word(word, languages[language][1])
+        words.append((language, key, word_id, word, meaning, pronunciation, category_id, difficulty))
+    words.sort(key=lambda row: (row[0], row[1], row[2]))
+    row_of = {row[2]: number for number, row in enumerate(words)}
+
+    # Видимость слов проверяется по row_of, а не подзапросом: так каждая таблица читается одним проходом
+    translations = {}
+    for from_id, to_id, note, order in (
+        Translation.objects.filter(status='approved')
+        .order_by('order', 'id').values_list('from_word_id', 'to_word_id', 'note', 'order').iterator()
+    ):
+        if from_id in row_of and to_id in row_of:
+            translations.setdefault(from_id, []).append((row_of[to_id], strings.add(note), order))
+    word_tags = {}
+    for word_id, tag_id in Word.tags.through.objects.values_list('word_id', 'tag_id').iterator():
+        if word_id in row_of:
+            word_tags.setdefault(word_id, []).append(tag_index[tag_id])
+    word_examples = {}
+    for word_id, text in Example.objects.order_by('id').values_list('word_id', 'text').iterator():
+        if word_id in row_of:
+            word_examples.setdefault(word_id, []).append(strings.add(text))
+
+    word_rows, translation_rows, tag_refs, example_refs = [], [], [], []
+    language_ranges = {}
+    for number, (language, key, word_id, word, meaning, pronunciation, category_id, difficulty) in enumerate(words):
+        first, count = language_ranges.get(language, (number, 0))
+        language_ranges[language] = (first, count + 1)
+        word_translations = translations.get(word_id, [])
+        word_tag_refs = sorted(word_tags.get(word_id, []))
+        word_example_refs = word_examples.get(word_id, [])
+        word_rows.append((
+            word_id, strings.add(key), strings.add(word), strings.add(meaning), strings.add(pronunciation),
+            strings.add(difficulty), category_index.get(category_id, -1),
+            len(translation_rows), len(word_translations),
+            len(tag_refs), len(word_tag_refs),
+            len(example_refs), len(word_example_refs),
+            language,
+        ))
+        translation_rows.extend(word_translations)
+        tag_refs.extend(word_tag_refs)
+        example_refs.extend(word_example_refs)
+
+    language_rows = [
+        (strings.add(code), strings.add(name)) + language_ranges.get(index, (0, 0))
+        for index, (_, code, name) in enumerate(languages)
+    ]
+    category_rows = [strings.add(code) for _, code in categories]
+    tag_rows = [strings.add(code) for _, code in tags]
+    category_names = sorted(
+        (category_index[category_id], language_index[language_id], strings.add(name))
+        for category_id, language_id, name in CategoryTranslation.objects.values_list('category_id', 'language_id', 'name')
+    )
+    tag_names = sorted(
+        (tag_index[tag_id], language_index[language_id], strings.add(name))
+        for tag_id, language_id, name in TagTranslation.objects.values_list('tag_id', 'language_id', 'name')
+    )
+    by_id = sorted((row[0], number) for number, row in enumerate(word_rows))
+
+    string_offsets, string_blob = strings.sections()
+    sections = [None] * SECTION_COUNT
+    sections[STRING_OFFSETS] = string_offsets
+    sections[STRING_BLOB] = string_blob
+    sections[LANGUAGES] = _pack_records(LANGUAGE_RECORD, language_rows)
+    sections[CATEGORIES] = _pack_array('I', category_rows)
+    sections[TAGS] = _pack_array('I', tag_rows)
+    sections[WORDS] = _pack_records(WORD_RECORD, word_rows)
+    sections[ID_KEYS] = _pack_array('q', [word_id for word_id, _ in by_id])
+    sections[ID_ROWS] = _pack_array('I', [number for _, number in by_id])
+    sections[TRANSLATIONS] = _pack_records(TRANSLATION_RECORD, translation_rows)
+    sections[WORD_TAGS] = _pack_array('I', tag_refs)
+    sections[WORD_EXAMPLES] = _pack_array('I', example_refs)
+    sections[CATEGORY_NAMES] = _pack_records(NAME_RECORD, category_names)
+    sections[TAG_NAMES] = _pack_records(NAME_RECORD, tag_names)
+
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as output:
+        position = HEADER.size + SECTION.size * SECTION_COUNT
+        directory = []
+        for data in sections:
+            position += -position % 8
+            directory.append((position, len(data)))
+            position += len(data)
+        output.write(HEADER.pack(MAGIC, VERSION, SECTION_COUNT))
+        for entry in directory:
+            output.write(SECTION.pack(*entry))
+        for (offset, _), data in zip(directory, sections):
+            output.write(b'\0' * (offset - output.tell()))
+            output.write(data)
+    os.replace(temporary, path)
+    return len(word_rows)
+
+
+# Чтение
+
+class _Keys:
+    """Последовательность ключей слов (байты) для ``bisect`` по номерам строк."""
+
+    def __init__(self, snapshot):
+        self._snapshot = snapshot
+
+    def __len__(self):
+        return self._snapshot.word_count
+
+    def __getitem__(self, row):
+        return self._snapshot._key_bytes(row)
+
+
+class Snapshot:
+    """Снимок словаря, отображённый в память."""
+
+    def __init__(self, path):
+        if sys.byteorder != 'little':
+            raise SnapshotError('Снимок поддерживается только на little-endian платформах')
+        self.path = path
+        # Читатели, взявшие снимок через open_snapshot(); заменённый снимок
+        # закрывается, когда их не останется
+        self._readers = 0
+        self._retired = False
+        self._closed = False
+        self._state_lock = threading.Lock()
+        with open(path, 'rb') as source:
+            stat = os.fstat(source.fileno())
+            self._mmap = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        self.signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        self._buffer = buffer = memoryview(self._mmap)
+        magic, version, count = HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION or count != SECTION_COUNT:
+            raise SnapshotError(f'{path}: неизвестный формат снимка')
+        self._sections = []
+        for number in range(count):
+            offset, length = SECTION.unpack_from(buffer, HEADER.size + SECTION.size * number)
+            self._sections.append(buffer[offset:offset + length])
+
+        self._string_offsets = self._sections[STRING_OFFSETS].cast('I')
+        self._blob = self._sections[STRING_BLOB]
+        self._words = self._sections[WORDS]
+        self._id_keys = self._sections[ID_KEYS].cast('q')
+        self._id_rows = self._sections[ID_ROWS].cast('I')
+        self._word_tags = self._sections[WORD_TAGS].cast('I')
+        self._word_examples = self._sections[WORD_EXAMPLES].cast('I')
+        self.word_count = len(self._words) // WORD_RECORD.size
+        self._keys = _Keys(self)
+
+        # Языков, категорий и тегов единицы и десятки — их таблицы читаются сразу
+        self._languages = {}
+        self._language_codes = []
+        for offset in range(0, len(self._sections[LANGUAGES]), LANGUAGE_RECORD.size):
+            code, name, first, count = LANGUAGE_RECORD.unpack_from(self._sections[LANGUAGES], offset)
+            code = self._string(code)
+            self._language_codes.append(code)
+            self._languages[code] = (self._string(name), first, count)
+        self._categories = [self._string(index) for index in self._sections[CATEGORIES].cast('I')]
+        self._tags = [self._string(index) for index in self._sections[TAGS].cast('I')]
+        self._category_index = {code: index for index, code in enumerate(self._categories)}
+        self._tag_index = {code: index for index, code in enumerate(self._tags)}
+        self._language_index = {code: index for index, code in enumerate(self._language_codes)}
+
+    def acquire(self):
+        """Отметить читателя; ``False``, если снимок уже закрыт."""
+        with self._state_lock:
+            if self._closed:
+                return False
+            self._readers += 1
+            return True
+
+    def release(self):
+        with self._state_lock:
+            self._readers -= 1
+            if self._retired and not self._readers:
+                self._close()
+
+    def retire(self):
+        """Снимок заменён новым: закрыть сейчас или после последнего читателя."""
+        with self._state_lock:
+            self._retired = True
+            if not self._readers:
+                self._close()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def close(self):
+        with self._state_lock:
+            self._close()
+
+    def _close(self):
+        if self._closed:
+            return
+        self._closed = True
+        for view in (self._string_offsets, self._id_keys, self._id_rows, self._word_tags, self._word_examples):
+            view.release()
+        for section in self._sections:
+            section.release()
+        self._sections = []
+        self._buffer.release()
+        self._mmap.close()
+
+    def __len__(self):
+        return self.word_count
+
+    # Строки и записи
+
+    def _string_bytes(self, index):
+        return self._blob[self._string_offsets[index]:self._string_offsets[index + 1]]
+
+    def _string(self, index):
+        return str(self._string_bytes(index), 'utf-8')
+
+    def _record(self, row):
+        return WORD_RECORD.unpack_from(self._words, row * WORD_RECORD.size)
+
+    def _key_bytes(self, row):
+        offset = row * WORD_RECORD.size + 8
+        index = struct.unpack_from('<I', self._words, offset)[0]
+        return bytes(self._string_bytes(index))
+
+    def _entry(self, row):
+        (word_id, _, word, meaning, pronunciation, difficulty, category,
+         _, _, tags_start, tags_count, examples_start, examples_count, language) = self._record(row)
+        return WordEntry(
+            id=word_id,
+            word=self._string(word),
+            language=self._language_codes[language],
+            meaning=self._string(meaning),
+            pronunciation=self._string(pronunciation),
+            category=self._categories[category] if category >= 0 else '',
+            difficulty=self._string(difficulty),
+            tags=[self._tags[index] for index in self._word_tags[tags_start:tags_start + tags_count]],
+            examples=[self._string(index) for index in self._word_examples[examples_start:examples_start + examples_count]],
+        )
+
+    def _row_of(self, word_id):
+        position = bisect_left(self._id_keys, word_id)
+        if position < len(self._id_keys) and self._id_keys[position] == word_id:
+            return self._id_rows[position]
+        return None
+
+    # Поиск
+
+    @property
+    def languages(self):
+        return list(self._language_codes)
+
+    def language_name(self, code):
+        language = self._languages.get(code)
+        return language[0] if language else ''
+
+    def get(self, word_id):
+        """Слово по id или ``None``."""
+        row = self._row_of(word_id)
+        return None if row is None else self._entry(row)
+
+    def _range(self, code):
+        language = self._languages.get(code)
+        if language is None:
+            return 0, 0
+        return language[1], language[1] + language[2]
+
+    def _iter_prefix(self, code, prefix, exact=False):
+        """``(ключ, id, строка)`` слов языка ``code``, ключ которых начинается с ``prefix`` (или равен ему)."""
+        start, end = self._range(code)
+        key = normalize_word(prefix, code).encode('utf-8')
+        if not key:
+            return
+        row = bisect_left(self._keys, key, start, end)
+        while row < end:
+            current = self._key_bytes(row)
+            if (current != key) if exact else not current.startswith(key):
+                return
+            yield current, struct.unpack_from('<q', self._words, row * WORD_RECORD.size)[0], row
+            row += 1
+
+    def _codes(self, language):
+        return [language] if language else self._language_codes
+
+    def exact(self, word, language=None):
+        """Слова, совпадающие с ``word`` после нормализации."""
+        return [
+            self._entry(row) for code in self._codes(language) for _, _, row in self._iter_prefix(code, word, exact=True)
+        ]
+
+    def prefix(self, prefix, language=None, limit=10):
+        """До ``limit`` слов, начинающихся с ``prefix``, в порядке ключей."""
+        streams = [self._iter_prefix(code, prefix) for code in self._codes(language)]
+        return [self._entry(row) for _, _, row in islice(heapq.merge(*streams), limit)]
+
+    def complete(self, prefix, language=None, limit=10):
+        """То же, что ``PrefixIndex.complete``, но вместе со значением слова."""
+        return [
+            {
+                'id': entry.id,
+                'word': entry.word,
+                'meaning': entry.meaning,
+                'language': entry.language,
+                'category': entry.category,
+            }
+            for entry in self.prefix(prefix, language=language, limit=limit)
+        ]
+
+    def translations(self, word_id, language=None):
+        """Одобренные переводы слова: список ``TranslationEntry`` в порядке ``order``."""
+        row = self._row_of(word_id)
+        if row is None:
+            return []
+        record = self._record(row)
+        start, count = record[7], record[8]
+        result = []
+        translations = self._sections[TRANSLATIONS]
+        for offset in range(start * TRANSLATION_RECORD.size, (start + count) * TRANSLATION_RECORD.size, TRANSLATION_RECORD.size):
+            target, note, order = TRANSLATION_RECORD.unpack_from(translations, offset)
+            entry = self._entry(target)
+            if language is None or entry.language == language:
+                result.append(TranslationEntry(entry, self._string(note), order))
+        return result
+
+    def _name(self, section, index, code):
+        language = self._language_index.get(code)
+        if index is None or language is None:
+            return None
+        names = self._sections[section]
+        low, high = 0, len(names) // NAME_RECORD.size
+        while low < high:
+            middle = (low + high) // 2
+            if NAME_RECORD.unpack_from(names, middle * NAME_RECORD.size)[:2] < (index, language):
+                low = middle + 1
+            else:
+                high = middle
+        if low * NAME_RECORD.size < len(names):
+            owner, owner_language, name = NAME_RECORD.unpack_from(names, low * NAME_RECORD.size)
+            if (owner, owner_language) == (index, language):
+                return self._string(name)
+        return None
+
+    def category_name(self, code, language):
+        """Название категории на языке ``language`` (код, если перевода нет)."""
+        return self._name(CATEGORY_NAMES, self._category_index.get(code), language) or code
+
+    def tag_name(self, code, language):
+        """Название тега на языке ``language`` (код, если перевода нет)."""
+        return self._name(TAG_NAMES, self._tag_index.get(code), language) or code
+
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+def get_snapshot():
+    """Снимок из ``DICTIONARY_SNAPSHOT_PATH`` или ``None``, если он не настроен или не собран.
+
+    Файл переоткрывается, если его заменили новой сборкой. Без ``open_snapshot``
+    можно использовать только ``path`` и ``signature``: заменённый снимок
+    закрывается, как только его отпустят читатели.
+    """
+    global _snapshot
+
+    path = getattr(settings, 'DICTIONARY_SNAPSHOT_PATH', None)
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    current = _snapshot
+    if current is not None and current.path == str(path) and current.signature == signature:
+        return current
+    with _lock:
+        if _snapshot is None or _snapshot.path != str(path) or _snapshot.signature != signature:
+            previous, _snapshot = _snapshot, Snapshot(str(path))
+            if previous is not None:
+                previous.retire()
+        return _snapshot
+
+
+@contextmanager
+def open_snapshot():
+    """Текущий снимок (или ``None``) на время блока ``with``.
+
+    Пока блок не закончился, снимок не закрывается, даже если его заменили.
+    """
+    while True:
+        snapshot = get_snapshot()
+        # Закрыт — значит, его только что заменили: берём новый
+        if snapshot is None or snapshot.acquire():
+            break
+    try:
+        yield snapshot
+    finally:
+        if snapshot is not None:
+            snapshot.release()
@@ -0,0 +1,99 @@
+"""Настройка SQLite для работы под gunicorn.
+
+При каждом новом соединении (сигнал ``connection_created``) выполняются
+PRAGMA из ``DEFAULT_PRAGMAS``, дополненные настройкой ``SQLITE_PRAGMAS``
+(значение ``None`` у PRAGMA отменяет её):
+
+* ``journal_mode=wal`` — читатели не блокируются пишущей транзакцией;
+* ``synchronous=normal`` — в режиме WAL безопасно и без fsync на каждый commit;
+* ``mmap_size``, ``cache_size`` — страницы БД читаются через mmap и кэшируются;
+* ``busy_timeout`` — занятая БД ждёт, а не сразу даёт «database is locked»;
+* ``temp_store=memory`` — временные таблицы сортировок в памяти.
+
+Соединения живут ``CONN_MAX_AGE`` секунд (см. ``DATABASES``), поэтому PRAGMA
+выполняются не на каждый запрос.
+
+Писать в SQLite одновременно может одно соединение. Массовые операции
+выполняются в ``serialized_writes()``: блокировка файла (``fcntl.flock``)
+выстраивает их в очередь между процессами, а транзакция сразу берёт
+блокировку записи SQLite. Иначе транзакция, которая сначала читает, а потом
+пишет, получает «database is locked» без ожидания, если кто-то успел
+записать между её чтением и записью.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировка только внутри процесса
+    fcntl = None
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 2**20,
+    'cache_size': -64000,   # в КиБ: 64 МБ
+    'busy_timeout': 20000,  # мс
+    'temp_store': 'memory',
+}
+
+_thread_lock = threading.Lock()
+
+
+def pragmas():
+    configured = getattr(settings, 'SQLITE_PRAGMAS', None) or {}
+    merged = dict(DEFAULT_PRAGMAS, **configured)
+    return {name: value for name, value in merged.items() if value is not None}
+
+
+def apply_pragmas(cursor, values):
+    for name, value in values.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Обработчик ``connection_created``: PRAGMA для соединений SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, pragmas())
+
+
+def _is_file_database(connection):
+    return connection.vendor == 'sqlite' and not connection.is_in_memory_db()
+
+
+@contextmanager
+def write_lock(using=DEFAULT_DB_ALIAS):
+    """Очередь массовых записей в файл SQLite; для других БД ничего не делает."""
+    connection = connections[using]
+    if not _is_file_database(connection):
+        yield
+        return
+    if fcntl is None:
+        with _thread_lock:
+            yield
+        return
+    path = getattr(settings, 'SQLITE_WRITE_LOCK_PATH', None) or f'{connection.settings_dict["NAME"]}.write-lock'
+    with open(path, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+@contextmanager
+def serialized_writes(using=DEFAULT_DB_ALIAS):
+    """Транзакция массовой записи: по одной за раз и с блокировкой записи с самого начала."""
+    with write_lock(using), transaction.atomic(using=using):
+        connection = connections[using]
+        if _is_file_database(connection):
+            # Django начинает транзакцию с отложенного BEGIN; запись, не меняющая
+            # ни одной строки, сразу берёт блокировку записи (как BEGIN IMMEDIATE)
+            with connection.cursor() as cursor:
+                cursor.execute('UPDATE django_migrations SET id = id WHERE 0')
+        yield
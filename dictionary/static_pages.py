@@ -0,0 +1,233 @@
+"""Заранее отрисованные страницы слов, которые nginx отдаёт без Django.
+
+Для каждого одобренного слова ``word_detail`` рендерится как для анонимного
+посетителя и сохраняется в ``STATIC_PAGES_ROOT/<язык>/word/<id>/index.html``
+(языки интерфейса — ``STATIC_PAGES_LANGUAGES``, по умолчанию только ``ru``).
+nginx отдаёт файл через ``try_files`` запросам без сессии, без cookie языка и
+без параметров, а если файла нет — передаёт запрос в Django (см. ``nginx.conf``).
+
+Страницы обновляются инкрементально:
+
+* после сохранения слова, перевода, примера или тегов слова обработчики
+  сигналов удаляют затронутые страницы после фиксации транзакции, а
+  перерисовывает их фоновый поток процесса: запрос, изменивший слово, не ждёт
+  рендеринга, а до перерисовки страницы отдаёт Django;
+* массовые операции и изменения названий тегов только удаляют устаревшие
+  файлы — до перерисовки такие страницы отдаёт Django;
+* ``render_static_pages --changed`` перерисовывает всё, что изменилось в
+  журнале синхронизации после прошлого запуска (удобно запускать по cron),
+  а без ``--changed`` — все страницы заново.
+
+Если ``STATIC_PAGES_ROOT`` не задан, модуль ничего не делает.
+"""
+import logging
+import os
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import connections, transaction
+from django.http import HttpRequest
+from django.urls import reverse
+
+from . import sync
+
+logger = logging.getLogger('dictionary.static_pages')
+
+# Номер последнего учтённого изменения журнала синхронизации
+SEQ_FILE = '.last_seq'
+
+# Слова, ждущие перерисовки в фоне, и pid процесса, в котором её поток уже запущен
+_pending = set()
+_pending_lock = threading.Lock()
+_renderer_pid = None
+
+
+def root():
+    path = getattr(settings, 'STATIC_PAGES_ROOT', None)
+    return Path(path) if path else None
+
+
+def languages():
+    return list(getattr(settings, 'STATIC_PAGES_LANGUAGES', ['ru']))
+
+
+def page_path(word_id, language):
+    return root() / language / 'word' / str(word_id) / 'index.html'
+
+
+def _request(word_id, language):
+    """Запрос анонимного посетителя с языком интерфейса ``language``."""
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = request.path_info = reverse('dictionary:word_detail', args=[word_id])
+    request.META['SERVER_NAME'] = 'localhost'
+    request.META['SERVER_PORT'] = '80'
+    request.user = AnonymousUser()
+    request.session = {'language': language}
+    return request
+
+
+def _write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f'{path.name}.tmp')
+    temporary.write_bytes(content)
+    os.replace(temporary, path)
+
+
+def remove(word_ids):
+    """Удалить файлы страниц: до перерисовки их отдаст Django."""
+    if root() is None:
+        return
+    for word_id in word_ids:
+        for language in languages():
+            try:
+                page_path(word_id, language).unlink()
+            except FileNotFoundError:
+                pass
+
+
+def render_words(word_ids):
+    """Перерисовать страницы слов; страницы скрытых и удалённых слов удаляются.
+
+    Возвращает число записанных файлов.
+    """
+    from .models import Word
+    from .views import word_detail
+
+    if root() is None:
+        return 0
+    word_ids = set(word_ids)
+    visible = set(
+        Word.objects.filter(id__in=word_ids, status='approved', is_deleted=False).values_list('id', flat=True)
+    )
+    remove(word_ids - visible)
+    written = 0
+    for word_id in sorted(visible):
+        for language in languages():
+            response = word_detail(_request(word_id, language), word_id)
+            if response.status_code == 200:
+                _write(page_path(word_id, language), response.content)
+                written += 1
+    return written
+
+
+def affected_words(word_ids=(), translation_ids=()):
+    """Слова, чьи страницы показывают данные слов ``word_ids`` и переводов ``translation_ids``.
+
+    Кроме самих слов — слова, переводы которых ведут к ним, и исходные слова переводов.
+    """
+    from .models import Translation
+
+    affected = set(word_ids)
+    if affected:
+        affected.update(Translation.objects.filter(to_word_id__in=affected).values_list('from_word_id', flat=True))
+    if translation_ids:
+        affected.update(Translation.objects.filter(id__in=translation_ids).values_list('from_word_id', flat=True))
+    return affected
+
+
+def invalidate(word_ids, dependents=False):
+    """Удалить страницы слов (и при ``dependents`` — страницы, которые их показывают)."""
+    if root() is None:
+        return
+    word_ids = set(word_ids)
+    remove(affected_words(word_ids) if dependents else word_ids)
+
+
+def refresh_on_commit(word_ids, dependents=False):
+    """После фиксации транзакции удалить страницы слов и поставить их в очередь на перерисовку."""
+    if root() is None:
+        return
+    word_ids = set(word_ids)
+
+    def refresh():
+        affected = affected_words(word_ids) if dependents else word_ids
+        remove(affected)
+        render_in_background(affected)
+
+    transaction.on_commit(refresh)
+
+
+def render_in_background(word_ids):
+    """Перерисовать страницы в фоновом потоке; слова, добавленные во время работы, он тоже заберёт."""
+    global _renderer_pid
+    with _pending_lock:
+        _pending.update(word_ids)
+        # После fork потока родителя в процессе нет
+        if _renderer_pid == os.getpid():
+            return
+        _renderer_pid = os.getpid()
+    threading.Thread(target=_render_pending, name='static-pages', daemon=True).start()
+
+
+def _render_pending():
+    global _renderer_pid
+    try:
+        while True:
+            with _pending_lock:
+                if not _pending:
+                    _renderer_pid = None
+                    return
+                word_ids = set(_pending)
+                _pending.clear()
+            try:
+                render_words(word_ids)
+            except Exception:
+                # Страницы уже удалены, их отдаст Django; перерисует render_static_pages --changed
+                logger.exception('Не удалось перерисовать страницы слов %s', sorted(word_ids))
+    finally:
+        connections.close_all()
+
+
+def _read_seq():
+    try:
+        return int((root() / SEQ_FILE).read_text())
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _write_seq(seq):
+    _write(root() / SEQ_FILE, str(seq).encode('ascii'))
+
+
+def render_changed():
+    """Перерисовать страницы, затронутые изменениями журнала после прошлого запуска."""
+    from .models import SyncChange, Word
+
+    since = _read_seq()
+    rows = list(
+        SyncChange.objects.filter(seq__gt=since, model__in=(sync.WORD, sync.TRANSLATION, sync.TAG_TRANSLATION))
+        .values_list('seq', 'model', 'object_id')
+    )
+    if not rows:
+        return 0
+    word_ids = [object_id for _, model, object_id in rows if model == sync.WORD]
+    translation_ids = [object_id for _, model, object_id in rows if model == sync.TRANSLATION]
+    tag_translation_ids = [object_id for _, model, object_id in rows if model == sync.TAG_TRANSLATION]
+    # Удалённые переводы уже не найти по id, но при удалении в журнал записывается и исходное слово
+    word_ids.extend(
+        Word.tags.through.objects.filter(
+            tag__translations__id__in=tag_translation_ids, tag__translations__language__code__in=languages(),
+        ).values_list('word_id', flat=True)
+    )
+    written = render_words(affected_words(word_ids, translation_ids))
+    _write_seq(max(seq for seq, _, _ in rows))
+    return written
+
+
+def render_all():
+    """Перерисовать все страницы и удалить файлы слов, которых больше нет."""
+    from .models import SyncChange, Word
+
+    seq = SyncChange.objects.order_by('-seq').values_list('seq', flat=True).first() or 0
+    word_ids = set(Word.objects.filter(status='approved', is_deleted=False).values_list('id', flat=True))
+    written = render_words(word_ids)
+    for language in languages():
+        directory = root() / language / 'word'
+        if directory.is_dir():
+            stale = [int(entry.name) for entry in directory.iterdir() if entry.name.isdigit() and int(entry.name) not in word_ids]
+            remove(stale)
+    _write_seq(seq)
+    return written
@@ -0,0 +1,233 @@
+"""Дельта-синхронизация для офлайн- и мобильных клиентов.
+
+Каждое изменение слова, перевода или перевода названий записывается в
+журнал ``SyncChange`` с монотонно растущим номером ``seq``. На объект в
+журнале хранится одна строка: при повторном изменении старая удаляется и
+добавляется новая с большим номером. Поэтому размер журнала не превышает
+числа объектов, а клиент, отставший на день, получает только то, что
+изменилось за день, — каждый объект один раз.
+
+Клиент передаёт номер последнего полученного изменения (``cursor``) и
+получает следующую страницу. Содержимое объектов читается в момент запроса
+(по запросу на модель): видимые объекты приходят целиком, а удалённые,
+скрытые (``is_deleted``) и неодобренные — как номера в списке ``delete``.
+
+Запись в журнал делают обработчики сигналов (``dictionary.signals``),
+в том числе для массовых операций (``words_created``, ``words_updated``,
+``translations_created``). Изменение слова записывает и его переводы:
+их видимость зависит от статуса обоих слов.
+
+Курсор работает, только если строки журнала становятся видимыми в порядке
+``seq``: иначе транзакция, получившая меньший номер, но зафиксированная
+позже, окажется позади курсора клиента, и изменение потеряется. В SQLite
+это так и есть — пишет одна транзакция, и номер выдаётся под её блокировкой
+записи. В PostgreSQL номера последовательности выдаются без ожидания
+фиксации, поэтому запись журнала берёт advisory-блокировку
+(``pg_advisory_xact_lock``), которая держится до конца транзакции: номера
+выдаются по очереди, и каждый следующий — только после фиксации предыдущего.
+
+Чтобы эта блокировка не выстраивала в очередь все пишущие транзакции целиком
+(импорт на минуту задержал бы любое сохранение слова), в PostgreSQL ``record``
+откладывает запись журнала до фиксации (``transaction.on_commit``) и делает её
+отдельной короткой транзакцией: блокировка держится только на время вставки
+строк журнала. Цена — окно между фиксацией изменения и записью журнала: если
+процесс упадёт в нём, клиенты узнают об изменении только при следующем
+изменении того же объекта. В SQLite писатель и так один, и журнал пишется в
+той же транзакции. Режим задаётся настройкой ``SYNC_RECORD_ON_COMMIT``
+(по умолчанию — включён только для PostgreSQL).
+"""
+from functools import partial
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+
+WORD = 'word'
+TRANSLATION = 'translation'
+CATEGORY_TRANSLATION = 'category_translation'
+TAG_TRANSLATION = 'tag_translation'
+INTERFACE_TRANSLATION = 'interface_translation'
+
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 5000
+
+# Сколько объектов записывать в журнал одним запросом
+_BATCH_SIZE = 500
+
+# Ключ advisory-блокировки журнала в PostgreSQL
+_LOCK_KEY = 0x73796e63  # 'sync'
+
+
+def _lock_journal():
+    """Дождаться фиксации транзакций, которые уже пишут в журнал (только PostgreSQL)."""
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_xact_lock(%s)', [_LOCK_KEY])
+
+
+def _record_on_commit():
+    setting = getattr(settings, 'SYNC_RECORD_ON_COMMIT', None)
+    return connection.vendor == 'postgresql' if setting is None else setting
+
+
+def record(model, object_ids):
+    """Отметить объекты изменёнными: перенести их в конец журнала."""
+    object_ids = list(dict.fromkeys(object_ids))
+    if not object_ids:
+        return
+    if _record_on_commit():
+        # Вне транзакции on_commit() вызывает функцию сразу; при откате — не вызывает
+        transaction.on_commit(partial(_write, model, object_ids))
+    else:
+        _write(model, object_ids)
+
+
+def _write(model, object_ids):
+    from .models import SyncChange
+
+    # Блокировка держится до конца транзакции, поэтому без atomic() она
+    # снялась бы сразу после SELECT; во внешней транзакции точка сохранения не нужна
+    with transaction.atomic(savepoint=False):
+        _lock_journal()
+        for start in range(0, len(object_ids), _BATCH_SIZE):
+            batch = object_ids[start:start + _BATCH_SIZE]
+            SyncChange.objects.filter(model=model, object_id__in=batch).delete()
+            SyncChange.objects.bulk_create([SyncChange(model=model, object_id=object_id) for object_id in batch])
+
+
+def record_words(word_ids):
+    """Записать слова вместе с их переводами в обе стороны."""
+    from .models import Translation
+
+    word_ids = list(word_ids)
+    if not word_ids:
+        return
+    record(WORD, word_ids)
+    record(TRANSLATION, Translation.objects.filter(
+        Q(from_word_id__in=word_ids) | Q(to_word_id__in=word_ids)
+    ).values_list('id', flat=True))
+
+
+def _visible_words():
+    from .models import Word
+
+    return Word.objects.filter(status='approved', is_deleted=False)
+
+
+def _words(ids):
+    from .models import Word
+
+    rows = _visible_words().filter(id__in=ids).values_list(
+        'id', 'language__code', 'word', 'meaning', 'pronunciation', 'category__code', 'difficulty',
+    )
+    tags = {}
+    for word_id, code in Word.tags.through.objects.filter(word_id__in=ids).values_list('word_id', 'tag__code'):
+        tags.setdefault(word_id, []).append(code)
+    return {
+        word_id: {
+            'id': word_id,
+            'language': language,
+            'word': word,
+            'meaning': meaning,
+            'pronunciation': pronunciation,
+            'category': category,
+            'difficulty': difficulty,
+            'tags': sorted(tags.get(word_id, [])),
+        }
+        for word_id, language, word, meaning, pronunciation, category, difficulty in rows
+    }
+
+
+def _translations(ids):
+    from .models import Translation
+
+    visible = _visible_words()
+    rows = Translation.objects.filter(
+        id__in=ids, status='approved', from_word__in=visible, to_word__in=visible,
+    ).values('id', 'from_word_id', 'to_word_id', 'order', 'note')
+    return {
+        row['id']: {'id': row['id'], 'from': row['from_word_id'], 'to': row['to_word_id'],
+                    'order': row['order'], 'note': row['note']}
+        for row in rows
+    }
+
+
+def _category_translations(ids):
+    from .models import CategoryTranslation
+
+    rows = CategoryTranslation.objects.filter(id__in=ids).values(
+        'id', 'category__code', 'language__code', 'name', 'description',
+    )
+    return {
+        row['id']: {'id': row['id'], 'category': row['category__code'], 'language': row['language__code'],
+                    'name': row['name'], 'description': row['description']}
+        for row in rows
+    }
+
+
+def _tag_translations(ids):
+    from .models import TagTranslation
+
+    rows = TagTranslation.objects.filter(id__in=ids).values('id', 'tag__code', 'language__code', 'name')
+    return {
+        row['id']: {'id': row['id'], 'tag': row['tag__code'], 'language': row['language__code'], 'name': row['name']}
+        for row in rows
+    }
+
+
+def _interface_translations(ids):
+    from .models import InterfaceTranslation
+
+    rows = InterfaceTranslation.objects.filter(id__in=ids).values('id', 'language__code', 'key', 'value')
+    return {
+        row['id']: {'id': row['id'], 'language': row['language__code'], 'key': row['key'], 'value': row['value']}
+        for row in rows
+    }
+
+
+# Модель журнала → функция, возвращающая {id: данные} для видимых объектов
+_LOADERS = {
+    WORD: _words,
+    TRANSLATION: _translations,
+    CATEGORY_TRANSLATION: _category_translations,
+    TAG_TRANSLATION: _tag_translations,
+    INTERFACE_TRANSLATION: _interface_translations,
+}
+
+
+def changes(cursor=0, limit=DEFAULT_LIMIT):
+    """Страница изменений после ``cursor``.
+
+    Возвращает ``{'cursor': ..., 'more': ..., 'changes': {модель: {'upsert': [...], 'delete': [...]}}}``;
+    ``cursor`` из ответа передаётся в следующий запрос, ``more`` — есть ли ещё страницы.
+    """
+    from .models import SyncChange
+
+    limit = max(1, min(limit, MAX_LIMIT))
+    rows = list(
+        SyncChange.objects.filter(seq__gt=cursor).order_by('seq').values_list('seq', 'model', 'object_id')[:limit + 1]
+    )
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    ids_by_model = {}
+    for _, model, object_id in rows:
+        ids_by_model.setdefault(model, []).append(object_id)
+
+    result = {}
+    for model, ids in ids_by_model.items():
+        loader = _LOADERS.get(model)
+        if loader is None:
+            continue
+        objects = loader(ids)
+        result[model] = {
+            'upsert': [objects[object_id] for object_id in ids if object_id in objects],
+            'delete': [object_id for object_id in ids if object_id not in objects],
+        }
+
+    return {
+        'cursor': rows[-1][0] if rows else cursor,
+        'more': more,
+        'changes': result,
+    }
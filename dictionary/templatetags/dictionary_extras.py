@@ -1,5 +1,7 @@
 from django import template
 
+from dictionary.translation_names import get_translated, kind_of, translated_name, translation_names
+
 register = template.Library()
 
 @register.filter
@@ -9,56 +11,61 @@ def get_item(dictionary, key):
         return None
     return dictionary.get(key)
 
+@register.simple_tag(takes_context=True)
+def cursor_url(context, cursor):
+    """Текущий URL с заменённым курсором пагинации (старый параметр page отбрасывается)"""
+    params = context['request'].GET.copy()
+    params.pop('page', None)
+    params.pop('cursor', None)
+    if cursor:
+        params['cursor'] = cursor
+    return '?' + params.urlencode()
+
 @register.filter
 def get_translation(obj, language_code):
-    """Получить перевод объекта для указанного языка"""
-    if hasattr(obj, 'translations'):
-        try:
-            return obj.translations.get(language__code=language_code)
-        except:
-            return None
-    return None
+    """Получить перевод объекта для указанного языка (из кэша названий)"""
+    return get_translated(obj, language_code)
 
 @register.filter
 def get_translation_name(obj, language_code):
     """Получить название перевода объекта для указанного языка"""
-    translation = get_translation(obj, language_code)
-    if translation:
-        return translation.name
-    return obj.code if hasattr(obj, 'code') else str(obj)
+    return translated_name(obj, language_code)
 
 @register.filter
 def get_translation_description(obj, language_code):
     """Получить описание перевода объекта для указанного языка"""
-    translation = get_translation(obj, language_code)
-    if translation and hasattr(translation, 'description'):
+    translation = get_translated(obj, language_code)
+    if translation:
         return translation.description
     return ''
 
 @register.filter
 def has_translation(obj, language_code):
     """Проверить, есть ли перевод для указанного языка"""
-    return get_translation(obj, language_code) is not None
+    return get_translated(obj, language_code) is not None
 
 @register.filter
 def get_missing_languages(obj, all_languages):
     """Получить список языков, для которых нет переводов"""
-    if not hasattr(obj, 'translations'):
+    kind = kind_of(obj)
+    if kind is None:
         return all_languages
     
-    existing_languages = set(obj.translations.values_list('language__code', flat=True))
+    existing_languages = translation_names.languages_of(kind, obj.id)
     return [lang for lang in all_languages if lang.code not in existing_languages]
 
 @register.filter
 def get_translation_percentage(obj, all_languages):
     """Получить процент переведенных языков"""
-    if not hasattr(obj, 'translations'):
+    kind = kind_of(obj)
+    if kind is None:
         return 0
     
-    total_languages = all_languages.count()
-    translated_languages = obj.translations.count()
+    total_languages = len(all_languages)
+    existing_languages = translation_names.languages_of(kind, obj.id)
+    translated_languages = sum(1 for lang in all_languages if lang.code in existing_languages)
     
     if total_languages == 0:
         return 0
     
-    return round((translated_languages / total_languages) * 100) 
\ No newline at end of file
+    return round((translated_languages / total_languages) * 100)
@@ -1,3 +1,1470 @@
-from django.test import TestCase
+"""Тесты словаря: число SQL-запросов и поведение подсистем.
 
-# Create your tests here.
+Регрессионные тесты числа SQL-запросов.
+
+Каждое представление и список админки вызывается на реалистичных данных
+(``dictionary.benchmark.generator``: несколько языков, переводы, теги,
+примеры), и число запросов сравнивается с бюджетом из ``QUERY_BUDGETS`` —
+той же таблицы, по которой ``QueryInstrumentationMiddleware`` пишет
+предупреждения в работе. Оптимизировали представление — уменьшите его
+бюджет в настройках.
+
+``QueryScalingTests`` проверяют, что число запросов не растёт с размером
+страницы и с количеством данных (слов, переводов и тегов у слова): так N+1
+ловится даже тогда, когда в бюджет он пока укладывается.
+
+Кэши (общий, память процесса, индексы автодополнения и графа переводов)
+сбрасываются перед каждым замером: считается худший случай — холодный кэш.
+
+Остальные классы проверяют поведение подсистем (поиск, синхронизация,
+импорт и т. д.) на небольших наборах данных, созданных в самом тесте.
+"""
+import cProfile
+import datetime
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock, skipIf
+
+from django.conf import settings
+from django.contrib import admin
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, reverse
+
+from . import caching, coverage, exporting, facets, fuzzy, instrumentation, profiling, search, snapshot, sqlite, sync
+from .autocomplete import PrefixIndex, get_prefix_index, prefix_index
+from .autofill import auto_fill
+from .benchmark import generator
+from .bulk import bulk_translate, translations_created
+from .graph import Path, TranslationGraph, get_translation_graph, translation_graph
+from .importing import run_import
+from .models import (
+    Category, CategoryTranslation, CustomUser, Example, Favourite, InterfaceTranslation, Language, SearchHistory, Tag,
+    TagTranslation, Translation, Word, WordChangeLog, WordHistory, WordLike,
+)
+from .normalization import normalize_word
+from .pagination import (
+    FORWARD, CappedCount, InvalidCursor, KeysetPaginator, capped_count, decode_cursor, encode_cursor,
+)
+from .translation_names import (
+    CATEGORY, TAG, TranslatedName, TranslationNameCache, get_translated, translated_name, translation_names,
+)
+
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# Тесты не пишут файлов метрик, профилей и статических страниц
+ISOLATED_SETTINGS = {
+    'CACHES': TEST_CACHES, 'METRICS_DIR': None, 'STATIC_PAGES_ROOT': None, 'PROFILING_SAMPLE_RATE': 0,
+}
+
+# Представления без бюджета: только редиректы и страницы без обращения к словарю
+UNBUDGETED_VIEWS = {'dictionary:logout'}
+
+
+def budget(name):
+    return settings.QUERY_BUDGETS[name]
+
+
+def reset_caches():
+    """Сбросить общий кэш и структуры в памяти процесса."""
+    cache.clear()
+    caching.tiered_cache.clear_local()
+    translation_graph.invalidate()
+    prefix_index.invalidate()
+    translation_names.invalidate()
+
+
+def admin_changelists():
+    """Имена URL списков админки для моделей приложения."""
+    return sorted(
+        f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist'
+        for model in admin.site._registry
+        if model._meta.app_label == 'dictionary'
+    )
+
+
+@override_settings(**ISOLATED_SETTINGS)
+class QueryCountTestCase(TestCase):
+    # Понятий (по слову на каждом из четырёх языков) в исходных данных
+    CONCEPTS = 30
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Превышения бюджета проверяют сами тесты, в выводе предупреждения только мешают
+        logging.getLogger('dictionary.queries').disabled = True
+        profiles_dir = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, profiles_dir)
+        profiles_settings = override_settings(PROFILING_DIR=profiles_dir)
+        profiles_settings.enable()
+        cls.addClassCleanup(profiles_settings.disable)
+        cls.profile_name = profiling.save(cProfile.Profile().dump_stats, 'dictionary:home', 0.1, profiling.CPROFILE)
+
+    @classmethod
+    def tearDownClass(cls):
+        logging.getLogger('dictionary.queries').disabled = False
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = CustomUser.objects.create_superuser('staff', 'staff@example.com', 'password')
+        generator.generate(cls.CONCEPTS, fanout=2, categories=5, tags=8, seed=1)
+        # У проверяемого слова нет прямого перевода на один из языков: добавляем путь к нему
+        # через промежуточный язык, чтобы страница слова всегда показывала и такие переводы
+        word = Word.objects.filter(language__code='ru').order_by('id').first()
+        direct = word.from_translations.select_related('to_word').first().to_word
+        missing = Word.objects.exclude(
+            language__in=[word.language_id, *word.from_translations.values_list('to_word__language', flat=True)],
+        ).exclude(to_translations__from_word=direct).order_by('id').first()
+        translation = Translation.objects.create(from_word=direct, to_word=missing, status='approved')
+        translations_created.send(sender=Translation, translations=[translation])
+        cls.add_user_activity(users=2, words=5)
+
+    @classmethod
+    def add_user_activity(cls, users, words):
+        """Пользователи с избранным, оценками, историей поиска и правками ``words`` слов.
+
+        У сгенерированных примеров нет автора, поэтому списки админки с
+        пользователями без этих строк N+1 не показали бы.
+        """
+        start = CustomUser.objects.count()
+        for number in range(start, start + users):
+            user = CustomUser.objects.create_user(f'user{number}', f'user{number}@example.com', 'password')
+            for word in Word.objects.order_by('-id')[:words]:
+                Favourite.objects.create(user=user, word=word)
+                WordLike.objects.create(user=user, word=word, is_like=True)
+                SearchHistory.objects.create(user=user, word=word.word)
+                Example.objects.create(word=word, text=f'{word.word} ({number})', author=user)
+                WordChangeLog.objects.create(word=word, user=user, action='updated', change_type='manual')
+                WordHistory.objects.create(word=word, data={'word': word.word}, changed_by=user)
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+        self.word = Word.objects.filter(language__code='ru').order_by('id').first()
+        self.category = Category.objects.order_by('id').first()
+        self.tag = Tag.objects.order_by('id').first()
+
+    @staticmethod
+    def reset_caches():
+        reset_caches()
+
+    def count_queries(self, url, method='get', data=None, **extra):
+        """Число запросов при обращении к ``url`` с холодными кэшами (вместе с потоковым телом ответа)."""
+        self.reset_caches()
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data, HTTP_HOST='localhost', **extra)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400, f'{method.upper()} {url}: {response.status_code}')
+        return len(queries)
+
+    def bulk_word_translation_post(self, words):
+        return {
+            'word_ids': [word.id for word in words],
+            'translations_data': json.dumps({
+                str(word.id): {'target_lang': 'tr', 'translation': f'{word.word} tr'} for word in words
+            }),
+        }
+
+    def bulk_multi_translate_post(self, words):
+        return {
+            'word_ids': [word.id for word in words],
+            'target_languages': ['ru', 'en'],
+            'translations_data': json.dumps({
+                f'{word.id}_{code}': f'{word.word} {code}' for word in words for code in ('ru', 'en')
+            }),
+        }
+
+    def read_requests(self):
+        """``(имя в QUERY_BUDGETS, url, данные, заголовки)`` для GET-запросов."""
+        word_id = self.word.id
+        return [
+            ('dictionary:home', reverse('dictionary:home'), None, {}),
+            ('dictionary:home', reverse('dictionary:home'), {'q': self.word.word[:3], 'lang': 'ru'}, {}),
+            ('dictionary:home', reverse('dictionary:home'), {'category': self.category.id, 'tag': self.tag.id}, {}),
+            ('dictionary:word_detail', reverse('dictionary:word_detail', args=[word_id]), None, {}),
+            ('dictionary:login', reverse('dictionary:login'), None, {}),
+            ('dictionary:register', reverse('dictionary:register'), None, {}),
+            ('dictionary:profile', reverse('dictionary:profile'), None, {}),
+            ('dictionary:translation_dashboard', reverse('dictionary:translation_dashboard'), None, {}),
+            ('dictionary:category_translations_edit',
+             reverse('dictionary:category_translations_edit', args=[self.category.id]), None, {}),
+            ('dictionary:tag_translations_edit', reverse('dictionary:tag_translations_edit', args=[self.tag.id]),
+             None, {}),
+            ('dictionary:interface_translations_edit', reverse('dictionary:interface_translations_edit'), None, {}),
+            ('dictionary:translation_progress', reverse('dictionary:translation_progress'), None, {}),
+            ('dictionary:translation_coverage_json', reverse('dictionary:translation_coverage_json'), None, {}),
+            ('dictionary:word_translations_dashboard', reverse('dictionary:word_translations_dashboard'), None, {}),
+            ('dictionary:word_translation_edit', reverse('dictionary:word_translation_edit', args=[word_id]),
+             None, {}),
+            ('dictionary:bulk_word_translation', reverse('dictionary:bulk_word_translation'),
+             {'source_lang': 'ru', 'target_lang': 'kk'}, {}),
+            ('dictionary:translation_search', reverse('dictionary:translation_search'),
+             {'q': self.word.word[:2], 'source_lang': 'ru'}, {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}),
+            ('dictionary:word_create', reverse('dictionary:word_create'), None, {}),
+            ('dictionary:word_edit', reverse('dictionary:word_edit', args=[word_id]), None, {}),
+            ('dictionary:multi_translate_word', reverse('dictionary:multi_translate_word', args=[word_id]),
+             None, {}),
+            ('dictionary:bulk_multi_translate', reverse('dictionary:bulk_multi_translate'), {'source_lang': 'ru'}, {}),
+            ('dictionary:quick_translate', reverse('dictionary:quick_translate'), None, {}),
+            ('dictionary:quick_translate', reverse('dictionary:quick_translate'),
+             {'q': self.word.word[:2], 'sort': 'category', 'order': 'desc'}, {}),
+            ('dictionary:quick_translate_detail', reverse('dictionary:quick_translate_detail', args=[word_id]),
+             None, {}),
+            ('dictionary:export_dictionary', reverse('dictionary:export_dictionary'), {'format': 'ndjson'}, {}),
+            ('dictionary:sync_changes', reverse('dictionary:sync_changes'), None, {}),
+            ('dictionary:metrics', reverse('dictionary:metrics'), None, {}),
+            ('dictionary:profiles', reverse('dictionary:profiles'), {'sort': 'duration'}, {}),
+            ('dictionary:profile_file', reverse('dictionary:profile_file', args=[self.profile_name]), None, {}),
+        ] + [(name, reverse(name), None, {}) for name in admin_changelists()]
+
+    def write_requests(self):
+        """``(имя в QUERY_BUDGETS, url, данные POST)``."""
+        sources = list(Word.objects.filter(language__code='ru').order_by('id')[:3])
+        return [
+            ('dictionary:add_missing_translations', reverse('dictionary:add_missing_translations'),
+             {'type': 'category', 'id': self.category.id}),
+            ('dictionary:bulk_add_missing_translations', reverse('dictionary:bulk_add_missing_translations'),
+             {'type': 'tags'}),
+            ('dictionary:bulk_word_translation', reverse('dictionary:bulk_word_translation'),
+             self.bulk_word_translation_post(sources)),
+            ('dictionary:bulk_multi_translate', reverse('dictionary:bulk_multi_translate'),
+             self.bulk_multi_translate_post(sources)),
+            ('dictionary:auto_fill_translations', reverse('dictionary:auto_fill_translations'),
+             json.dumps({'word_ids': [word.id for word in sources], 'target_languages': ['kk', 'tr']})),
+        ]
+
+
+class QueryBudgetTests(QueryCountTestCase):
+
+    def test_read_views_within_budget(self):
+        for name, url, data, extra in self.read_requests():
+            with self.subTest(view=name, url=url, data=data):
+                count = self.count_queries(url, 'get', data, **extra)
+                self.assertLessEqual(count, budget(name), f'{name}: {count} запросов, бюджет {budget(name)}')
+
+    def test_write_views_within_budget(self):
+        for name, url, data in self.write_requests():
+            with self.subTest(view=name):
+                extra = {'content_type': 'application/json'} if isinstance(data, str) else {}
+                count = self.count_queries(url, 'post', data, **extra)
+                self.assertLessEqual(count, budget(name), f'{name}: {count} запросов, бюджет {budget(name)}')
+
+    def test_every_view_has_budget(self):
+        dictionary_urls = next(
+            pattern for pattern in get_resolver().url_patterns
+            if isinstance(pattern, URLResolver) and pattern.app_name == 'dictionary'
+        )
+        names = {
+            f'dictionary:{pattern.name}'
+            for pattern in dictionary_urls.url_patterns
+            if pattern.name
+        } | set(admin_changelists())
+        tested = {name for name, *_ in self.read_requests()} | {name for name, *_ in self.write_requests()}
+        self.assertEqual(names - UNBUDGETED_VIEWS - set(settings.QUERY_BUDGETS), set(), 'нет бюджета')
+        self.assertEqual(names - UNBUDGETED_VIEWS - tested, set(), 'нет теста')
+
+
+class QueryScalingTests(QueryCountTestCase):
+
+    def add_translations(self, word, count):
+        """Добавить слову ``count`` переводов на слова других понятий.
+
+        Переводы идут только на языки, куда у слова уже есть прямой перевод:
+        иначе пропали бы пути через промежуточный язык и запросов стало бы меньше.
+        """
+        languages = set(word.from_translations.values_list('to_word__language', flat=True))
+        targets = Word.objects.filter(language__in=languages).exclude(
+            to_translations__from_word=word,
+        ).order_by('id')[:count]
+        translations = Translation.objects.bulk_create([
+            Translation(from_word=word, to_word=target, status='approved', order=order)
+            for order, target in enumerate(targets, start=10)
+        ])
+        translations_created.send(sender=Translation, translations=translations)
+
+    def test_count_does_not_grow_with_data(self):
+        before = {(name, url, str(data)): self.count_queries(url, 'get', data, **extra)
+                  for name, url, data, extra in self.read_requests()}
+
+        # Втрое больше слов, больше переводов на слово, у проверяемого слова — десяток переводов и тегов
+        generator.generate(self.CONCEPTS * 2, fanout=3, categories=5, tags=8, seed=2)
+        self.add_translations(self.word, 10)
+        self.word.tags.add(*Tag.objects.all())
+        self.add_user_activity(users=5, words=10)
+
+        for name, url, data, extra in self.read_requests():
+            with self.subTest(view=name, url=url, data=data):
+                self.assertEqual(self.count_queries(url, 'get', data, **extra), before[name, url, str(data)])
+
+    def test_count_does_not_grow_with_page_size(self):
+        url = reverse('dictionary:bulk_multi_translate')
+        self.assertEqual(self.count_queries(url, data={'limit': 5}), self.count_queries(url, data={'limit': 100}))
+
+        for name in ('admin:dictionary_word_changelist', 'admin:dictionary_translation_changelist'):
+            with self.subTest(view=name):
+                url = reverse(name)
+                self.assertEqual(self.count_queries(url, data={'p': 1}), self.count_queries(url, data={'all': ''}))
+
+    def test_bulk_count_does_not_grow_with_batch(self):
+        words = list(Word.objects.filter(language__code='kk').order_by('id'))
+        for name, make_data in (
+            ('dictionary:bulk_word_translation', self.bulk_word_translation_post),
+            ('dictionary:bulk_multi_translate', self.bulk_multi_translate_post),
+        ):
+            with self.subTest(view=name):
+                url = reverse(name)
+                small = self.count_queries(url, 'post', make_data(words[:2]))
+                large = self.count_queries(url, 'post', make_data(words[2:22]))
+                self.assertEqual(small, large)
+
+
+@override_settings(**ISOLATED_SETTINGS)
+class QueryInstrumentationTests(TestCase):
+
+    def setUp(self):
+        self.language = Language.objects.create(code='ru', name='Русский')
+        self.staff = CustomUser.objects.create_superuser('staff', 'staff@example.com', 'password')
+
+    def records(self, response_func, level='INFO'):
+        """Строки лога ``dictionary.queries`` (уровень, JSON) за время ``response_func()``."""
+        with self.assertLogs('dictionary.queries', level) as logs:
+            response_func()
+        return [(record.levelname, json.loads(record.getMessage())) for record in logs.records]
+
+    def test_fingerprint_ignores_values(self):
+        self.assertEqual(
+            instrumentation.fingerprint("SELECT * FROM t WHERE id IN (%s, %s,%s) AND name = 'it''s'  AND n > 10"),
+            'SELECT * FROM t WHERE id IN (?) AND name = ? AND n > ?',
+        )
+
+    def test_warns_when_view_exceeds_budget(self):
+        self.client.force_login(self.staff)
+        url = reverse('dictionary:home')
+        with self.settings(QUERY_BUDGETS={'dictionary:home': 1000}):
+            [(level, record)] = self.records(lambda: self.client.get(url, HTTP_HOST='localhost'))
+        self.assertEqual(level, 'INFO')
+        self.assertEqual((record['view'], record['budget'], record['over_budget']), ('dictionary:home', 1000, False))
+        self.assertNotIn('repeated', record)
+
+        with self.settings(QUERY_BUDGETS={'dictionary:home': 1}):
+            [(level, record)] = self.records(lambda: self.client.get(url, HTTP_HOST='localhost'), 'WARNING')
+        self.assertEqual(level, 'WARNING')
+        self.assertGreater(record['queries'], 1)
+        self.assertTrue(record['over_budget'])
+
+    def test_warns_about_repeated_queries(self):
+        words = [Word.objects.create(word=f'слово{number}', language=self.language) for number in range(6)]
+
+        def n_plus_one(request):
+            # Язык каждого слова отдельным запросом
+            for word in Word.objects.filter(id__in=[word.id for word in words]):
+                Language.objects.get(pk=word.language_id)
+            return HttpResponse()
+
+        middleware = instrumentation.QueryInstrumentationMiddleware(n_plus_one)
+        request = RequestFactory().get('/')
+        [(level, record)] = self.records(lambda: middleware(request), 'WARNING')
+        self.assertEqual(level, 'WARNING')
+        self.assertEqual(record['queries'], 7)
+        [repeated] = record['repeated']
+        self.assertEqual(repeated['count'], 6)
+        self.assertIn('FROM "dictionary_language" WHERE "dictionary_language"."id" = ?', repeated['sql'])
+        self.assertEqual(request.query_stats.count, 7)
+
+        with self.settings(QUERY_REPEAT_THRESHOLD=10):
+            [(level, record)] = self.records(lambda: middleware(RequestFactory().get('/')))
+        self.assertEqual(level, 'INFO')
+
+
+@override_settings(CACHES=TEST_CACHES, METRICS_DIR=None, PROFILING_SAMPLE_RATE=0, PROFILING_MAX_FILES=2)
+class ProfilingTests(TestCase):
+
+    def setUp(self):
+        profiles_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, profiles_dir)
+        profiles_settings = override_settings(PROFILING_DIR=profiles_dir)
+        profiles_settings.enable()
+        self.addCleanup(profiles_settings.disable)
+        queries_logger = logging.getLogger('dictionary.queries')
+        queries_logger.disabled = True
+        self.addCleanup(setattr, queries_logger, 'disabled', False)
+        self.staff = CustomUser.objects.create_superuser('staff', 'staff@example.com', 'password')
+        self.url = reverse('dictionary:login')
+
+    def test_staff_header_profiles_request(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(self.url, HTTP_HOST='localhost', HTTP_X_PROFILE='1')
+        [profile] = profiling.list_profiles()
+        self.assertEqual(response['X-Profile-File'], profile.name)
+        self.assertEqual((profile.view, profile.mode), ('dictionary.login', profiling.CPROFILE))
+
+        response = self.client.get(self.url, HTTP_HOST='localhost', HTTP_X_PROFILE='sample')
+        self.assertTrue(response['X-Profile-File'].endswith('.collapsed'))
+
+    def test_header_ignored_without_staff(self):
+        user = CustomUser.objects.create_user('reader', 'reader@example.com', 'password')
+        for login in (None, user):
+            if login:
+                self.client.force_login(login)
+            response = self.client.get(self.url, HTTP_HOST='localhost', HTTP_X_PROFILE='1')
+            self.assertNotIn('X-Profile-File', response)
+        self.assertEqual(profiling.list_profiles(), [])
+
+    def test_sampled_requests_keep_latest_profiles(self):
+        with self.settings(PROFILING_SAMPLE_RATE=1):
+            for _ in range(3):
+                self.client.get(self.url, HTTP_HOST='localhost')
+        self.assertEqual(len(profiling.list_profiles()), 2)
+
+
+@override_settings(CACHES=TEST_CACHES, METRICS_DIR=None)
+class MetricsAccessTests(TestCase):
+
+    def setUp(self):
+        self.url = reverse('dictionary:metrics')
+        queries_logger = logging.getLogger('dictionary.queries')
+        queries_logger.disabled = True
+        self.addCleanup(setattr, queries_logger, 'disabled', False)
+
+    def test_without_token_only_staff(self):
+        self.assertEqual(self.client.get(self.url, HTTP_HOST='localhost').status_code, 403)
+        self.client.force_login(CustomUser.objects.create_superuser('staff', 'staff@example.com', 'password'))
+        self.assertEqual(self.client.get(self.url, HTTP_HOST='localhost').status_code, 200)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token(self):
+        self.assertEqual(self.client.get(self.url, HTTP_HOST='localhost').status_code, 401)
+        response = self.client.get(self.url, HTTP_HOST='localhost', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(**ISOLATED_SETTINGS)
+class DictionaryTestCase(TestCase):
+    """Языки ru, kk, en, tr и чистые кэши перед каждым тестом."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.languages = {
+            code: Language.objects.create(code=code, name=name)
+            for code, name in (('ru', 'Русский'), ('kk', 'Қазақша'), ('en', 'English'), ('tr', 'Türkçe'))
+        }
+
+    def setUp(self):
+        reset_caches()
+        queries_logger = logging.getLogger('dictionary.queries')
+        queries_logger.disabled = True
+        self.addCleanup(setattr, queries_logger, 'disabled', False)
+
+    def make_word(self, text, language='ru', meaning='', **fields):
+        return Word.objects.create(
+            word=text, language=self.languages[language], meaning=meaning, status=fields.pop('status', 'approved'),
+            **fields,
+        )
+
+
+def fts_triggers():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s", [search.WORD_TABLE])
+        return {name for name, in cursor.fetchall()}
+
+
+class FullTextSearchTests(DictionaryTestCase):
+
+    def match(self, query):
+        """Слова, найденные самим полнотекстовым индексом (без ``search_key``)."""
+        return set(Word.objects.filter(search.get_backend().filter(query)).values_list('word', flat=True))
+
+    def test_index_follows_save_edit_and_delete(self):
+        if connection.vendor == 'sqlite':
+            self.assertEqual(fts_triggers(), {f'{search.FTS_TABLE}_ai', f'{search.FTS_TABLE}_ad', f'{search.FTS_TABLE}_au'})
+        self.assertTrue(search.fts_enabled())
+
+        word = self.make_word('аренда', meaning='передача имущества во временное пользование')
+        self.assertEqual(self.match('имущества'), {'аренда'})
+
+        word.meaning = 'наём жилья'
+        word.save()
+        self.assertEqual(self.match('имущества'), set())
+        self.assertEqual(self.match('жилья'), {'аренда'})
+
+        word.delete()
+        self.assertEqual(self.match('жилья'), set())
+
+    def test_finds_by_meaning_and_ranks_word_matches_first(self):
+        self.make_word('аренда', meaning='договор найма имущества')
+        self.make_word('договор', meaning='соглашение сторон')
+        self.make_word('иск', meaning='требование в суд')
+
+        found = [word.word for word in search.search_words(Word.objects.all(), 'договор')]
+        self.assertEqual(found, ['договор', 'аренда'])
+        self.assertEqual([word.word for word in search.search_words(Word.objects.all(), 'суд')], ['иск'])
+
+
+class PostgresSearchTests(DictionaryTestCase):
+    backend = search.PostgresSearchBackend()
+
+    def test_sql_generation(self):
+        self.assertEqual(search.build_tsquery("договор  аренды'"), "'договор':* & 'аренды':*")
+        configs = sorted(set(search.TS_CONFIGS.values()))
+        sql, params = self.backend._tsquery('договор')
+        self.assertTrue(sql.startswith("(to_tsquery('simple', %s) || plainto_tsquery('english', %s)"))
+        self.assertEqual(sql.count('%s'), len(params))
+        self.assertEqual(params, ["'договор':*"] + ['договор'] * len(configs))
+
+        raw = self.backend.filter('50%_off').children[0][1]
+        self.assertIn(f'WHERE {search.PG_VECTOR_COLUMN} @@ (', raw.sql)
+        self.assertTrue(raw.sql.endswith('OR word ILIKE %s OR meaning ILIKE %s'))
+        self.assertEqual(raw.params[-2:], (r'%50\%\_off%', r'%50\%\_off%'))
+        rank = self.backend.rank('договор')
+        self.assertIn('similarity("dictionary_word"."word", %s)', rank.sql)
+        self.assertEqual(rank.params[-1], 'договор')
+
+    def test_stemmed_and_substring_matches(self):
+        if connection.vendor != 'postgresql':
+            self.skipTest('tsvector и pg_trgm есть только в PostgreSQL')
+        self.assertIsInstance(search.get_backend(), search.PostgresSearchBackend)
+        self.make_word('договор', meaning='соглашение сторон')
+        self.make_word('аренда', meaning='договоры найма имущества')
+        self.make_word('contracts', language='en')
+        self.make_word('иск')
+
+        found = [word.word for word in search.search_words(Word.objects.all(), 'договор')]
+        self.assertEqual(found, ['договор', 'аренда'])
+        self.assertEqual(set(Word.objects.filter(self.backend.filter('contract')).values_list('word', flat=True)),
+                         {'contracts'})
+        self.assertEqual(set(Word.objects.filter(self.backend.filter('ренд')).values_list('word', flat=True)),
+                         {'аренда'})
+
+
+class MigrationsKeepSearchIndexTests(TransactionTestCase):
+    """Миграции, пересоздающие таблицу слов в SQLite, не должны терять триггеры FTS."""
+
+    def test_triggers_survive_rollback_and_reapply(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('триггеры FTS5 есть только в SQLite')
+        call_command('migrate', 'dictionary', '0007', verbosity=0)
+        self.assertEqual(len(fts_triggers()), 3)
+        call_command('migrate', 'dictionary', verbosity=0)
+        self.assertEqual(len(fts_triggers()), 3)
+
+        language = Language.objects.create(code='ru', name='Русский')
+        word = Word.objects.create(word='залог', language=language, meaning='обеспечение обязательства')
+        self.assertTrue(Word.objects.filter(search.get_backend().filter('обязательства')).exists())
+        word.delete()
+        self.assertFalse(Word.objects.filter(search.get_backend().filter('обязательства')).exists())
+
+
+class NormalizationTests(TestCase):
+
+    def test_turkish_dotted_and_dotless_i(self):
+        self.assertEqual(normalize_word('İstanbul', 'tr'), 'istanbul')
+        self.assertEqual(normalize_word('ISPARTA', 'tr'), 'isparta')
+        self.assertEqual(normalize_word('ılık', 'tr'), 'ilik')
+        # Вне турецкого İ не оставляет комбинирующую точку после casefold()
+        self.assertEqual(normalize_word('İzmir', 'en'), 'izmir')
+
+    def test_russian_yo(self):
+        self.assertEqual(normalize_word('Ёлка', 'ru'), 'елка')
+        self.assertEqual(normalize_word('ёлка', 'ru'), normalize_word('елка', 'ru'))
+
+    def test_kazakh_letters_fold_to_russian_layout(self):
+        self.assertEqual(normalize_word('ҚАЗАҚСТАН', 'kk'), 'казакстан')
+        self.assertEqual(normalize_word('Әріп  өнер', 'kk'), 'арип онер')
+        self.assertEqual(normalize_word('ғұмыр', 'kk'), normalize_word('гумыр', 'kk'))
+        self.assertEqual(normalize_word('үһң', 'kk'), 'ухн')
+
+    def test_other_languages_drop_diacritics(self):
+        self.assertEqual(normalize_word('Café', 'en'), 'cafe')
+        self.assertEqual(normalize_word('Straße', 'en'), 'strasse')
+
+
+class TaxonomySearchTests(DictionaryTestCase):
+
+    def test_matches_exact_category_and_tag_codes_without_duplicates(self):
+        law = Category.objects.create(code='law')
+        noun, verb = Tag.objects.create(code='noun'), Tag.objects.create(code='verb')
+        word = self.make_word('иск', category=law)
+        word.tags.add(noun, verb)
+        self.make_word('лавка')
+
+        words = Word.objects.filter(search.search_filter('law') | search.taxonomy_filter('law'))
+        self.assertEqual(list(words.values_list('word', flat=True)), ['иск'])
+        words = Word.objects.filter(search.taxonomy_filter('NOUN'))
+        self.assertEqual(list(words.values_list('word', flat=True)), ['иск'])
+        # Часть кода не совпадает: LIKE '%q%' больше не используется
+        self.assertFalse(Word.objects.filter(search.taxonomy_filter('ou')).exists())
+
+
+class FacetCountTests(DictionaryTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.law = Category.objects.create(code='law')
+        self.noun = Tag.objects.create(code='noun')
+        self.make_word('иск', category=self.law).tags.add(self.noun)
+        self.make_word('суд', category=self.law)
+        self.make_word('lawsuit', language='en').tags.add(self.noun)
+        self.make_word('истец', status='pending', category=self.law)
+        self.make_word('иски', is_deleted=True, category=self.law)
+
+    def test_counts_ignore_filter_of_own_facet(self):
+        ru, en = self.languages['ru'].id, self.languages['en'].id
+        self.assertEqual(facets.get_counts(), {
+            'language': {ru: 2, en: 1}, 'category': {self.law.id: 2}, 'tag': {self.noun.id: 2},
+        })
+        # Выбран язык: по языкам счётчики те же, категории и теги — только русских слов
+        self.assertEqual(facets.get_counts(language='ru'), {
+            'language': {ru: 2, en: 1}, 'category': {self.law.id: 2}, 'tag': {self.noun.id: 1},
+        })
+        self.assertEqual(facets.get_counts(tag=self.noun.id)['language'], {ru: 1, en: 1})
+        self.assertEqual(facets.get_counts('суд')['language'], {ru: 1})
+
+    def test_word_changes_invalidate_cached_counts(self):
+        ru = self.languages['ru'].id
+        self.assertEqual(facets.get_counts()['language'][ru], 2)
+        with self.assertNumQueries(0):
+            facets.get_counts()
+        Word.objects.get(word='истец').delete()
+        self.make_word('приговор', category=self.law)
+        self.assertEqual(facets.get_counts()['language'][ru], 3)
+        self.assertEqual(facets.get_counts()['category'], {self.law.id: 3})
+
+
+class TranslationNameTests(DictionaryTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.law = Category.objects.create(code='law')
+        self.noun = Tag.objects.create(code='noun')
+        CategoryTranslation.objects.create(
+            category=self.law, language=self.languages['ru'], name='Право', description='Юридические термины',
+        )
+        TagTranslation.objects.create(tag=self.noun, language=self.languages['kk'], name='Зат есім')
+
+    def test_lookup_with_fallback_to_code(self):
+        self.assertEqual(translation_names.names(CATEGORY, 'ru'), {self.law.id: 'Право'})
+        self.assertEqual(translation_names.names(TAG, 'ru'), {})
+        self.assertEqual(translated_name(self.law, 'ru'), 'Право')
+        self.assertEqual(translated_name(self.law, 'en'), 'law')
+        self.assertEqual(get_translated(self.law, 'ru'), TranslatedName('Право', 'Юридические термины'))
+        self.assertEqual(get_translated(self.noun, 'kk'), TranslatedName('Зат есім', ''))
+        self.assertIsNone(get_translated(self.noun, 'ru'))
+        self.assertEqual(translation_names.languages_of(TAG, self.noun.id), {'kk'})
+        self.assertEqual(translation_names.translated_languages(CATEGORY), {self.law.id: {'ru'}})
+
+    @override_settings(CACHE_LOCAL_CHECK_INTERVAL=0)
+    def test_changes_reach_other_processes(self):
+        other_process = TranslationNameCache()
+        self.assertEqual(other_process.names(CATEGORY, 'ru'), {self.law.id: 'Право'})
+        with self.assertNumQueries(0):
+            other_process.names(CATEGORY, 'ru')
+
+        CategoryTranslation.objects.filter(category=self.law).update(name='Юриспруденция')
+        # update() сигналов не шлёт: без сброса процессы видят старое название
+        self.assertEqual(other_process.names(CATEGORY, 'ru'), {self.law.id: 'Право'})
+        CategoryTranslation.objects.get(category=self.law).save()
+        self.assertEqual(other_process.names(CATEGORY, 'ru'), {self.law.id: 'Юриспруденция'})
+
+        TagTranslation.objects.get(tag=self.noun).delete()
+        self.assertEqual(other_process.languages_of(TAG, self.noun.id), set())
+        self.assertEqual(translated_name(self.noun, 'kk'), 'noun')
+
+
+class CoverageTests(DictionaryTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.law = Category.objects.create(code='law')
+        self.noun = Tag.objects.create(code='noun')
+        for code, name in (('ru', 'Право'), ('kk', 'Құқық')):
+            CategoryTranslation.objects.create(category=self.law, language=self.languages[code], name=name)
+        for language in self.languages.values():
+            InterfaceTranslation.objects.create(language=language, key='menu.home', value='…')
+        InterfaceTranslation.objects.create(language=self.languages['ru'], key='button.save', value='Сохранить')
+
+    def test_matrix_in_fixed_number_of_queries(self):
+        with self.assertNumQueries(7):
+            matrix = coverage.build_matrix()
+        self.assertEqual([language['code'] for language in matrix['languages']], ['en', 'kk', 'ru', 'tr'])
+        law, = matrix['categories']['items']
+        self.assertEqual(law['names'], {'kk': 'Құқық', 'ru': 'Право'})
+        self.assertEqual((law['missing'], law['percentage']), (['en', 'tr'], 50))
+        self.assertEqual(
+            {key: matrix['tags'][key] for key in ('total', 'complete', 'empty')}, {'total': 1, 'complete': 0, 'empty': 1},
+        )
+        self.assertEqual((matrix['interface']['total'], matrix['interface']['complete']), (2, 1))
+        ru, en = matrix['by_language']['ru'], matrix['by_language']['en']
+        self.assertEqual((ru['total_translations'], ru['percentage'], ru['interface_percentage']), (1, 50, 100))
+        self.assertEqual((en['total_translations'], en['percentage'], en['interface_percentage']), (0, 0, 50))
+
+    def test_json_follows_translation_changes(self):
+        url = reverse('dictionary:translation_coverage_json')
+        self.assertEqual(self.client.get(url).json()['by_language']['en']['category_translations'], 0)
+        CategoryTranslation.objects.create(category=self.law, language=self.languages['en'], name='Law')
+        data = self.client.get(url).json()
+        self.assertEqual(data['by_language']['en']['category_translations'], 1)
+        self.assertEqual(data['categories']['items'][0]['missing'], ['tr'])
+
+
+class FuzzySearchTests(DictionaryTestCase):
+
+    def test_bounded_levenshtein(self):
+        self.assertEqual(fuzzy.bounded_levenshtein('договор', 'договор', 2), 0)
+        self.assertEqual(fuzzy.bounded_levenshtein('договор', 'дагавор', 2), 2)
+        self.assertEqual(fuzzy.bounded_levenshtein('договор', 'договоры', 2), 1)
+        # Дальше границы расстояние не считается до конца
+        self.assertEqual(fuzzy.bounded_levenshtein('договор', 'приговор', 1), 2)
+        self.assertEqual(fuzzy.bounded_levenshtein('иск', 'исковое', 2), 3)
+
+    def test_trigrams_follow_language_rules(self):
+        word = self.make_word('İzmir', language='tr')
+        self.assertEqual(set(word.trigrams.values_list('trigram', flat=True)), fuzzy.make_trigrams('izmir'))
+        self.assertEqual([found.word for found in fuzzy.fuzzy_search('izmr', language='tr')], ['İzmir'])
+
+    def test_ranks_candidates_by_distance_then_similarity(self):
+        for text in ('приговор', 'договорный', 'договора', 'договор', 'дорога'):
+            self.make_word(text)
+        self.make_word('договоры', status='pending')
+        self.make_word('договорник', is_deleted=True)
+
+        found = fuzzy.fuzzy_search('договоры', language='ru')
+        # Одно расстояние (1) — выше тот, у кого больше доля общих триграмм
+        self.assertEqual(
+            [(word.word, word.distance) for word in found],
+            [('договор', 1), ('договора', 1), ('договорный', 2), ('приговор', 3)],
+        )
+        self.assertGreater(found[0].similarity, found[1].similarity)
+        found = fuzzy.fuzzy_search('договоры', language='ru', approved_only=False)
+        self.assertEqual(found[0].word, 'договоры')
+        self.assertEqual(fuzzy.fuzzy_search('договоры', language='en'), [])
+
+    def test_common_trigrams_are_capped(self):
+        for number in range(5):
+            self.make_word(f'дом{number}')
+        self.assertEqual(len(fuzzy.fuzzy_search('дом', language='ru')), 5)
+        with mock.patch.object(fuzzy, 'POSTING_LIMIT', 2):
+            self.assertEqual(len(fuzzy.fuzzy_search('дом', language='ru')), 2)
+
+
+class SyncTests(DictionaryTestCase):
+
+    def changes_after(self, cursor):
+        page = sync.changes(cursor)
+        self.assertFalse(page['more'])
+        return page['cursor'], page['changes']
+
+    def test_hidden_and_deleted_objects_come_as_deletes(self):
+        hidden, pending, kept = self.make_word('иск'), self.make_word('суд'), self.make_word('lawsuit', language='en')
+        removed = Translation.objects.create(from_word=hidden, to_word=kept)
+        orphaned = Translation.objects.create(from_word=pending, to_word=kept)
+        cursor, changes = self.changes_after(0)
+        self.assertEqual({word['word'] for word in changes[sync.WORD]['upsert']}, {'иск', 'суд', 'lawsuit'})
+        self.assertEqual(len(changes[sync.TRANSLATION]['upsert']), 2)
+
+        hidden.is_deleted = True
+        hidden.save()
+        pending.status = 'pending'
+        pending.save()
+        removed_id = removed.id
+        removed.delete()
+
+        cursor, changes = self.changes_after(cursor)
+        self.assertEqual(set(changes[sync.WORD]['delete']), {hidden.id, pending.id})
+        self.assertEqual(set(changes[sync.TRANSLATION]['delete']), {removed_id, orphaned.id})
+        self.assertEqual(changes[sync.TRANSLATION]['upsert'], [])
+        self.assertEqual(self.changes_after(cursor), (cursor, {}))
+
+    def test_pages_follow_cursor_without_gaps_or_repeats(self):
+        words = [self.make_word(f'слово{number}') for number in range(5)]
+        words[0].meaning = 'изменено'
+        words[0].save()
+
+        seen, cursor, pages = [], 0, 0
+        while True:
+            page = sync.changes(cursor, limit=2)
+            seen.extend(word['id'] for word in page['changes'].get(sync.WORD, {}).get('upsert', []))
+            self.assertGreater(page['cursor'], cursor)
+            cursor, pages = page['cursor'], pages + 1
+            if not page['more']:
+                break
+        self.assertEqual(pages, 3)
+        # Изменённое слово переехало в конец журнала и пришло один раз
+        self.assertEqual(seen, [word.id for word in words[1:]] + [words[0].id])
+        self.assertEqual(sync.changes(cursor), {'cursor': cursor, 'more': False, 'changes': {}})
+
+    @override_settings(SYNC_RECORD_ON_COMMIT=True)
+    def test_on_commit_mode_writes_journal_after_commit_only(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            word = self.make_word('иск')
+            self.assertEqual(sync.changes(0)['changes'], {})
+        self.assertEqual([item['id'] for item in sync.changes(0)['changes'][sync.WORD]['upsert']], [word.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.make_word('суд')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(len(sync.changes(0)['changes'][sync.WORD]['upsert']), 1)
+
+
+class KeysetPaginationTests(DictionaryTestCase):
+
+    def walk(self, paginator):
+        """Пройти страницы вперёд до конца, затем назад до начала."""
+        forward, page = [], paginator.get_page()
+        self.assertFalse(page.has_previous)
+        while True:
+            forward.append([word.word for word in page])
+            if not page.has_next:
+                break
+            page = paginator.get_page(page.next_cursor)
+        backward = []
+        while page.has_previous:
+            page = paginator.get_page(page.previous_cursor)
+            backward.append([word.word for word in page])
+        return forward, backward
+
+    def test_cursor_round_trip_and_tampering(self):
+        created = datetime.datetime(2026, 1, 2, 3, 4, 5)
+        token = encode_cursor(['аренда', None, created, 7], FORWARD)
+        self.assertEqual(decode_cursor(token), (['аренда', None, created.isoformat(), 7], FORWARD))
+        for broken in (token[:-3], 'не base64', encode_cursor([1], 'x'), token.swapcase()):
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(broken)
+
+    def test_pages_forward_and_back(self):
+        for text in ('д', 'а', 'в', 'б', 'г'):
+            self.make_word(text)
+        forward, backward = self.walk(KeysetPaginator(Word.objects.all(), ['word', 'id'], 2))
+        self.assertEqual(forward, [['а', 'б'], ['в', 'г'], ['д']])
+        self.assertEqual(backward, [['в', 'г'], ['а', 'б']])
+        forward, _ = self.walk(KeysetPaginator(Word.objects.all(), ['-word', '-id'], 2))
+        self.assertEqual(forward, [['д', 'г'], ['в', 'б'], ['а']])
+
+    def test_nulls_come_first_ascending_and_last_descending(self):
+        law = Category.objects.create(code='law')
+        for text, category in (('а', law), ('б', None), ('в', law), ('г', None)):
+            self.make_word(text, category=category)
+        forward, backward = self.walk(KeysetPaginator(Word.objects.all(), ['category', 'id'], 1))
+        self.assertEqual(forward, [['б'], ['г'], ['а'], ['в']])
+        self.assertEqual(backward, [['а'], ['г'], ['б']])
+        forward, _ = self.walk(KeysetPaginator(Word.objects.all(), ['-category', '-id'], 3))
+        self.assertEqual(forward, [['в', 'а', 'г'], ['б']])
+
+    def test_invalid_cursor_gives_first_page(self):
+        for text in ('а', 'б', 'в'):
+            self.make_word(text)
+        paginator = KeysetPaginator(Word.objects.all(), ['word', 'id'], 2)
+        first = [word.word for word in paginator.get_page()]
+        for cursor in ('мусор', encode_cursor(['а'], FORWARD), encode_cursor(['а', 1, 2], FORWARD)):
+            self.assertEqual([word.word for word in paginator.get_page(cursor)], first)
+
+    def test_search_results_page_by_word(self):
+        for number in range(25):
+            self.make_word(f'договор{number:02}', meaning='соглашение')
+        self.make_word('аренда', meaning='договор найма')
+        response = self.client.get(reverse('dictionary:home'), {'q': 'договор'})
+        words = [word.word for word in response.context['words']]
+        self.assertEqual(words[0], 'аренда')
+        self.assertEqual(words, sorted(words))
+        cursor = response.context['words'].next_cursor
+        response = self.client.get(reverse('dictionary:home'), {'q': 'договор', 'cursor': cursor})
+        self.assertEqual([word.word for word in response.context['words']], [f'договор{number}' for number in range(19, 25)])
+
+    def test_capped_count(self):
+        for text in ('а', 'б', 'в'):
+            self.make_word(text)
+        self.assertEqual(capped_count(Word.objects.all(), limit=2), CappedCount(2, False))
+        self.assertEqual(str(capped_count(Word.objects.all(), limit=2)), '2+')
+        self.assertEqual(str(capped_count(Word.objects.all())), '3')
+
+
+class SnapshotTests(DictionaryTestCase):
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = f'{directory}/dictionary.snapshot'
+
+        law, noun = Category.objects.create(code='law'), Tag.objects.create(code='noun')
+        CategoryTranslation.objects.create(category=law, language=self.languages['en'], name='Law')
+        TagTranslation.objects.create(tag=noun, language=self.languages['ru'], name='существительное')
+        self.contract = self.make_word('Договор', meaning='соглашение', category=law, pronunciation='[dəɡɐˈvor]')
+        self.contract.tags.add(noun)
+        Example.objects.create(word=self.contract, text='Договор подписан.')
+        self.agreement = self.make_word('agreement', language='en')
+        self.sozlesme = self.make_word('sözleşme', language='tr')
+        self.make_word('дорога')
+        self.make_word('договорённость', status='pending')
+        Translation.objects.create(from_word=self.contract, to_word=self.agreement, note='юр.')
+        Translation.objects.create(from_word=self.agreement, to_word=self.sozlesme)
+
+    def open(self):
+        self.assertEqual(snapshot.build(self.path), 4)
+        opened = snapshot.Snapshot(self.path)
+        self.addCleanup(opened.close)
+        return opened
+
+    def test_round_trip(self):
+        opened = self.open()
+        entry = opened.get(self.contract.id)
+        self.assertEqual(entry, snapshot.WordEntry(
+            id=self.contract.id, word='Договор', language='ru', meaning='соглашение',
+            pronunciation='[dəɡɐˈvor]', category='law', difficulty=self.contract.difficulty,
+            tags=['noun'], examples=['Договор подписан.'],
+        ))
+        self.assertIsNone(opened.get(0))
+        self.assertEqual(len(opened), 4)
+        self.assertEqual(opened.languages, ['en', 'kk', 'ru', 'tr'])
+        self.assertEqual(opened.language_name('tr'), 'Türkçe')
+
+        self.assertEqual([item.word for item in opened.exact('ДОГОВОР')], ['Договор'])
+        self.assertEqual(opened.exact('догов', language='ru'), [])
+        self.assertEqual([item.word for item in opened.prefix('до', language='ru')], ['Договор', 'дорога'])
+        self.assertEqual([item.word for item in opened.prefix('soz')], ['sözleşme'])
+
+        [translation] = opened.translations(self.contract.id)
+        self.assertEqual((translation.word.word, translation.note), ('agreement', 'юр.'))
+        self.assertEqual(opened.translations(self.contract.id, language='tr'), [])
+
+        self.assertEqual(opened.category_name('law', 'en'), 'Law')
+        self.assertEqual(opened.category_name('law', 'ru'), 'law')
+        self.assertEqual(opened.tag_name('noun', 'ru'), 'существительное')
+
+    def test_word_page_shows_paths_through_other_languages(self):
+        self.open()
+        with self.settings(DICTIONARY_SNAPSHOT_PATH=self.path):
+            response = self.client.get(reverse('dictionary:word_detail', args=[self.contract.id]))
+        [item] = response.context['via_translations']
+        self.assertEqual(item['word'].word, 'sözleşme')
+        self.assertEqual([word.word for word in item['via']], ['agreement'])
+
+    def test_replaced_snapshot_is_closed_after_last_reader(self):
+        self.open()
+        with self.settings(DICTIONARY_SNAPSHOT_PATH=self.path):
+            with snapshot.open_snapshot() as old:
+                agreement_id = self.agreement.id
+                self.agreement.delete()
+                snapshot.build(self.path)
+                with snapshot.open_snapshot() as new:
+                    self.assertIsNot(new, old)
+                    self.assertIsNone(new.get(agreement_id))
+                # Заменённый снимок читается, пока его не отпустили
+                self.assertFalse(old.closed)
+                self.assertEqual(old.get(agreement_id).word, 'agreement')
+            self.assertTrue(old.closed)
+            self.assertFalse(new.closed)
+
+
+class ImportTests(DictionaryTestCase):
+
+    CSV = (
+        'language,word,meaning,status,examples,translations\n'
+        'ru,договор,соглашение,approved,,en:contract\n'
+        'ru,договор,,,Договор подписан.,\n'
+        'ru,иск,,unknown,,\n'
+        'en,lawsuit,a claim,approved,,\n'
+        'ru,суд,,approved,,en:court|en:contract\n'
+    )
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = f'{directory}/terms.csv'
+        self.checkpoint = f'{self.path}.checkpoint'
+        with open(self.path, 'w', encoding='utf-8') as handle:
+            handle.write(self.CSV)
+
+    def words(self):
+        return sorted(Word.objects.values_list('language__code', 'word'))
+
+    def test_resumes_after_interrupted_batch_without_duplicates_or_gaps(self):
+        class Interrupted(Exception):
+            pass
+
+        def interrupt(stats, rate):
+            raise Interrupted
+
+        errors = []
+        with self.assertRaises(Interrupted):
+            run_import(self.path, 'csv', batch_size=2, checkpoint_path=self.checkpoint, on_progress=interrupt)
+        # Первая порция (две записи об одном слове) записана, контрольная точка — после неё
+        self.assertEqual(self.words(), [('en', 'contract'), ('ru', 'договор')])
+        with open(self.checkpoint, encoding='utf-8') as handle:
+            self.assertEqual(json.load(handle)['records'], 2)
+
+        stats = run_import(
+            self.path, 'csv', batch_size=2, checkpoint_path=self.checkpoint,
+            on_error=lambda number, message: errors.append(number),
+        )
+        self.assertEqual(
+            self.words(), [('en', 'contract'), ('en', 'court'), ('en', 'lawsuit'), ('ru', 'договор'), ('ru', 'суд')],
+        )
+        self.assertEqual(errors, [3])
+        self.assertEqual(
+            (stats.records, stats.errors, stats.duplicates, stats.translations_created, stats.examples_created),
+            (4, 1, 1, 3, 1),
+        )
+        contract = Word.objects.get(word='договор')
+        self.assertEqual((contract.meaning, contract.status), ('соглашение', 'approved'))
+        self.assertEqual(Translation.objects.count(), 3)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+        # Повторный импорт того же файла ничего не размножает
+        run_import(self.path, 'csv', batch_size=2, checkpoint_path=self.checkpoint)
+        self.assertEqual(Word.objects.count(), 5)
+        self.assertEqual(Translation.objects.count(), 3)
+        self.assertEqual(Example.objects.count(), 1)
+
+    def test_command_reports_progress_and_rejects_unknown_status(self):
+        output = StringIO()
+        call_command('import_terms', self.path, batch_size=2, status='approved', stdout=output, stderr=StringIO())
+        self.assertIn('записей/с', output.getvalue())
+        self.assertIn('Импорт завершён: 4 записей, ошибок 1, повторов 1', output.getvalue())
+        with self.assertRaises(ValueError):
+            run_import(self.path, 'csv', default_status='published')
+
+
+class ConditionalGetTests(DictionaryTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.contract = self.make_word('договор')
+        self.agreement = self.make_word('agreement', language='en')
+        self.sozlesme = self.make_word('sözleşme', language='tr')
+        Translation.objects.create(from_word=self.contract, to_word=self.agreement)
+        Translation.objects.create(from_word=self.agreement, to_word=self.sozlesme)
+        self.url = reverse('dictionary:word_detail', args=[self.contract.id])
+
+    def assertRevalidates(self):
+        """Ответ 200 с ETag, повтор с If-None-Match — 304. Возвращает ETag."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        return etag
+
+    def test_edit_of_word_on_via_path_invalidates_etag(self):
+        etag = self.assertRevalidates()
+        self.assertEqual([item['word'].word for item in self.client.get(self.url).context['via_translations']],
+                         ['sözleşme'])
+
+        self.sozlesme.word = 'mukavele'
+        self.sozlesme.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual([item['word'].word for item in response.context['via_translations']], ['mukavele'])
+
+    def test_edit_of_word_itself_invalidates_etag(self):
+        etag = self.assertRevalidates()
+        self.contract.meaning = 'соглашение сторон'
+        self.contract.save()
+        self.assertNotEqual(self.assertRevalidates(), etag)
+
+
+class AutocompleteTests(DictionaryTestCase):
+
+    def test_category_rename_reaches_other_processes(self):
+        law = Category.objects.create(code='law')
+        self.make_word('договор', category=law)
+        other_process = PrefixIndex()
+        other_process.load()
+        self.assertEqual(other_process.complete('дог')[0]['category'], 'law')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            law.code = 'legal'
+            law.save()
+        self.assertTrue(other_process.catch_up())
+        self.assertEqual(other_process.complete('дог')[0]['category'], 'legal')
+        self.assertEqual(get_prefix_index().complete('дог')[0]['category'], 'legal')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            law.delete()
+        self.assertTrue(other_process.catch_up())
+        self.assertEqual(other_process.complete('дог')[0]['category'], '')
+
+
+class BulkTranslateTests(DictionaryTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.contract = self.make_word('договор', meaning='соглашение')
+        self.deleted = self.make_word('contract', language='en', is_deleted=True)
+        self.staff = CustomUser.objects.create_superuser('staff', 'staff@example.com', 'password')
+
+    def test_deleted_word_is_not_a_translation_target(self):
+        result = bulk_translate([(self.contract.id, 'en', 'contract'), (self.contract.id, 'tr', 'sözleşme')])
+        self.assertEqual((result.words_created, result.translations_created, result.skipped), (1, 1, 1))
+        self.assertEqual(
+            list(Translation.objects.values_list('to_word__word', flat=True)), ['sözleşme'],
+        )
+
+    def messages_after(self, translations):
+        self.client.force_login(self.staff)
+        response = self.client.post(reverse('dictionary:bulk_multi_translate'), {
+            'word_ids': [self.contract.id],
+            'target_languages': list({key.split('_')[1] for key in translations}),
+            'translations_data': json.dumps(translations),
+        }, follow=True)
+        return [str(message) for message in response.context['messages']]
+
+    def test_messages_keep_original_wording(self):
+        key = f'{self.contract.id}_kk'
+        self.assertEqual(self.messages_after({key: 'шарт'}), ['Создано 1 новых переводов'])
+        self.assertEqual(self.messages_after({key: 'шарт'}), ['Обновлено 1 переводов'])
+        self.assertEqual(
+            self.messages_after({key: 'шарт', f'{self.contract.id}_tr': 'sözleşme'}),
+            ['Создано 1 новых слов и обновлено 1 переводов'],
+        )
+
+
+class ExportTests(DictionaryTestCase):
+
+    def setUp(self):
+        super().setUp()
+        law = Category.objects.create(code='law')
+        self.contract = self.make_word('договор', meaning='соглашение & обязательство', category=law)
+        self.contract.tags.add(Tag.objects.create(code='noun'))
+        Example.objects.create(word=self.contract, text='Договор подписан')
+        Translation.objects.create(from_word=self.contract, to_word=self.make_word('contract', language='en'))
+        Translation.objects.create(from_word=self.contract, to_word=self.make_word('pact', language='en', is_deleted=True))
+        self.lawsuit = self.make_word('иск')
+        self.make_word('истец', status='pending')
+        Word.objects.filter(pk=self.lawsuit.pk).update(
+            updated_at=datetime.datetime(2024, 1, 10, 12, tzinfo=datetime.timezone.utc),
+        )
+        Word.objects.exclude(pk=self.lawsuit.pk).update(
+            updated_at=datetime.datetime(2024, 3, 1, tzinfo=datetime.timezone.utc),
+        )
+
+    def export(self, file_format, *args):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, f'dictionary.{file_format}')
+        call_command('export_terms', '--format', file_format, '--output', path, *args)
+        with open(path, encoding='utf-8') as output:
+            return output.read()
+
+    def test_ndjson_view_filters_by_updated_at(self):
+        self.client.force_login(CustomUser.objects.create_superuser('staff', 'staff@example.com', 'password'))
+        url = reverse('dictionary:export_dictionary')
+        response = self.client.get(url, {'updated_from': '2024-02-01', 'language': 'ru'})
+        entries = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(entries, [{
+            'id': self.contract.id, 'language': 'ru', 'word': 'договор', 'meaning': 'соглашение & обязательство',
+            'pronunciation': self.contract.pronunciation, 'category': 'law', 'status': 'approved',
+            'difficulty': self.contract.difficulty, 'tags': ['noun'], 'examples': ['Договор подписан'],
+            'translations': [{'language': 'en', 'word': 'contract'}], 'updated_at': '2024-03-01T00:00:00+00:00',
+        }])
+        # Дата без времени в updated_to — конец дня
+        response = self.client.get(url, {'updated_to': '2024-01-10'})
+        self.assertEqual([json.loads(line)['word'] for line in response.streaming_content], ['иск'])
+        self.assertEqual(self.client.get(url, {'updated_from': 'вчера'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'format': 'xlsx'}).status_code, 400)
+
+    def test_csv_and_tbx_from_command(self):
+        rows = self.export('csv', '--language', 'ru', '--updated-to', '2024-03-01').splitlines()
+        self.assertEqual(rows[0], ','.join(exporting.CSV_COLUMNS))
+        self.assertEqual(len(rows), 3)
+        self.assertTrue(rows[1].startswith(f'{self.contract.id},ru,договор,соглашение & обязательство,'))
+        self.assertIn(',noun,Договор подписан,en:contract,', rows[1])
+
+        tbx = self.export('tbx', '--updated-from', '2024-02-01T00:00:00Z', '--category', 'law')
+        self.assertEqual(tbx.count('<conceptEntry '), 1)
+        self.assertIn('<descrip type="definition">соглашение &amp; обязательство</descrip>', tbx)
+        self.assertIn('<langSec xml:lang="en"><termSec><term>contract</term></termSec></langSec>', tbx)
+        self.assertNotIn('pact', tbx)
+        with self.assertRaises(CommandError):
+            self.export('csv', '--updated-from', '2024-13-01')
+
+    def test_queries_grow_with_chunks_not_words(self):
+        words = exporting.export_queryset()
+        with self.assertNumQueries(1 + 3 * 2):
+            entries = list(exporting.iter_entries(words, chunk_size=2))
+        self.assertEqual([entry['word'] for entry in entries], ['договор', 'contract', 'иск'])
+
+
+class TranslationGraphTests(DictionaryTestCase):
+    # Языки узлов: 1 — kk, 2 — ru, 3 — tr, 4 — en
+    WORD_LANGUAGES = {10: 1, 20: 2, 21: 2, 30: 3, 40: 4}
+
+    def graph(self):
+        return TranslationGraph.from_edges([(10, 20), (20, 30), (30, 40), (10, 21)], self.WORD_LANGUAGES)
+
+    def test_lookup_finds_shortest_paths_within_hops(self):
+        graph = self.graph()
+        self.assertEqual(graph.lookup(10, 3), [Path(30, 2, [10, 20, 30])])
+        self.assertEqual(graph.lookup(10, 4), [Path(40, 3, [10, 20, 30, 40])])
+        self.assertEqual(graph.lookup(10, 4, max_hops=2), [])
+        self.assertEqual([path.word_id for path in graph.lookup(10)], [20, 21, 30, 40])
+        self.assertEqual(len(graph.lookup(10, limit=1)), 1)
+        # Рёбра направленные, неизвестное слово — пустой результат
+        self.assertEqual(graph.lookup(30, 1), [])
+        self.assertEqual(graph.lookup(999, 1), [])
+
+    def test_delta_is_merged_by_compaction(self):
+        graph = self.graph()
+        graph.remove_edge(20, 30, publish=False)
+        graph.add_edge(21, 2, 40, 4, publish=False)
+        graph.add_edge(40, 4, 50, 3, publish=False)
+        self.assertEqual(graph.lookup(10, 4), [Path(40, 2, [10, 21, 40])])
+        self.assertEqual(graph.lookup(10, 3), [Path(50, 3, [10, 21, 40, 50])])
+        self.assertEqual(graph.edge_count, 5)
+
+        graph.compact()
+        self.assertEqual((graph._added, graph._removed, graph._delta_size), ({}, set(), 0))
+        self.assertEqual(graph.edge_count, 5)
+        self.assertEqual(graph.lookup(10, 4), [Path(40, 2, [10, 21, 40])])
+        self.assertEqual(graph.lookup(10, 3), [Path(50, 3, [10, 21, 40, 50])])
+
+    def test_large_delta_is_compacted_automatically(self):
+        graph = self.graph()
+        with mock.patch('dictionary.graph.COMPACT_MIN', 2):
+            graph.add_edge(21, 2, 30, 3, publish=False)
+            graph.add_edge(21, 2, 40, 4, publish=False)
+            self.assertEqual(graph._delta_size, 2)
+            graph.add_edge(30, 3, 10, 1, publish=False)
+        self.assertEqual(graph._delta_size, 0)
+        self.assertEqual(graph.edge_count, 7)
+        self.assertEqual(graph.lookup(30, 1), [Path(10, 1, [30, 10])])
+
+    def test_changes_reach_other_processes(self):
+        kk, ru = self.make_word('шарт', language='kk'), self.make_word('договор')
+        tr = self.make_word('sözleşme', language='tr')
+        Translation.objects.create(from_word=kk, to_word=ru)
+        other_process = TranslationGraph()
+        other_process.load()
+        self.assertEqual(other_process.lookup(kk.id, self.languages['tr'].id), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Translation.objects.create(from_word=ru, to_word=tr)
+        self.assertTrue(other_process.catch_up())
+        self.assertEqual(other_process.lookup(kk.id, self.languages['tr'].id), [Path(tr.id, 2, [kk.id, ru.id, tr.id])])
+
+
+class AutoFillTests(DictionaryTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.shart = self.make_word('шарт', language='kk')
+        contract = self.make_word('договор')
+        sozlesme = self.make_word('sözleşme', language='tr')
+        Translation.objects.create(from_word=self.shart, to_word=contract)
+        Translation.objects.create(from_word=contract, to_word=sozlesme)
+        Translation.objects.create(from_word=sozlesme, to_word=self.make_word('agreement', language='en'))
+        self.avukat = self.make_word('avukat', language='tr')
+        self.make_word('avulsion', language='en')
+
+    def test_batch_marks_source_of_each_suggestion(self):
+        result = auto_fill([str(self.shart.id), str(self.avukat.id), '999999'], ['ru', 'tr', 'en'])
+        self.assertEqual(result, {
+            f'{self.shart.id}_ru': 'договор',
+            f'{self.shart.id}_tr': '[VIA ru] sözleşme',
+            f'{self.shart.id}_en': '[VIA ru→tr] agreement',
+            f'{self.avukat.id}_ru': '[AUTO] avukat (ru)',
+            f'{self.avukat.id}_tr': '[SIMILAR] avukat',
+            f'{self.avukat.id}_en': '[SIMILAR] avulsion',
+        })
+
+    def test_deleted_word_on_path_is_not_suggested(self):
+        Word.objects.filter(word='sözleşme').update(is_deleted=True)
+        result = auto_fill([self.shart.id], ['en'])
+        self.assertEqual(result, {f'{self.shart.id}_en': '[AUTO] шарт (en)'})
+
+
+def run_in_threads(count, target):
+    """Запустить ``target(номер)`` в ``count`` потоках одновременно (у каждого потока свой экземпляр кэша)."""
+    barrier = threading.Barrier(count)
+
+    def run(number):
+        barrier.wait()
+        target(number)
+
+    threads = [threading.Thread(target=run, args=(number,)) for number in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+class SharedCacheConcurrencyTests(TestCase):
+    """``add``/``incr`` файлового кэша, ``ChangeFeed`` и single-flight под конкуренцией."""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        file_cache = {'default': {'BACKEND': 'dictionary.caching.FileBasedCache', 'LOCATION': directory}}
+        settings_override = override_settings(CACHES=file_cache, METRICS_DIR=None)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_add_and_incr_are_atomic(self):
+        caches['default'].set('counter', 0)
+        added = []
+
+        def work(number):
+            shared = caches['default']
+            for _ in range(30):
+                shared.incr('counter')
+            added.append(shared.add('lock', number))
+
+        run_in_threads(8, work)
+        self.assertEqual(caches['default'].get('counter'), 240)
+        self.assertEqual(added.count(True), 1)
+
+    def test_concurrent_publishes_are_all_delivered(self):
+        feed = caching.ChangeFeed('concurrency-test')
+        start = feed.current()
+        run_in_threads(8, lambda number: [feed.publish([(number, step)]) for step in range(10)])
+        current, changes = feed.since(start)
+        self.assertEqual(current, start + 80)
+        self.assertEqual(sorted(changes), [(number, step) for number in range(8) for step in range(10)])
+
+    def test_lost_generation_forces_reload(self):
+        feed = caching.ChangeFeed('lost-generation-test')
+        feed.publish(['a'])
+        seen = feed.current()
+        # Второй процесс получает тот же номер поколения (неатомарный incr другого бэкенда)
+        next_generation, duplicated = feed._next, []
+
+        def duplicate_once():
+            if not duplicated:
+                duplicated.append(True)
+                return feed.current()
+            return next_generation()
+
+        with mock.patch.object(feed, '_next', duplicate_once):
+            feed.publish(['b'])
+        self.assertEqual(feed.since(seen - 1), (seen + 1, None))
+        self.assertEqual(feed.since(seen), (seen + 1, None))
+
+        # Истёкшая запись тоже означает полную перезагрузку, а не пропуск изменений
+        feed.publish(['c'])
+        feed.publish(['d'])
+        caches['default'].delete(feed._entry_key(seen + 2))
+        self.assertEqual(feed.since(seen + 1), (seen + 3, None))
+        self.assertEqual(feed.since(seen + 2), (seen + 3, ['d']))
+        # Счётчик вытеснен: отставший процесс тоже перезагружается
+        caches['default'].delete(feed.generation_key)
+        self.assertEqual(feed.since(seen + 3)[1], None)
+
+    def test_single_flight_loads_once_across_processes(self):
+        processes = [caching.TieredCache() for _ in range(2)]
+        loads, results = [], []
+
+        def loader():
+            loads.append(True)
+            time.sleep(0.2)
+            return 'value'
+
+        run_in_threads(6, lambda number: results.append(
+            processes[number % 2].get_or_load('single-flight-test', loader, tags=['single-flight'])
+        ))
+        self.assertEqual(results, ['value'] * 6)
+        self.assertEqual(len(loads), 1)
+
+
+class SQLiteTests(DictionaryTestCase):
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.directory = directory
+
+    def test_pragmas_on_new_file_connection(self):
+        settings_dict = dict(connection.settings_dict, NAME=os.path.join(self.directory, 'pragmas.sqlite3'))
+        file_connection = type(connections['default'])(settings_dict, alias='pragmas')
+        self.addCleanup(file_connection.close)
+        with override_settings(SQLITE_PRAGMAS={'busy_timeout': 5000, 'mmap_size': None}):
+            with file_connection.cursor() as cursor:
+                values = {}
+                for name in ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size'):
+                    cursor.execute(f'PRAGMA {name}')
+                    values[name] = cursor.fetchone()[0]
+        # synchronous=normal — 1; mmap_size отменён и остался по умолчанию
+        self.assertEqual(values, {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000, 'mmap_size': 0})
+
+    @skipIf(sqlite.fcntl is None, 'очередь между процессами работает через fcntl.flock')
+    def test_serialized_writes_queue_and_roll_back(self):
+        lock_path = os.path.join(self.directory, 'write-lock')
+        file_database = mock.patch.object(sqlite, '_is_file_database', lambda connection: True)
+        events = []
+
+        def write(number):
+            with sqlite.write_lock():
+                events.append(('start', number))
+                time.sleep(0.05)
+                events.append(('end', number))
+
+        with override_settings(SQLITE_WRITE_LOCK_PATH=lock_path), file_database:
+            run_in_threads(4, write)
+            # Внутри очереди записи не пересекаются: за каждым началом сразу его конец
+            self.assertEqual([event for event, _ in events], ['start', 'end'] * 4)
+            self.assertEqual([number for _, number in events[::2]], [number for _, number in events[1::2]])
+
+            with self.assertRaises(RuntimeError), sqlite.serialized_writes():
+                self.make_word('договор')
+                raise RuntimeError
+            self.assertFalse(Word.objects.filter(word='договор').exists())
+            # Блокировка снята и после ошибки
+            with open(lock_path) as lock_file:
+                sqlite.fcntl.flock(lock_file, sqlite.fcntl.LOCK_EX | sqlite.fcntl.LOCK_NB)
+
+
+class GeneratorTests(DictionaryTestCase):
+
+    def generate(self, **options):
+        progress = []
+        totals = generator.generate(
+            5, fanout=2, categories=2, tags=3, batch_size=2, seed=7, on_progress=progress.append, **options,
+        )
+        return totals, progress
+
+    def test_concepts_are_linked_and_indexed(self):
+        totals, progress = self.generate()
+        self.assertEqual(totals, {'words': 20, 'translations': 40, 'examples': 20})
+        self.assertEqual(progress, [2, 4, 5])
+        self.assertEqual(Language.objects.count(), 4)
+
+        for word in Word.objects.prefetch_related('from_translations__to_word', 'tags'):
+            targets = [translation.to_word for translation in word.from_translations.all()]
+            self.assertEqual(len({target.language_id for target in targets} - {word.language_id}), 2)
+            self.assertEqual({target.category_id for target in targets}, {word.category_id})
+            self.assertEqual(len(word.tags.all()), 2)
+            self.assertEqual(word.search_key, normalize_word(word.word, word.language.code))
+        for language in self.languages.values():
+            texts = list(Word.objects.filter(language=language).values_list('word', flat=True))
+            self.assertEqual(len(texts), len(set(texts)))
+
+        # Индексы обновлены сигналами, как при импорте
+        word = Word.objects.filter(language__code='kk').order_by('id').first()
+        self.assertIn(word, search.search_words(Word.objects.all(), word.word.split()[0]))
+        self.assertTrue(word.trigrams.exists())
+        self.assertEqual(len(get_translation_graph().lookup(word.id, limit=3)), 3)
+
+    def test_same_seed_gives_same_data_after_clear(self):
+        self.generate()
+        first = list(Word.objects.order_by('id').values_list('word', 'meaning'))
+        self.assertEqual(generator.clear(), 20)
+        self.assertFalse(Word.objects.exists())
+        self.assertFalse(Category.objects.exists() or Tag.objects.exists())
+
+        self.generate()
+        self.assertEqual(list(Word.objects.order_by('id').values_list('word', 'meaning')), first)
@@ -0,0 +1,133 @@
+"""Кэш переведённых названий категорий и тегов.
+
+Для каждого кода языка хранятся словари ``{category_id: name}`` и
+``{tag_id: name}`` (и описания категорий). Весь кэш загружается двумя
+запросами — по одному на модель переводов — и живёт в памяти процесса.
+
+Изменения ``CategoryTranslation`` и ``TagTranslation`` сбрасывают кэш через
+сигналы (см. ``dictionary.signals``) — меняют версию тега ``names`` в
+``dictionary.caching``. Другие процессы сверяют версию не чаще раза в
+``CACHE_LOCAL_CHECK_INTERVAL`` секунд, а не при каждом вызове фильтра.
+Сами словари в общий кэш не кладутся: шаблонные фильтры обращаются к ним
+десятки раз на страницу, и разбирать их из кэша каждый раз было бы дороже.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+from . import caching
+
+CATEGORY = 'category'
+TAG = 'tag'
+
+# То, что возвращают шаблонные фильтры вместо объекта перевода
+TranslatedName = namedtuple('TranslatedName', 'name description')
+
+
+class TranslationNameCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._names = None
+        self._descriptions = None
+        self._version = None
+        self._checked_at = 0
+
+    def _load(self):
+        from .models import CategoryTranslation, TagTranslation
+
+        names = {CATEGORY: {}, TAG: {}}
+        descriptions = {}
+        rows = CategoryTranslation.objects.values_list('language__code', 'category_id', 'name', 'description')
+        for code, category_id, name, description in rows:
+            names[CATEGORY].setdefault(code, {})[category_id] = name
+            descriptions.setdefault(code, {})[category_id] = description
+        for code, tag_id, name in TagTranslation.objects.values_list('language__code', 'tag_id', 'name'):
+            names[TAG].setdefault(code, {})[tag_id] = name
+        return names, descriptions
+
+    def _current(self):
+        now = time.monotonic()
+        interval = getattr(settings, 'CACHE_LOCAL_CHECK_INTERVAL', 1.0)
+        with self._lock:
+            if self._names is not None and now - self._checked_at < interval:
+                return self._names, self._descriptions
+        version = caching.tag_versions(caching.NAMES_TAG)
+        with self._lock:
+            if self._names is None or version != self._version:
+                self._names, self._descriptions = self._load()
+                self._version = version
+            self._checked_at = now
+            return self._names, self._descriptions
+
+    def invalidate(self):
+        """Сбросить кэш во всех процессах."""
+        with self._lock:
+            self._names = None
+        caching.invalidate_tags(caching.NAMES_TAG)
+
+    def names(self, kind, language_code):
+        """``{id: name}`` для ``kind`` (``'category'`` или ``'tag'``) на языке."""
+        names, _ = self._current()
+        return names[kind].get(language_code, {})
+
+    def description(self, category_id, language_code):
+        _, descriptions = self._current()
+        return descriptions.get(language_code, {}).get(category_id)
+
+    def translated_languages(self, kind):
+        """``{id: {коды языков}}`` — на какие языки переведён каждый объект."""
+        names, _ = self._current()
+        result = {}
+        for code, by_id in names[kind].items():
+            for object_id in by_id:
+                result.setdefault(object_id, set()).add(code)
+        return result
+
+    def languages_of(self, kind, object_id):
+        """Коды языков, на которые переведён объект."""
+        names, _ = self._current()
+        return {code for code, by_id in names[kind].items() if object_id in by_id}
+
+
+translation_names = TranslationNameCache()
+
+
+def kind_of(obj):
+    """Вид объекта для кэша или None, если объект не категория и не тег."""
+    from .models import Category, Tag
+
+    if isinstance(obj, Category):
+        return CATEGORY
+    if isinstance(obj, Tag):
+        return TAG
+    return None
+
+
+def category_names(language_code):
+    return translation_names.names(CATEGORY, language_code)
+
+
+def tag_names(language_code):
+    return translation_names.names(TAG, language_code)
+
+
+def translated_name(obj, language_code):
+    """Название категории или тега на языке; если перевода нет — код."""
+    kind = kind_of(obj)
+    if kind is None:
+        return str(obj)
+    return translation_names.names(kind, language_code).get(obj.id, obj.code)
+
+
+def get_translated(obj, language_code):
+    """``TranslatedName`` для объекта на языке или None, если перевода нет."""
+    kind = kind_of(obj)
+    if kind is None:
+        return None
+    name = translation_names.names(kind, language_code).get(obj.id)
+    if name is None:
+        return None
+    description = translation_names.description(obj.id, language_code) if kind == CATEGORY else ''
+    return TranslatedName(name, description or '')
@@ -24,6 +24,7 @@ urlpatterns = [
     path('translations/add-missing/', views.add_missing_translations, name='add_missing_translations'),
     path('translations/bulk-add/', views.bulk_add_missing_translations, name='bulk_add_missing_translations'),
     path('translations/progress/', views.translation_progress, name='translation_progress'),
+    path('translations/coverage.json', views.translation_coverage_json, name='translation_coverage_json'),
     
     # Управление переводами слов
     path('word-translations/', views.word_translations_dashboard, name='word_translations_dashboard'),
@@ -41,5 +42,18 @@ urlpatterns = [
     path('quick-translate/', views.quick_translate, name='quick_translate'),
     path('quick-translate/<int:term_id>/', views.quick_translate_detail, name='quick_translate_detail'),
     path('auto-fill-translations/', views.auto_fill_translations, name='auto_fill_translations'),
+    
+    # Выгрузка словаря
+    path('export/', views.export_dictionary, name='export_dictionary'),
+    
+    # Дельта-синхронизация для мобильных клиентов
+    path('sync/', views.sync_changes, name='sync_changes'),
+    
+    # Метрики для Prometheus
+    path('metrics', views.prometheus_metrics, name='metrics'),
+    
+    # Профили медленных запросов
+    path('profiles/', views.profiles, name='profiles'),
+    path('profiles/<str:name>', views.profile_file, name='profile_file'),
 ] 
 
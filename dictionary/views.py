@@ -1,28 +1,36 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
-from django.http import JsonResponse
-from django.views.decorators.http import require_http_methods
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_http_methods
 from django.contrib import messages
 from django.db import transaction
-from django.db.models import Q, Count
-from django.core.paginator import Paginator
+from django.db.models import Prefetch, Q, Count
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
-from .models import Category, CategoryTranslation, Tag, TagTranslation, Language, InterfaceTranslation, Word, Translation, CustomUser
+from .models import Category, CategoryTranslation, Tag, TagTranslation, Language, InterfaceTranslation, Word, Translation, Example, CustomUser
 from .forms import CustomUserCreationForm, WordForm, WordTranslationForm
+from .search import search_filter, search_words, taxonomy_filter
+from .autocomplete import get_prefix_index
+from .fuzzy import fuzzy_search
+from .normalization import search_key_filter
+from .pagination import CappedCount, KeysetPaginator, capped_count
+from .autofill import auto_fill
+from .bulk import bulk_translate
+from .graph import get_translation_graph, shortest_paths
+from .snapshot import open_snapshot
+from . import caching, conditional, coverage, exporting, facets, metrics, profiling, static_pages, sync
+from .sqlite import serialized_writes
+from .translation_names import CATEGORY, TAG, translation_names
 import json
 
-def home(request):
-    """Главная страница с поиском слов"""
-    # Получить параметры поиска
-    query = request.GET.get('q', '').strip()
-    language_code = request.GET.get('lang', '')
-    category_id = request.GET.get('category', '')
-    page = request.GET.get('page', 1)
-    
+@caching.cached('home', tags=[caching.WORDS_TAG, caching.TAXONOMY_TAG])
+def search_page(query, language_code, category_id, tag_id, cursor):
+    """Страница результатов поиска на главной и подсказки «возможно, вы искали»."""
     # Базовый queryset - только одобренные и не удалённые слова
-    words = Word.objects.filter(status='approved', is_deleted=False)
+    words = Word.objects.filter(status='approved', is_deleted=False).select_related('language', 'category')
     
     # Фильтр по языку
     if language_code:
@@ -32,88 +40,219 @@ def home(request):
     if category_id:
         words = words.filter(category_id=category_id)
     
-    # Поиск по запросу
+    # Фильтр по тегу
+    if tag_id:
+        words = words.filter(tags__id=tag_id)
+    
+    # Поиск по запросу (полнотекстовый индекс). Страницы идут по (word, id), а не по
+    # релевантности: ранг FTS5 считается подзапросом на каждую строку, и сравнивать
+    # с курсором пришлось бы дробные значения
     if query:
-        # Поиск по слову и значению на всех языках
-        search_query = Q(word__icontains=query) | Q(meaning__icontains=query)
-        words = words.filter(search_query)
+        words = words.filter(search_filter(query))
+    
+    # Пагинация по курсору (без COUNT и OFFSET)
+    paginator = KeysetPaginator(words, ['word', 'id'], 20)  # 20 слов на страницу
+    words_page = paginator.get_page(cursor)
     
-    # Сортировка
-    words = words.order_by('word')
+    # Ничего не нашлось — предлагаем похожие слова (возможна опечатка)
+    did_you_mean = []
+    if query and not words_page.object_list:
+        did_you_mean = fuzzy_search(query, language=language_code or None, limit=5)
     
-    # Пагинация
-    paginator = Paginator(words, 20)  # 20 слов на страницу
-    words_page = paginator.get_page(page)
+    return words_page, did_you_mean
+
+def home(request):
+    """Главная страница с поиском слов"""
+    # Получить параметры поиска
+    query = request.GET.get('q', '').strip()
+    language_code = request.GET.get('lang', '')
+    category_id = request.GET.get('category', '')
+    tag_id = request.GET.get('tag', '')
+    cursor = request.GET.get('cursor', '')
+    
+    # Страница результатов и подсказки (кэш сбрасывается при изменении слов)
+    words_page, did_you_mean = search_page(query, language_code, category_id, tag_id, cursor)
+    
+    # Счётчики слов по языкам, категориям и тегам (один запрос, кэшируется)
+    counts = facets.get_counts(query, language_code, category_id, tag_id)
+    if query:
+        metrics.SEARCH_RESULTS.observe(sum(counts['language'].values()), source='home')
     
     # Получить данные для фильтров
     languages = Language.objects.all().order_by('code')
+    for language in languages:
+        language.word_count = counts['language'].get(language.id, 0)
     categories = Category.objects.all().order_by('code')
+    tags = Tag.objects.all().order_by('code')
     
-    # Получить переводы названий категорий
+    # Получить переводы названий категорий и тегов
     user_language = request.session.get('language', 'ru')
-    categories_with_translations = []
-    for category in categories:
-        try:
-            translation = CategoryTranslation.objects.get(
-                category=category, 
-                language__code=user_language
-            )
-            categories_with_translations.append({
-                'category': category,
-                'name': translation.name
-            })
-        except CategoryTranslation.DoesNotExist:
-            categories_with_translations.append({
-                'category': category,
-                'name': category.code
-            })
+    category_names = translation_names.names(CATEGORY, user_language)
+    tag_names = translation_names.names(TAG, user_language)
+    categories_with_translations = [
+        {
+            'category': category,
+            'name': category_names.get(category.id, category.code),
+            'count': counts['category'].get(category.id, 0),
+        }
+        for category in categories
+    ]
+    tags_with_translations = [
+        {
+            'tag': tag,
+            'name': tag_names.get(tag.id, tag.code),
+            'count': counts['tag'].get(tag.id, 0),
+        }
+        for tag in tags
+    ]
     
     context = {
         'words': words_page,
         'languages': languages,
         'categories': categories_with_translations,
+        'tags': tags_with_translations,
         'current_query': query,
         'current_language': language_code,
         'current_category': category_id,
+        'current_tag': tag_id,
         'user_language': user_language,
+        'did_you_mean': did_you_mean,
     }
     
     return render(request, 'dictionary/home.html', context)
 
-def word_detail(request, word_id):
-    """Детальная страница слова с переводами"""
-    word = get_object_or_404(Word, id=word_id, status='approved', is_deleted=False)
+def _word_detail_tags(data, word_id):
+    """Страница слова показывает и слова переводов: их изменения тоже её сбрасывают."""
+    tags = [caching.word_tag(word_id), caching.TAXONOMY_TAG]
+    if data is not None:
+        tags.extend(caching.word_tag(translation.to_word_id) for translation in data['translations'])
+        for item in data['via_translations']:
+            tags.extend(caching.word_tag(word.id) for word in [item['word'], *item['via']])
+    return tags
+
+@caching.cached('word_detail', tags=_word_detail_tags)
+def word_detail_data(word_id):
+    """Слово, переводы, примеры и теги для страницы слова; ``None``, если слово не показывается."""
+    word = (
+        Word.objects.filter(id=word_id, status='approved', is_deleted=False)
+        .select_related('language', 'category', 'created_by')
+        .first()
+    )
+    if word is None:
+        return None
     
     # Получить все переводы слова
-    translations = word.from_translations.all().select_related('to_word', 'to_word__language')
+    translations = list(word.from_translations.all().select_related('to_word', 'to_word__language'))
+    
+    # Переводы через промежуточные языки (kk→ru→tr) на те языки, куда нет прямого
+    direct_languages = {translation.to_word.language_id for translation in translations}
+    direct_languages.add(word.language_id)
+    via_paths = [path for path in get_translation_graph().lookup(word.id) if path.hops > 1]
+    path_words = Word.objects.filter(
+        id__in={word_id for path in via_paths for word_id in path.path[1:]},
+        status='approved',
+        is_deleted=False,
+    ).select_related('language').in_bulk()
+    via_translations = []
+    for path in via_paths:
+        target = path_words.get(path.word_id)
+        via = [path_words.get(word_id) for word_id in path.path[1:-1]]
+        if target is None or None in via or target.language_id in direct_languages:
+            continue
+        via_translations.append({'word': target, 'via': via})
+    
+    return {
+        'word': word,
+        'translations': translations,
+        'via_translations': via_translations,
+        'examples': list(word.examples.select_related('author')),
+        'tags': list(word.tags.all()),
+    }
+
+@cache_control(no_cache=True)
+@condition(etag_func=conditional.word_etag, last_modified_func=conditional.word_last_modified)
+def word_detail(request, word_id):
+    """Детальная страница слова с переводами"""
+    with open_snapshot() as snapshot:
+        if snapshot is not None:
+            return word_detail_from_snapshot(request, snapshot, word_id)
     
-    # Получить примеры
-    examples = word.examples.all()
+    data = word_detail_data(word_id)
+    if data is None:
+        raise Http404('Слово не найдено')
     
-    # Получить теги с переводами
+    # Получить теги с переводами (названия кэшируются отдельно)
     user_language = request.session.get('language', 'ru')
-    tags_with_translations = []
-    for tag in word.tags.all():
-        try:
-            translation = TagTranslation.objects.get(
-                tag=tag, 
-                language__code=user_language
-            )
-            tags_with_translations.append({
-                'tag': tag,
-                'name': translation.name
-            })
-        except TagTranslation.DoesNotExist:
-            tags_with_translations.append({
-                'tag': tag,
-                'name': tag.code
+    tag_names = translation_names.names(TAG, user_language)
+    tags_with_translations = [
+        {'tag': tag, 'name': tag_names.get(tag.id, tag.code)}
+        for tag in data['tags']
+    ]
+    
+    context = {
+        'word': data['word'],
+        'translations': data['translations'],
+        'via_translations': data['via_translations'],
+        'examples': data['examples'],
+        'tags': tags_with_translations,
+        'user_language': user_language,
+    }
+    
+    return render(request, 'dictionary/word_detail.html', context)
+
+def word_detail_from_snapshot(request, snapshot, word_id):
+    """Детальная страница слова из двоичного снимка, без запросов к БД.
+
+    Шаблон получает несохранённые экземпляры моделей, собранные из записей снимка."""
+    entry = snapshot.get(word_id)
+    if entry is None:
+        raise Http404('Слово не найдено')
+    
+    languages = {}
+    
+    def as_word(entry):
+        language = languages.get(entry.language)
+        if language is None:
+            language = languages[entry.language] = Language(code=entry.language, name=snapshot.language_name(entry.language))
+        word = Word(id=entry.id, word=entry.word, meaning=entry.meaning, pronunciation=entry.pronunciation,
+                    difficulty=entry.difficulty, status='approved', language=language)
+        word.category = Category(code=entry.category) if entry.category else None
+        return word
+    
+    word = as_word(entry)
+    translations = [
+        Translation(to_word=as_word(item.word), note=item.note, order=item.order)
+        for item in snapshot.translations(entry.id)
+    ]
+    
+    # Переводы через промежуточные языки — тот же обход, что в графе переводов
+    direct_languages = {item.to_word.language.code for item in translations} | {entry.language}
+    entries = {entry.id: entry}
+    
+    def neighbours(word_id):
+        targets = [item.word for item in snapshot.translations(word_id)]
+        entries.update((target.id, target) for target in targets)
+        return [target.id for target in targets]
+    
+    via_translations = []
+    for path in shortest_paths(entry.id, neighbours, lambda word_id: entries[word_id].language):
+        target = entries[path.word_id]
+        if path.hops > 1 and target.language not in direct_languages:
+            via_translations.append({
+                'word': as_word(target),
+                'via': [as_word(entries[word_id]) for word_id in path.path[1:-1]],
             })
     
+    user_language = request.session.get('language', 'ru')
     context = {
         'word': word,
         'translations': translations,
-        'examples': examples,
-        'tags': tags_with_translations,
+        'via_translations': via_translations,
+        'examples': [Example(text=text) for text in entry.examples],
+        'tags': [
+            {'tag': Tag(code=code), 'name': snapshot.tag_name(code, user_language)}
+            for code in entry.tags
+        ],
         'user_language': user_language,
     }
     
@@ -165,59 +304,27 @@ def user_profile(request):
 @staff_member_required
 def translation_dashboard(request):
     """Дашборд для управления переводами"""
-    languages = Language.objects.all().order_by('code')
-    categories = Category.objects.all().order_by('code')
-    tags = Tag.objects.all().order_by('code')
+    matrix = coverage.get_matrix()
+    categories = matrix['categories']
+    tags = matrix['tags']
     
-    # Получаем статистику переводов
-    category_stats = {}
-    for category in categories:
-        translations = category.translations.all()
-        total_languages = languages.count()
-        translated_languages = translations.count()
-        category_stats[category.id] = {
-            'total': total_languages,
-            'translated': translated_languages,
-            'percentage': round((translated_languages / total_languages) * 100) if total_languages > 0 else 0
-        }
-    
-    tag_stats = {}
-    for tag in tags:
-        translations = tag.translations.all()
-        total_languages = languages.count()
-        translated_languages = translations.count()
-        tag_stats[tag.id] = {
-            'total': total_languages,
-            'translated': translated_languages,
-            'percentage': round((translated_languages / total_languages) * 100) if total_languages > 0 else 0
-        }
-    
-    # Общая статистика
-    total_categories = categories.count()
-    total_tags = tags.count()
-    total_languages = languages.count()
-    
-    # Категории с полными переводами
-    fully_translated_categories = sum(1 for stats in category_stats.values() if stats['percentage'] == 100)
-    fully_translated_tags = sum(1 for stats in tag_stats.values() if stats['percentage'] == 100)
-    
-    # Категории без переводов
-    untranslated_categories = sum(1 for stats in category_stats.values() if stats['percentage'] == 0)
-    untranslated_tags = sum(1 for stats in tag_stats.values() if stats['percentage'] == 0)
+    # Статистика переводов по каждой категории и тегу (строки матрицы покрытия)
+    category_stats = {row['id']: row for row in categories['items']}
+    tag_stats = {row['id']: row for row in tags['items']}
     
     context = {
-        'languages': languages,
-        'categories': categories,
-        'tags': tags,
+        'languages': matrix['languages'],
+        'categories': categories['items'],
+        'tags': tags['items'],
         'category_stats': category_stats,
         'tag_stats': tag_stats,
-        'total_categories': total_categories,
-        'total_tags': total_tags,
-        'total_languages': total_languages,
-        'fully_translated_categories': fully_translated_categories,
-        'fully_translated_tags': fully_translated_tags,
-        'untranslated_categories': untranslated_categories,
-        'untranslated_tags': untranslated_tags,
+        'total_categories': categories['total'],
+        'total_tags': tags['total'],
+        'total_languages': len(matrix['languages']),
+        'fully_translated_categories': categories['complete'],
+        'fully_translated_tags': tags['complete'],
+        'untranslated_categories': categories['empty'],
+        'untranslated_tags': tags['empty'],
     }
     return render(request, 'dictionary/translation_dashboard.html', context)
 
@@ -360,7 +467,7 @@ def add_missing_translations(request):
     if translation_type == 'category':
         category = get_object_or_404(Category, id=item_id)
         all_languages = Language.objects.all()
-        existing_languages = set(category.translations.values_list('language__code', flat=True))
+        existing_languages = translation_names.languages_of(CATEGORY, category.id)
         missing_languages = [lang for lang in all_languages if lang.code not in existing_languages]
         
         created_count = 0
@@ -382,7 +489,7 @@ def add_missing_translations(request):
     elif translation_type == 'tag':
         tag = get_object_or_404(Tag, id=item_id)
         all_languages = Language.objects.all()
-        existing_languages = set(tag.translations.values_list('language__code', flat=True))
+        existing_languages = translation_names.languages_of(TAG, tag.id)
         missing_languages = [lang for lang in all_languages if lang.code not in existing_languages]
         
         created_count = 0
@@ -411,36 +518,54 @@ def bulk_add_missing_translations(request):
         
         if translation_type == 'categories':
             categories = Category.objects.all()
-            all_languages = Language.objects.all()
+            all_languages = list(Language.objects.all())
+            translated = translation_names.translated_languages(CATEGORY)
             
-            for category in categories:
-                existing_languages = set(category.translations.values_list('language__code', flat=True))
-                missing_languages = [lang for lang in all_languages if lang.code not in existing_languages]
-                
-                for lang in missing_languages:
-                    CategoryTranslation.objects.create(
-                        category=category,
-                        language=lang,
-                        name=f"[{lang.code}] {category.code}",
-                        description=""
-                    )
-                    created_count += 1
+            new_translations = [
+                CategoryTranslation(
+                    category=category,
+                    language=lang,
+                    name=f"[{lang.code}] {category.code}",
+                    description=""
+                )
+                for category in categories
+                for lang in all_languages
+                if lang.code not in translated.get(category.id, ())
+            ]
+            with serialized_writes():
+                CategoryTranslation.objects.bulk_create(new_translations)
+            created_count = len(new_translations)
         
         elif translation_type == 'tags':
             tags = Tag.objects.all()
-            all_languages = Language.objects.all()
+            all_languages = list(Language.objects.all())
+            translated = translation_names.translated_languages(TAG)
             
-            for tag in tags:
-                existing_languages = set(tag.translations.values_list('language__code', flat=True))
-                missing_languages = [lang for lang in all_languages if lang.code not in existing_languages]
-                
-                for lang in missing_languages:
-                    TagTranslation.objects.create(
-                        tag=tag,
-                        language=lang,
-                        name=f"[{lang.code}] {tag.code}"
-                    )
-                    created_count += 1
+            new_translations = [
+                TagTranslation(
+                    tag=tag,
+                    language=lang,
+                    name=f"[{lang.code}] {tag.code}"
+                )
+                for tag in tags
+                for lang in all_languages
+                if lang.code not in translated.get(tag.id, ())
+            ]
+            with serialized_writes():
+                TagTranslation.objects.bulk_create(new_translations)
+            created_count = len(new_translations)
+        
+        # bulk_create не отправляет post_save, сбрасываем кэш названий (и покрытия) сами
+        if created_count:
+            translation_names.invalidate()
+            sync.record(
+                sync.CATEGORY_TRANSLATION if translation_type == 'categories' else sync.TAG_TRANSLATION,
+                [translation.id for translation in new_translations],
+            )
+            if translation_type == 'tags':
+                static_pages.invalidate(
+                    Word.tags.through.objects.filter(tag__in=tags).values_list('word_id', flat=True)
+                )
         
         messages.success(request, f'Создано {created_count} недостающих переводов')
         return redirect('dictionary:translation_dashboard')
@@ -450,38 +575,41 @@ def bulk_add_missing_translations(request):
 @staff_member_required
 def translation_progress(request):
     """Страница с прогрессом переводов"""
-    languages = Language.objects.all().order_by('code')
-    categories = Category.objects.all().order_by('code')
-    tags = Tag.objects.all().order_by('code')
-    
-    # Статистика по языкам
-    language_stats = {}
-    for language in languages:
-        category_translations = CategoryTranslation.objects.filter(language=language).count()
-        tag_translations = TagTranslation.objects.filter(language=language).count()
-        interface_translations = InterfaceTranslation.objects.filter(language=language).count()
-        
-        total_items = categories.count() + tags.count()
-        total_translations = category_translations + tag_translations
-        
-        language_stats[language.code] = {
-            'language': language,
-            'category_translations': category_translations,
-            'tag_translations': tag_translations,
-            'interface_translations': interface_translations,
-            'total_items': total_items,
-            'total_translations': total_translations,
-            'percentage': round((total_translations / total_items) * 100) if total_items > 0 else 0
-        }
+    matrix = coverage.get_matrix()
     
     context = {
-        'languages': languages,
-        'categories': categories,
-        'tags': tags,
-        'language_stats': language_stats,
+        'languages': matrix['languages'],
+        'categories': matrix['categories']['items'],
+        'tags': matrix['tags']['items'],
+        'total_categories': matrix['categories']['total'],
+        'total_tags': matrix['tags']['total'],
+        'language_stats': matrix['by_language'],
     }
     return render(request, 'dictionary/translation_progress.html', context)
 
+@require_http_methods(["GET"])
+def translation_coverage_json(request):
+    """Матрица покрытия переводами в JSON (для внешнего мониторинга)"""
+    return JsonResponse(coverage.get_matrix(), json_dumps_params={'ensure_ascii': False})
+
+def _translations_with_targets():
+    """Переводы слова вместе со словами и языками перевода — для ``prefetch_related``."""
+    return Prefetch('from_translations', queryset=Translation.objects.select_related('to_word__language'))
+
+@caching.cached('word_stats', ttl=60, tags=[caching.WORDS_TAG])
+def word_stats(approved_only):
+    """Число слов и слов с переводами (без фильтров) для шапок списков.
+
+    Полные ``COUNT`` по таблице слов кэшируются; сохранение перевода сбрасывает
+    только записи своих слов, поэтому число переведённых может отставать до минуты.
+    """
+    words = Word.objects.filter(is_deleted=False)
+    translated = Q(from_translations__isnull=False)
+    if approved_only:
+        words = words.filter(status='approved')
+        translated = Q(from_translations__status='approved')
+    return words.count(), words.filter(translated).distinct().count()
+
 @staff_member_required
 def word_translations_dashboard(request):
     """Дашборд для управления переводами слов"""
@@ -491,7 +619,7 @@ def word_translations_dashboard(request):
     target_language = request.GET.get('target_lang', '')
     category_id = request.GET.get('category', '')
     status = request.GET.get('status', '')
-    page = request.GET.get('page', 1)
+    cursor = request.GET.get('cursor', '')
     
     # Базовый queryset
     words = Word.objects.filter(is_deleted=False)
@@ -506,8 +634,7 @@ def word_translations_dashboard(request):
     
     # Поиск по запросу
     if query:
-        search_query = Q(word__icontains=query) | Q(meaning__icontains=query)
-        words = words.filter(search_query)
+        words = words.filter(search_filter(query))
     
     # Фильтр по статусу перевода
     if status == 'translated':
@@ -515,21 +642,25 @@ def word_translations_dashboard(request):
     elif status == 'untranslated':
         words = words.filter(from_translations__isnull=True)
     
-    # Сортировка
-    words = words.order_by('word')
-    
-    # Пагинация
-    paginator = Paginator(words, 20)
-    words_page = paginator.get_page(page)
+    # Пагинация по курсору; переводы строк страницы с их словами — одним запросом
+    paginator = KeysetPaginator(
+        words.select_related('language', 'category').prefetch_related(_translations_with_targets()),
+        ['word', 'id'], 20,
+    )
+    words_page = paginator.get_page(cursor)
     
     # Получить данные для фильтров
     languages = Language.objects.all().order_by('code')
     categories = Category.objects.all().order_by('code')
     
-    # Статистика
-    total_words = words.count()
-    translated_words = words.filter(from_translations__isnull=False).distinct().count()
-    untranslated_words = total_words - translated_words
+    # Статистика: без фильтров — из кэша, с фильтрами — не дальше COUNT_LIMIT строк
+    if source_language or category_id or query or status:
+        total_words = capped_count(words)
+        translated_words = capped_count(words.filter(from_translations__isnull=False).distinct())
+        untranslated_words = capped_count(words.filter(from_translations__isnull=True))
+    else:
+        total_words, translated_words = word_stats(False)
+        untranslated_words = total_words - translated_words
     
     context = {
         'words': words_page,
@@ -549,7 +680,10 @@ def word_translations_dashboard(request):
 @staff_member_required
 def word_translation_edit(request, word_id):
     """Редактирование переводов конкретного слова"""
-    word = get_object_or_404(Word, id=word_id, is_deleted=False)
+    word = get_object_or_404(
+        Word.objects.select_related('language', 'category').prefetch_related(_translations_with_targets()),
+        id=word_id, is_deleted=False,
+    )
     languages = Language.objects.all().order_by('code')
     
     if request.method == 'POST':
@@ -624,39 +758,15 @@ def bulk_word_translation(request):
         if word_ids and translations_data:
             try:
                 translations = json.loads(translations_data)
-                created_count = 0
+                items = [
+                    (word_id, translations[str(word_id)]['target_lang'], translations[str(word_id)]['translation'])
+                    for word_id in word_ids
+                    if str(word_id) in translations
+                ]
                 
-                with transaction.atomic():
-                    for word_id in word_ids:
-                        word = Word.objects.get(id=word_id)
-                        if str(word_id) in translations:
-                            target_lang_code = translations[str(word_id)]['target_lang']
-                            translation_text = translations[str(word_id)]['translation']
-                            
-                            if translation_text:
-                                target_language = Language.objects.get(code=target_lang_code)
-                                
-                                # Создаем или получаем слово на целевом языке
-                                target_word, created = Word.objects.get_or_create(
-                                    word=translation_text,
-                                    language=target_language,
-                                    category=word.category,
-                                    defaults={
-                                        'meaning': '',
-                                        'status': 'pending',
-                                        'is_deleted': False
-                                    }
-                                )
-                                
-                                # Создаем перевод
-                                translation, created = Translation.objects.get_or_create(
-                                    from_word=word,
-                                    to_word=target_word,
-                                    defaults={'status': 'pending', 'order': 1}
-                                )
-                                
-                                if created:
-                                    created_count += 1
+                with serialized_writes():
+                    result = bulk_translate(items)
+                created_count = result.translations_created
                 
                 messages.success(request, f'Создано {created_count} новых переводов')
             except Exception as e:
@@ -680,7 +790,7 @@ def bulk_word_translation(request):
             from_translations__to_word__language=target_lang
         )
     
-    words = words.order_by('word')[:50]  # Ограничиваем для производительности
+    words = words.select_related('language', 'category').order_by('word')[:50]  # Ограничиваем для производительности
     
     # Получить данные для фильтров
     languages = Language.objects.all().order_by('code')
@@ -696,53 +806,82 @@ def bulk_word_translation(request):
     }
     return render(request, 'dictionary/bulk_word_translation.html', context)
 
+@caching.cached('autocomplete', ttl=60, tags=[caching.WORDS_TAG, caching.TAXONOMY_TAG])
+def autocomplete_suggestions(query, source_lang, fuzzy=False):
+    """Подсказки автодополнения для ``translation_search``."""
+    if fuzzy:
+        return [
+            {
+                'id': word.id,
+                'word': word.word,
+                'meaning': word.meaning,
+                'language': word.language.code,
+                'category': word.category.code if word.category else '',
+            }
+            for word in fuzzy_search(query, language=source_lang or None, approved_only=False, limit=10)
+        ]
+    
+    # Префиксный индекс в памяти процесса, БД нужна только для значений
+    completions = get_prefix_index().complete(query, language=source_lang or None, limit=10)
+    meanings = dict(
+        Word.objects.filter(id__in=[item['id'] for item in completions]).values_list('id', 'meaning')
+    )
+    return [
+        {
+            'id': item['id'],
+            'word': item['word'],
+            'meaning': meanings.get(item['id'], ''),
+            'language': item['language'],
+            'category': item['category'],
+        }
+        for item in completions
+    ]
+
 @staff_member_required
+@condition(etag_func=conditional.search_etag)
 def translation_search(request):
     """Поиск переводов с автодополнением"""
     query = request.GET.get('q', '').strip()
     source_lang = request.GET.get('source_lang', '')
     target_lang = request.GET.get('target_lang', '')
+    fuzzy = request.GET.get('fuzzy') == '1'
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         # AJAX запрос для автодополнения
+        with open_snapshot() as snapshot:
+            if query and fuzzy:
+                # Нечёткий поиск с учётом опечаток
+                suggestions = autocomplete_suggestions(query, source_lang, fuzzy=True)
+            elif query and snapshot is not None:
+                # Снимок содержит и значения слов — БД не нужна
+                suggestions = snapshot.complete(query, language=source_lang or None, limit=10)
+            elif query:
+                suggestions = autocomplete_suggestions(query, source_lang)
+        
         if query:
-            words = Word.objects.filter(
-                word__icontains=query,
-                is_deleted=False
-            )
-            
-            if source_lang:
-                words = words.filter(language__code=source_lang)
-            
-            suggestions = []
-            for word in words[:10]:
-                suggestions.append({
-            'id': word.id,
-            'word': word.word,
-                    'meaning': word.meaning,
-            'language': word.language.code,
-                    'category': word.category.code if word.category else ''
-                })
-            
+            metrics.SEARCH_RESULTS.observe(len(suggestions), source='fuzzy' if fuzzy else 'autocomplete')
             return JsonResponse({'suggestions': suggestions})
     
     # Обычный поиск
-    words = Word.objects.filter(is_deleted=False)
-    
-    if query:
-        search_query = Q(word__icontains=query) | Q(meaning__icontains=query)
-        words = words.filter(search_query)
-    
-    if source_lang:
-        words = words.filter(language__code=source_lang)
-    
-    words = words.order_by('word')
+    if query and fuzzy:
+        words = fuzzy_search(query, language=source_lang or None, approved_only=False, limit=50)
+    else:
+        words = Word.objects.filter(is_deleted=False)
+        
+        if source_lang:
+            words = words.filter(language__code=source_lang)
+        
+        if query:
+            words = search_words(words, query)
+        else:
+            words = words.order_by('word')
     
     context = {
         'words': words,
         'query': query,
         'source_lang': source_lang,
         'target_lang': target_lang,
+        'fuzzy': fuzzy,
         'languages': Language.objects.all().order_by('code'),
     }
     return render(request, 'dictionary/translation_search.html', context)
@@ -750,7 +889,10 @@ def translation_search(request):
 @staff_member_required
 def multi_translate_word(request, word_id):
     """Мультиперевод одного слова на несколько языков одновременно"""
-    word = get_object_or_404(Word, id=word_id, is_deleted=False)
+    word = get_object_or_404(
+        Word.objects.select_related('language', 'category').prefetch_related(_translations_with_targets()),
+        id=word_id, is_deleted=False,
+    )
     languages = Language.objects.all().order_by('code')
     
     if request.method == 'POST':
@@ -831,54 +973,17 @@ def bulk_multi_translate(request):
         if word_ids and target_languages and translations_data:
             try:
                 translations = json.loads(translations_data)
-                created_count = 0
-                updated_count = 0
+                items = [
+                    (word_id, lang_code, translations[f"{word_id}_{lang_code}"])
+                    for word_id in word_ids
+                    for lang_code in target_languages
+                    if f"{word_id}_{lang_code}" in translations
+                ]
                 
-                with transaction.atomic():
-                    for word_id in word_ids:
-                        word = Word.objects.get(id=word_id)
-                        
-                        for lang_code in target_languages:
-                            key = f"{word_id}_{lang_code}"
-                            if key in translations and translations[key].strip():
-                                target_language = Language.objects.get(code=lang_code)
-                                translation_text = translations[key].strip()
-                                
-                                # Проверяем, существует ли уже слово с таким переводом
-                                existing_word = Word.objects.filter(
-                                    word=translation_text,
-                                    language=target_language,
-                                    is_deleted=False
-                                ).first()
-                                
-                                if existing_word:
-                                    # Используем существующее слово
-                                    target_word = existing_word
-                                else:
-                                    # Создаем новое слово на целевом языке
-                                    target_word, created = Word.objects.get_or_create(
-                                        word=translation_text,
-                                        language=target_language,
-                                        category=word.category,
-                                        defaults={
-                                            'meaning': word.meaning,
-                                            'status': 'pending',
-                                            'is_deleted': False,
-                                            'created_by': request.user
-                                        }
-                                    )
-                                    if created:
-                                        created_count += 1
-                                
-                                # Создаем или обновляем перевод
-                                translation, created = Translation.objects.get_or_create(
-                                    from_word=word,
-                                    to_word=target_word,
-                                    defaults={'status': 'pending', 'order': 1}
-                                )
-                                
-                                if not created:
-                                    updated_count += 1
+                with serialized_writes():
+                    result = bulk_translate(items, user=request.user, copy_meaning=True)
+                created_count = result.words_created
+                updated_count = result.translations_existing
                 
                 if created_count > 0 and updated_count > 0:
                     messages.success(request, f'Создано {created_count} новых слов и обновлено {updated_count} переводов')
@@ -909,14 +1014,17 @@ def bulk_multi_translate(request):
         words = words.filter(category_id=category_id)
     
     if search_query:
-        words = words.filter(word__icontains=search_query)
+        languages = Language.objects.values_list('id', 'code')
+        if source_language:
+            languages = languages.filter(code=source_language)
+        words = words.filter(search_key_filter(search_query, languages))
     
     # Исключаем слова, которые уже имеют переводы на все языки
     words = words.annotate(
         translation_count=Count('from_translations', filter=Q(from_translations__status='approved'))
     )
     
-    words = words.order_by('word')[:limit]
+    words = words.select_related('language', 'category').order_by('word')[:limit]
     
     # Получить данные для фильтров
     languages = Language.objects.all().order_by('code')
@@ -952,40 +1060,8 @@ def auto_fill_translations(request):
             word_ids = data.get('word_ids', [])
             target_languages = data.get('target_languages', [])
             
-            auto_filled_translations = {}
-            
-            for word_id in word_ids:
-                try:
-                    word = Word.objects.get(id=word_id)
-                    
-                    for lang_code in target_languages:
-                        # Ищем существующие переводы этого слова на целевой язык
-                        existing_translations = Translation.objects.filter(
-                            from_word=word,
-                            to_word__language__code=lang_code,
-                            status='approved'
-                        ).select_related('to_word')
-                        
-                        if existing_translations.exists():
-                            # Берем первый найденный перевод
-                            translation = existing_translations.first()
-                            auto_filled_translations[f"{word_id}_{lang_code}"] = translation.to_word.word
-                        else:
-                            # Ищем похожие слова на целевом языке
-                            similar_words = Word.objects.filter(
-                                language__code=lang_code,
-                                word__icontains=word.word[:3],  # Поиск по первым 3 буквам
-                                is_deleted=False
-                            )[:1]
-                            
-                            if similar_words.exists():
-                                auto_filled_translations[f"{word_id}_{lang_code}"] = f"[SIMILAR] {similar_words.first().word}"
-                            else:
-                                # Генерируем заглушку
-                                auto_filled_translations[f"{word_id}_{lang_code}"] = f"[AUTO] {word.word} ({lang_code})"
-                
-                except Word.DoesNotExist:
-                    continue
+            # Пакетный поиск: число запросов не зависит от количества слов
+            auto_filled_translations = auto_fill(word_ids, target_languages)
             
             return JsonResponse({
                 'success': True,
@@ -1016,12 +1092,7 @@ def quick_translate(request):
     
     # Фильтрация по поиску
     if search_query:
-        words = words.filter(
-            Q(word__icontains=search_query) |
-            Q(meaning__icontains=search_query) |
-            Q(category__code__icontains=search_query) |
-            Q(tags__code__icontains=search_query)
-        ).distinct()
+        words = words.filter(search_filter(search_query) | taxonomy_filter(search_query))
     
     # Фильтрация по языку
     if language_filter:
@@ -1035,21 +1106,28 @@ def quick_translate(request):
     if tag_filter:
         words = words.filter(tags__code=tag_filter)
     
-    # Сортировка
+    # Сортировка (для каждого варианта есть индекс, см. Word.Meta.indexes).
+    # Код категории скопирован в category_code, чтобы сортировку обслуживал
+    # индекс (category_code, word, id) без JOIN и временного B-дерева
     if sort_by == 'category':
-        words = words.order_by('category__code', 'word')
+        ordering = ['category_code', 'word', 'id']
     elif sort_by == 'created_at':
-        words = words.order_by('created_at')
+        ordering = ['created_at', 'id']
     else:
-        words = words.order_by('word')
+        ordering = ['word', 'id']
     
     if sort_order == 'desc':
-        words = words.reverse()
+        ordering = ['-' + field for field in ordering]
     
-    # Пагинация
-    paginator = Paginator(words, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Пагинация по курсору; теги и переводы строк страницы — двумя запросами на всю страницу
+    paginator = KeysetPaginator(
+        words.select_related('language', 'category').prefetch_related('tags', 'from_translations'), ordering, 20,
+    )
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+    filtered = search_query or language_filter or category_filter or tag_filter
+    found_terms = capped_count(words) if filtered else None
+    if search_query:
+        metrics.SEARCH_RESULTS.observe(found_terms.value, source='quick_translate')
     
     # Получение данных для фильтров
     languages = Language.objects.all().order_by('code')
@@ -1057,12 +1135,7 @@ def quick_translate(request):
     tags = Tag.objects.all().order_by('code')
     
     # Статистика
-    total_terms = Word.objects.filter(is_deleted=False, status='approved').count()
-    terms_with_translations = Word.objects.filter(
-        is_deleted=False, 
-        status='approved',
-        from_translations__status='approved'
-    ).distinct().count()
+    total_terms, terms_with_translations = word_stats(True)
     
     context = {
         'page_obj': page_obj,
@@ -1076,6 +1149,7 @@ def quick_translate(request):
         'sort_by': sort_by,
         'sort_order': sort_order,
         'total_terms': total_terms,
+        'found_terms': CappedCount(total_terms, True) if found_terms is None else found_terms,
         'terms_with_translations': terms_with_translations,
         'translation_progress': round((terms_with_translations / total_terms * 100) if total_terms > 0 else 0, 1)
     }
@@ -1264,12 +1338,7 @@ def term_list(request):
     
     # Фильтрация по поиску
     if search_query:
-        words = words.filter(
-            Q(word__icontains=search_query) |
-            Q(meaning__icontains=search_query) |
-            Q(category__code__icontains=search_query) |
-            Q(tags__code__icontains=search_query)
-        ).distinct()
+        words = words.filter(search_filter(search_query) | taxonomy_filter(search_query))
     
     # Фильтрация по языку
     if language_filter:
@@ -1283,21 +1352,26 @@ def term_list(request):
     if tag_filter:
         words = words.filter(tags__code=tag_filter)
     
-    # Сортировка
+    # Сортировка (для каждого варианта есть индекс, см. Word.Meta.indexes).
+    # Код категории скопирован в category_code, чтобы сортировку обслуживал
+    # индекс (category_code, word, id) без JOIN и временного B-дерева
     if sort_by == 'category':
-        words = words.order_by('category__code', 'word')
+        ordering = ['category_code', 'word', 'id']
     elif sort_by == 'created_at':
-        words = words.order_by('created_at')
+        ordering = ['created_at', 'id']
     else:
-        words = words.order_by('word')
+        ordering = ['word', 'id']
     
     if sort_order == 'desc':
-        words = words.reverse()
+        ordering = ['-' + field for field in ordering]
     
-    # Пагинация
-    paginator = Paginator(words, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Пагинация по курсору
+    paginator = KeysetPaginator(words.select_related('language', 'category'), ordering, 20)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+    filtered = search_query or language_filter or category_filter or tag_filter
+    found_terms = capped_count(words) if filtered else None
+    if search_query:
+        metrics.SEARCH_RESULTS.observe(found_terms.value, source='term_list')
     
     # Получение данных для фильтров
     languages = Language.objects.all().order_by('code')
@@ -1305,12 +1379,7 @@ def term_list(request):
     tags = Tag.objects.all().order_by('code')
     
     # Статистика
-    total_terms = Word.objects.filter(is_deleted=False, status='approved').count()
-    terms_with_translations = Word.objects.filter(
-        is_deleted=False, 
-        status='approved',
-        from_translations__status='approved'
-    ).distinct().count()
+    total_terms, terms_with_translations = word_stats(True)
     
     context = {
         'page_obj': page_obj,
@@ -1324,6 +1393,7 @@ def term_list(request):
         'sort_by': sort_by,
         'sort_order': sort_order,
         'total_terms': total_terms,
+        'found_terms': CappedCount(total_terms, True) if found_terms is None else found_terms,
         'terms_with_translations': terms_with_translations,
         'translation_progress': round((terms_with_translations / total_terms * 100) if total_terms > 0 else 0, 1)
     }
@@ -1451,3 +1521,92 @@ def term_detail(request, term_id):
     }
     
     return render(request, 'dictionary/term_detail.html', context)
+
+@staff_member_required
+@require_http_methods(["GET"])
+@condition(etag_func=conditional.dictionary_etag, last_modified_func=conditional.dictionary_last_modified)
+def export_dictionary(request):
+    """Потоковая выгрузка одобренных слов (NDJSON, CSV, TBX)"""
+    file_format = request.GET.get('format', 'ndjson')
+    if file_format not in exporting.FORMATS:
+        return JsonResponse({'success': False, 'error': 'Неизвестный формат'}, status=400)
+    try:
+        updated_from = exporting.parse_moment(request.GET.get('updated_from', ''))
+        updated_to = exporting.parse_moment(request.GET.get('updated_to', ''), end=True)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    words = exporting.export_queryset(
+        language=request.GET.get('language', ''),
+        category=request.GET.get('category', ''),
+        updated_from=updated_from,
+        updated_to=updated_to,
+    )
+    response = StreamingHttpResponse(
+        exporting.render(file_format, exporting.iter_entries(words)),
+        content_type=exporting.FORMATS[file_format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="dictionary.{file_format}"'
+    return response
+
+@require_http_methods(["GET"])
+@cache_control(no_cache=True)
+@condition(etag_func=conditional.dictionary_etag, last_modified_func=conditional.dictionary_last_modified)
+def sync_changes(request):
+    """Изменения словаря после cursor для офлайн-клиентов (см. dictionary.sync)"""
+    try:
+        cursor = int(request.GET.get('cursor', 0))
+        limit = int(request.GET.get('limit', sync.DEFAULT_LIMIT))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'cursor и limit должны быть числами'}, status=400)
+    if cursor < 0:
+        return JsonResponse({'success': False, 'error': 'cursor не может быть отрицательным'}, status=400)
+    return JsonResponse(sync.changes(cursor, limit), json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')})
+
+def prometheus_metrics(request):
+    """Метрики всех процессов в текстовом формате Prometheus (см. dictionary.metrics)"""
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token:
+        if request.headers.get('Authorization') != f'Bearer {token}':
+            return HttpResponse(status=401)
+    elif not request.user.is_staff:
+        # Без токена метрики видят только сотрудники: в них трафик, ошибки и задержки по URL
+        return HttpResponse(status=403)
+    return HttpResponse(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+@staff_member_required
+@require_http_methods(["GET"])
+def profiles(request):
+    """Сохранённые профили запросов (см. dictionary.profiling) с отбором по представлению"""
+    all_profiles = profiling.list_profiles()
+    by_view = {}
+    for profile in all_profiles:
+        stats = by_view.setdefault(profile.view, {'view': profile.view, 'count': 0, 'max_ms': 0})
+        stats['count'] += 1
+        stats['max_ms'] = max(stats['max_ms'], profile.duration_ms)
+
+    view = request.GET.get('view', '')
+    shown = [profile for profile in all_profiles if not view or profile.view == view]
+    sort = request.GET.get('sort', '')
+    if sort == 'duration':
+        shown.sort(key=lambda profile: -profile.duration_ms)
+
+    context = {
+        'profiles': shown,
+        'views': sorted(by_view.values(), key=lambda stats: -stats['max_ms']),
+        'current_view': view,
+        'sort': sort,
+        'enabled': profiling.directory() is not None,
+        'sample_rate': getattr(settings, 'PROFILING_SAMPLE_RATE', 0),
+        'header': getattr(settings, 'PROFILING_HEADER', profiling.DEFAULT_HEADER),
+    }
+    return render(request, 'dictionary/profiles.html', context)
+
+@staff_member_required
+@require_http_methods(["GET"])
+def profile_file(request, name):
+    """Скачать профиль: .prof для pstats/snakeviz или .collapsed для flamegraph.pl"""
+    path = profiling.profile_path(name)
+    if path is None:
+        raise Http404('Профиль не найден')
+    return FileResponse(path.open('rb'), as_attachment=True, filename=name)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -54,10 +55,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'dictionary.metrics.MetricsMiddleware',
+    'dictionary.instrumentation.QueryInstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'dictionary.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -86,13 +90,62 @@ WSGI_APPLICATION = 'dictionary_django.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
+# БД задаётся переменными окружения (docker-compose читает их из .env):
+# DB_ENGINE=postgresql и DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT;
+# без DB_ENGINE используется SQLite (файл SQLITE_PATH, по умолчанию db.sqlite3).
+# Тесты запускаются на той же СУБД: DB_ENGINE=postgresql python manage.py test
+# (PostgreSQL из docker-compose: docker compose --profile postgres run --rm test-postgres)
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'dictionary'),
+            'USER': os.environ.get('DB_USER', 'dictionary'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            # Соединение переиспользуется между запросами, PRAGMA выполняются один раз
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+            'OPTIONS': {
+                'timeout': 20,
+            },
+        }
+    }
+
+# PRAGMA для соединений SQLite поверх dictionary.sqlite.DEFAULT_PRAGMAS
+# (WAL, synchronous=normal, mmap, cache_size, busy_timeout, temp_store)
+SQLITE_PRAGMAS = {}
+
+# Общий для всех процессов кэш. Перед ним в каждом процессе — LRU из
+# dictionary/caching.py (CACHE_LOCAL_MAX_ENTRIES записей, версии тегов
+# сверяются не чаще раза в CACHE_LOCAL_CHECK_INTERVAL секунд)
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'dictionary.caching.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'TIMEOUT': 600,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+            'CULL_INTERVAL': 5,
+        },
     }
 }
 
+CACHE_LOCAL_MAX_ENTRIES = 1000
+CACHE_LOCAL_CHECK_INTERVAL = 1.0
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -134,6 +187,96 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Заранее отрисованные страницы слов для nginx (см. dictionary/static_pages.py).
+# Без STATIC_PAGES_ROOT — выключено; в docker-compose каталог ./static_pages
+# смонтирован в nginx как /app/static_pages: в .env STATIC_PAGES_ROOT=/app/static_pages
+STATIC_PAGES_ROOT = os.environ.get('STATIC_PAGES_ROOT') or None
+
+# Учёт SQL-запросов по представлениям (dictionary/instrumentation.py):
+# допустимое число запросов на имя URL; превышение пишется в лог как WARNING.
+# Считаются и запросы сессии и пользователя (обычно 2)
+QUERY_BUDGETS = {
+    'dictionary:home': 11,
+    'dictionary:word_detail': 11,
+    'dictionary:login': 2,
+    'dictionary:register': 2,
+    'dictionary:profile': 2,
+    'dictionary:translation_search': 7,
+    'dictionary:quick_translate': 12,
+    'dictionary:quick_translate_detail': 12,
+    'dictionary:word_create': 5,
+    'dictionary:word_edit': 7,
+    'dictionary:word_translations_dashboard': 8,
+    'dictionary:word_translation_edit': 5,
+    'dictionary:multi_translate_word': 5,
+    'dictionary:bulk_word_translation': 19,
+    'dictionary:bulk_multi_translate': 21,
+    'dictionary:auto_fill_translations': 7,
+    'dictionary:add_missing_translations': 18,
+    'dictionary:bulk_add_missing_translations': 11,
+    'dictionary:translation_dashboard': 9,
+    'dictionary:translation_progress': 9,
+    'dictionary:translation_coverage_json': 7,
+    'dictionary:category_translations_edit': 8,
+    'dictionary:tag_translations_edit': 5,
+    'dictionary:interface_translations_edit': 4,
+    'dictionary:sync_changes': 5,
+    'dictionary:export_dictionary': 7,
+    'dictionary:metrics': 2,
+    'dictionary:profiles': 2,
+    'dictionary:profile_file': 2,
+    'admin:dictionary_word_changelist': 7,
+    'admin:dictionary_translation_changelist': 7,
+    'admin:dictionary_category_changelist': 7,
+    'admin:dictionary_tag_changelist': 7,
+    'admin:dictionary_example_changelist': 6,
+    'admin:dictionary_favourite_changelist': 6,
+    'admin:dictionary_wordlike_changelist': 6,
+    'admin:dictionary_searchhistory_changelist': 5,
+    'admin:dictionary_wordchangelog_changelist': 8,
+    'admin:dictionary_wordhistory_changelist': 6,
+    'admin:dictionary_interfacetranslation_changelist': 6,
+    'admin:dictionary_language_changelist': 5,
+    'admin:dictionary_customuser_changelist': 6,
+}
+# Сколько одинаковых запросов (с точностью до параметров) за запрос считать N+1
+QUERY_REPEAT_THRESHOLD = 5
+
+# Метрики Prometheus (/metrics, см. dictionary/metrics.py): каталог, через который
+# процессы gunicorn складывают значения, и токен для заголовка
+# Authorization: Bearer (None — метрики доступны только сотрудникам; снаружи
+# /metrics закрыт ещё и в nginx.conf)
+METRICS_DIR = BASE_DIR / 'metrics'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Выборочное профилирование запросов (dictionary/profiling.py, страница /profiles/):
+# каталог профилей (None — выключено), доля профилируемых запросов и заголовок,
+# с которым сотрудник профилирует свой запрос (X-Profile: 1, sample или cprofile).
+# Режим по умолчанию: cprofile (.prof) или sample (стеки для flame graph раз в
+# PROFILING_INTERVAL секунд)
+PROFILING_DIR = BASE_DIR / 'profiles'
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+PROFILING_HEADER = 'X-Profile'
+PROFILING_MODE = os.environ.get('PROFILING_MODE', 'cprofile')
+PROFILING_INTERVAL = 0.005
+PROFILING_MAX_FILES = 500
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'dictionary': {
+            'handlers': ['console'],
+            'level': os.environ.get('DICTIONARY_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 